@@ -2,10 +2,17 @@ import pygame
 import pygame.gfxdraw
 import sys
 import math
-import subprocess
 import tempfile
 import os
 import time
+import threading
+# startup phase timing (HKVIS_PROFILE_STARTUP=1 or --profile-startup prints a report)
+try:
+    from hkvis_core.startupprofile import StartupProfile
+except Exception:
+    from startupprofile import StartupProfile
+startup = StartupProfile()
+startup.mark('interpreter + pygame')
 # Safe stub for TSX background loader (project may provide a real loader elsewhere)
 def create_tsx_background(path, w, h):
     return None
@@ -18,6 +25,7 @@ except Exception:
         import animationtest
     except Exception:
         animationtest = None
+startup.mark('import animationtest')
 try:
     from hkvis_core.viewchart import load_rainfall_data
 except Exception:
@@ -25,6 +33,98 @@ except Exception:
         from viewchart import load_rainfall_data
     except Exception:
         load_rainfall_data = None
+startup.mark('import viewchart')
+try:
+    from hkvis_core.dataloader import BackgroundLoader
+except Exception:
+    from dataloader import BackgroundLoader
+# scaled images / rendered text cached per widget state (retained UI)
+try:
+    from hkvis_core import uicache
+except Exception:
+    import uicache
+try:
+    from hkvis_core import compositor as compositor_mod
+except Exception:
+    import compositor as compositor_mod
+try:
+    from hkvis_core import scheduler
+except Exception:
+    import scheduler
+try:
+    from hkvis_core import assetbundle
+except Exception:
+    import assetbundle
+# last session's frame, shown before anything else loads
+try:
+    from hkvis_core import warmstart
+except Exception:
+    try:
+        import warmstart
+    except Exception:
+        warmstart = None
+# external chart viewer commands run on a background event loop
+try:
+    from hkvis_core import viewerproc
+except Exception:
+    import viewerproc
+# procedural rain sound (needs NumPy; the MP3 loop is used without it)
+try:
+    from hkvis_core import rainaudio
+except Exception:
+    try:
+        import rainaudio
+    except Exception:
+        rainaudio = None
+# 8-bit palettized animation path (needs NumPy)
+try:
+    from hkvis_core import palettedanim
+except Exception:
+    try:
+        import palettedanim
+    except Exception:
+        palettedanim = None
+startup.mark('import dataloader')
+# in-window chart rendering (needs matplotlib when a chart is first shown)
+try:
+    from hkvis_core import chartsurface
+except Exception:
+    try:
+        import chartsurface
+    except Exception:
+        chartsurface = None
+try:
+    from hkvis_core.chartprefetch import ChartPrefetcher
+except Exception:
+    try:
+        from chartprefetch import ChartPrefetcher
+    except Exception:
+        ChartPrefetcher = None
+# all-years overview grid drawn from the packed chart atlas
+try:
+    from hkvis_core import chartatlas
+except Exception:
+    try:
+        import chartatlas
+    except Exception:
+        chartatlas = None
+# year x month anomaly heatmap (needs NumPy)
+try:
+    from hkvis_core import heatmapview
+except Exception:
+    try:
+        import heatmapview
+    except Exception:
+        heatmapview = None
+# zoomable line chart of the whole monthly record (needs NumPy)
+try:
+    from hkvis_core import timeseries
+except Exception:
+    try:
+        import timeseries
+    except Exception:
+        timeseries = None
+startup.mark('import charts')
 
 # ---------- Image Button Class ----------
 class ImageButton:
@@ -34,10 +134,11 @@ class ImageButton:
         self.image_off = pygame.image.load(image_off_path).convert_alpha()
         self.down = False
         self.callback = None
+        self._cache = uicache.SurfaceCache(max_entries=4)
 
     def draw(self, surface):
         img = self.image_off if self.down else self.image_on
-        img_scaled = pygame.transform.smoothscale(img, (self.rect.width, self.rect.height))
+        img_scaled = uicache.scaled(self._cache, img, self.rect.size)
         surface.blit(img_scaled, (self.rect.x, self.rect.y))
 
     def handle_event(self, event):
@@ -55,6 +156,16 @@ class ImageButton:
 # ---------- Configuration ----------
 WIDTH, HEIGHT = 1280, 720
 FPS = 60
+# Music volume follows the monthly rainfall on its own timer, independent of FPS
+AUDIO_UPDATE_HZ = 10
+# Rain sound: 'synth' (procedural, shaped by the rainfall), 'mp3' (looped recording) or 'off'
+RAIN_AUDIO = os.environ.get('HKVIS_RAIN_AUDIO', 'synth')
+# Animation rendering: 'rgb' (per-cell colours) or 'palette' (8-bit surface, shimmer via set_palette)
+ANIM_RENDER = os.environ.get('HKVIS_ANIM_RENDER', 'rgb')
+# Save the last frame and year on exit and show them at the next launch (HKVIS_WARM_START=0 to disable)
+WARM_START = os.environ.get('HKVIS_WARM_START', '1') != '0'
+# Periodic terminal status (caches, compositor, wakeups/CPU); HKVIS_DEBUG=1 to enable
+DEBUG_STATUS = os.environ.get('HKVIS_DEBUG') == '1'
 
 BG_COLOR = (180, 180, 180)
 PANEL_COLOR = (255, 255, 255)
@@ -75,10 +186,29 @@ TSX_BACKGROUND_PATH = None  # or set to os.path.join(os.path.dirname(__file__),
 # Example: "/Users/janet/Downloads/fonts/GoogleSans-Regular.ttf"
 FONT_PATH = None  # set to your font file path if you have one
 
+# Background data refresh. When AUTO_REFRESH_INTERVAL is set (seconds), the loader
+# re-downloads monthlyElement.xml on that period and swaps in the new data when it changed.
+# RELOAD_DOWNLOADS makes the reload button also check the network first.
+AUTO_REFRESH_INTERVAL = None  # e.g. 6 * 3600 for kiosks
+RELOAD_DOWNLOADS = False
+
+# Charts are drawn in a draggable in-window panel. Set True to open the
+# rainfall_charts/ PNG in the system image viewer instead.
+CHART_EXTERNAL_VIEWER = False
+# Renderer for the in-window chart: 'mpl' (matplotlib Agg) or 'raster' (pygame drawing, no matplotlib)
+CHART_BACKEND = 'mpl'
+# Size of the mini chart shown above the year slider while hovering it
+SLIDER_PREVIEW_SIZE = (160, 72)
+# Key that toggles the all-years overview (packed into rainfall_charts/atlas.png on first use)
+OVERVIEW_KEY = pygame.K_g
+# Key that toggles the year x month anomaly heatmap; [ and ] change its colour scale, M its units
+HEATMAP_KEY = pygame.K_h
+# Key that toggles the zoomable line chart of the whole record (wheel zooms, drag pans)
+TIMESERIES_KEY = pygame.K_t
+
 # Duration (seconds) that the clicked color variant remains active
 TEMP_VARIANT_DURATION = 0.35
 
-FPS_CLOCK = pygame.time.Clock()
 
 # (removed unused point_in_rect)
 # ---------- Icon ----------
@@ -92,38 +222,55 @@ def main():
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
     pygame.display.set_caption("HK Rainfall Visualiser")
+    startup.mark('display init')
+    # warm start: put the previous session's frame up before the assets, fonts and data load
+    warm_snapshot = None
+    warm_fade = None  # warmstart.CrossFade from the snapshot to the first live frames
+    warm_backdrop = None  # the snapshot at window size, shown until the data is loaded
+    if WARM_START and warmstart is not None and animationtest is not None:
+        warm_snapshot = warmstart.load_snapshot(params=warmstart.pattern_params(animationtest, ANIM_RENDER))
+        if warm_snapshot is not None and warm_snapshot.frame is not None:
+            screen.blit(warm_snapshot.scaled(screen.get_size()), (0, 0))
+            pygame.display.flip()
+            startup.first_pixel()
+            warm_fade = warmstart.CrossFade(warm_snapshot.frame)
 
     # Create three buttons: start, stop, reload (after pygame is initialized)
 
-    # Load base button image and icons
-
-    button_on = pygame.image.load(os.path.join(ICON_BASE_PATH, "button_on.png")).convert_alpha()
-    button_off = pygame.image.load(os.path.join(ICON_BASE_PATH, "button_off.png")).convert_alpha()
-    icon_start_black = pygame.image.load(os.path.join(ICON_BASE_PATH, "start_black.png")).convert_alpha()
-    icon_start_green = pygame.image.load(os.path.join(ICON_BASE_PATH, "start_green.png")).convert_alpha()
-    icon_stop_black = pygame.image.load(os.path.join(ICON_BASE_PATH, "stop_black.png")).convert_alpha()
-    icon_stop_red = pygame.image.load(os.path.join(ICON_BASE_PATH, "stop_red.png")).convert_alpha()
-    icon_reload_black = pygame.image.load(os.path.join(ICON_BASE_PATH, "reload_black.png")).convert_alpha()
+    # Load base button image and icons (one pre-decoded bundle, or the PNGs when it is missing or stale)
+    ui_images = assetbundle.load_images(ICON_BASE_PATH)
+    button_on = ui_images["button_on"]
+    button_off = ui_images["button_off"]
+    icon_start_black = ui_images["start_black"]
+    icon_start_green = ui_images["start_green"]
+    icon_stop_black = ui_images["stop_black"]
+    icon_stop_red = ui_images["stop_red"]
+    icon_reload_black = ui_images["reload_black"]
     # Chart icons for the new button (chart_off -> chart_on when pressed)
-    icon_chart_off = pygame.image.load(os.path.join(ICON_BASE_PATH, "chart_off.png")).convert_alpha()
-    icon_chart_on = pygame.image.load(os.path.join(ICON_BASE_PATH, "chart_on.png")).convert_alpha()
+    icon_chart_off = ui_images["chart_off"]
+    icon_chart_on = ui_images["chart_on"]
 
     # Load Google Sans Code font from the `data/` directory if available, otherwise use default system font
     font_path = os.path.join(os.path.dirname(__file__), "data", "GoogleSansCode-VariableFont_wght.ttf")
+    # font lookups (system font scan, match_font) are remembered across runs
+    font_resolver = assetbundle.FontResolver(packaged_fonts=(font_path,))
+
+    def find_year_font():
+        # Prefer a system font that contains digit glyphs to avoid missing-glyph boxes.
+        preferred = ['arialunicode', 'arial', 'helvetica', 'timesnewroman']
+        available = {f.lower() for f in pygame.font.get_fonts()}
+        for p in preferred:
+            if p in available:
+                return pygame.font.match_font(p)
+        return None
+
     if os.path.exists(font_path):
         try:
             UI_FONT = pygame.font.Font(font_path, 20)
             # smaller font for year label above the slider
-            # Prefer a system font that contains digit glyphs to avoid missing-glyph boxes.
-            preferred = ['arialunicode', 'arial', 'helvetica', 'timesnewroman']
-            found = None
-            available = {f.lower() for f in pygame.font.get_fonts()}
-            for p in preferred:
-                if p in available:
-                    found = p
-                    break
-            if found:
-                YEAR_FONT = pygame.font.SysFont(found, 14)
+            found = font_resolver.resolve('year_font', find_year_font)
+            if found and os.path.exists(found):
+                YEAR_FONT = pygame.font.Font(found, 14)
             else:
                 # fallback to packaged font if system fonts don't contain digits
                 YEAR_FONT = pygame.font.Font(font_path, 14)
@@ -136,6 +283,8 @@ def main():
 
     # Year slider widget (minimalist)
     class YearSlider:
+        THUMB_R = 10
+
         def __init__(self, rect, year_min=1884, year_max=2025, initial=None):
             self.rect = pygame.Rect(rect)
             self.year_min = year_min
@@ -143,6 +292,8 @@ def main():
             self.range = year_max - year_min
             self.year = initial if initial is not None else year_max
             self.dragging = False
+            # year label cards, one per year shown
+            self._cache = uicache.SurfaceCache(max_entries=16)
 
         def year_to_pos(self, year):
             t = (year - self.year_min) / max(1, self.range)
@@ -180,6 +331,12 @@ def main():
                 if self.dragging:
                     self.dragging = False
 
+        def hover_year(self, pos):
+            # year under the cursor while it is over the bar (or while dragging)
+            if self.dragging or self.rect.collidepoint(pos):
+                return self.pos_to_year(pos[0])
+            return None
+
         def draw(self, surface, font):
             # draw slider and year label
             bar_h = 8
@@ -190,43 +347,42 @@ def main():
             fill_rect = pygame.Rect(bar_rect.x+4, bar_rect.y, pos - (bar_rect.x+4), bar_rect.height)
             pygame.draw.rect(surface, (120,160,255), fill_rect, border_radius=4)
             # thumb
-            thumb_r = 10
+            thumb_r = self.THUMB_R
             pygame.draw.circle(surface, (255,255,255), (pos, bar_rect.centery), thumb_r)
             pygame.draw.circle(surface, (100,120,140), (pos, bar_rect.centery), thumb_r, 2)
-            # year label above bar (use smaller YEAR_FONT if available)
+            # year label card flush with the left end of the bar, built once per year
+            card = self._cache.get(('label', self.year, font), lambda: self._label_card(font))
+            gap = 6
+            surface.blit(card, (bar_rect.x - card.get_width() - gap, bar_rect.centery - card.get_height() // 2))
+
+        def bounds(self, font):
+            # slider rect grown by the thumb radius (the thumb centre reaches
+            # rect.right - 8) plus the year label card drawn to the left of the bar
+            card = self._cache.get(('label', self.year, font), lambda: self._label_card(font))
+            gap = 6
+            card_rect = card.get_rect()
+            card_rect.midright = (self.rect.x - gap, self.rect.centery)
+            return self.rect.inflate(2 * self.THUMB_R, 2 * self.THUMB_R).union(card_rect)
+
+        def _label_card(self, font):
+            # year text (smaller YEAR_FONT if available) on a translucent dark rounded card
             try:
                 year_surf = YEAR_FONT.render(str(self.year), True, (255,255,255))
             except Exception:
                 year_surf = font.render(str(self.year), True, (255,255,255))
-            # place year label flush with the left end of the slider bar
             bg_margin = 6
-            # left end x coordinate of the bar
-            left_x = bar_rect.x
-            # compute background rect positioned to the immediate left of the bar,
-            # vertically centered with the bar
             bg_w = year_surf.get_width() + bg_margin*2
             bg_h = year_surf.get_height() + bg_margin*2
-            gap = 6
-            bg_x = left_x - bg_w - gap
-            bg_y = bar_rect.centery - (bg_h // 2)
-            bg_rect = pygame.Rect(bg_x, bg_y, bg_w, bg_h)
-            # draw a slightly translucent dark rounded card behind the year label
             try:
                 card = pygame.Surface((bg_w, bg_h), pygame.SRCALPHA)
                 card.fill((0,0,0,0))
                 pygame.draw.rect(card, (0,0,0,200), (0,0,bg_w,bg_h), border_radius=6)
-                surface.blit(card, (bg_x, bg_y))
             except Exception:
                 # fallback to solid small dark rectangle if alpha surfaces are unsupported
-                pygame.draw.rect(surface, (30,30,30), bg_rect)
-            # blit year text inside the square
-            text_x = bg_x + bg_margin
-            text_y = bg_y + bg_margin
-            surface.blit(year_surf, (text_x, text_y))
-            # blit year text inside the black square with margin
-            text_x = bg_x + bg_margin
-            text_y = bg_y + bg_margin
-            surface.blit(year_surf, (text_x, text_y))
+                card = pygame.Surface((bg_w, bg_h))
+                card.fill((30,30,30))
+            card.blit(year_surf, (bg_margin, bg_margin))
+            return card
 
     # instantiate year slider and place it bottom-center
     slider_w = int(WIDTH * 0.4)
@@ -234,38 +390,65 @@ def main():
     slider_x = (WIDTH - slider_w) // 2
     slider_y = HEIGHT - slider_h - 24
     year_slider = YearSlider((slider_x, slider_y, slider_w, slider_h), 1884, 2025, 2025)
+    if warm_snapshot is not None and str(warm_snapshot.year).isdigit():
+        year_slider.year = max(year_slider.year_min, min(year_slider.year_max, int(warm_snapshot.year)))
 
     # Animation background state (if animationtest is available)
     animation_enabled = animationtest is not None
     anim_frame_time = 0.0
+    if warm_fade is not None:
+        # resume the pattern where the snapshot was taken, so the cross-fade matches
+        anim_frame_time = warm_snapshot.anim_time
     anim_font = None
     anim_surface = None
     anim_char_w = anim_char_h = None
+    paletted_anim = None
     rainfall_by_year = None
-    # try loading monthlyElement.xml via viewchart if available
-    try:
-        if load_rainfall_data is not None:
-            xml_path = os.path.join(os.path.dirname(__file__), 'data', 'monthlyElement.xml')
-            if os.path.exists(xml_path):
-                years_list, rainfall_list = load_rainfall_data(xml_path)
-                rainfall_by_year = {str(y): vals for y, vals in zip(years_list, rainfall_list)}
-    except Exception:
-        rainfall_by_year = None
-    # Audio: load rain sound (best-effort) and setup per-month volume control
+    # monthlyElement.xml is parsed (and optionally re-downloaded) on a background worker;
+    # the animation uses RAIN_DATA until the first dataset is swapped in.
+    xml_path = os.path.join(os.path.dirname(__file__), 'data', 'monthlyElement.xml')
+
+    def download_latest():
+        # optional network refresh (needs `requests`, imported on first use on the
+        # loader thread); reload/auto-refresh still re-parse without it
+        try:
+            from hkvis_core import xmldata
+        except Exception:
+            return False
+        result = xmldata.download_xml(output_file=xml_path)
+        return bool(result and result.modified)
+
+    data_loader = BackgroundLoader(xml_path, load_rainfall_data, download_fn=download_latest,
+                                   refresh_interval=AUTO_REFRESH_INTERVAL)
+    if load_rainfall_data is not None:
+        data_loader.start()
+    data_generation = -1
+    startup.mark('assets + loader start')
+    # Audio: synthesized rain (best-effort), else the looped MP3 with per-month volume control
     rain_sound_path = os.path.join(os.path.dirname(__file__), 'image', 'rain_sound_image.mp3')
     music_available = False
-    # compute per-year min/max monthly values for normalization
+    rain_audio = None
+    # per-year audio envelopes for the loaded dataset, computed once per data generation
+    rain_audio_envelopes = None
+    rain_audio_key = None  # (data generation, year) of the envelope playing now
+    # per-year min/max monthly values for normalization (filled from the loader's dataset)
     per_year_month_minmax = {}
+    # precomputed climatology statistics for the loaded dataset (None without NumPy)
+    climatology = None
     try:
-        if rainfall_by_year:
-            for y, vals in rainfall_by_year.items():
-                if vals:
-                    per_year_month_minmax[y] = (min(vals), max(vals))
-    except Exception:
-        per_year_month_minmax = {}
-    try:
+        if RAIN_AUDIO == 'off':
+            raise RuntimeError('rain audio disabled')
         pygame.mixer.init()
-        if os.path.exists(rain_sound_path):
+        if RAIN_AUDIO == 'synth' and rainaudio is not None:
+            try:
+                rain_audio = rainaudio.RainAudio()
+                rain_audio.start()
+            except Exception as e:
+                print(f"Rain synthesis unavailable ({e}); using the recorded loop")
+                rain_audio = None
+        if rain_audio is not None:
+            music_available = False
+        elif os.path.exists(rain_sound_path):
             try:
                 pygame.mixer.music.load(rain_sound_path)
                 pygame.mixer.music.play(-1)
@@ -276,6 +459,7 @@ def main():
             music_available = False
     except Exception:
         music_available = False
+    startup.mark('audio init')
     
 
     class OverlayButton:
@@ -295,6 +479,8 @@ def main():
             self.is_reload = False
             # timestamp of last toggle to debounce rapid clicks
             self.last_toggle_time = 0.0
+            # scaled background/icon/overlay per (state, size); only blitted once built
+            self._cache = uicache.SurfaceCache(max_entries=8)
 
         def draw(self, surface):
             # Determine the effective pressed state: for toggle buttons use persistent
@@ -307,18 +493,17 @@ def main():
                 # shrink by a few pixels so the change is subtle
                 new_w = max(1, self.rect.width - 6)
                 new_h = max(1, self.rect.height - 6)
-                bg_scaled = pygame.transform.smoothscale(bg, (new_w, new_h))
+                bg_scaled = uicache.scaled(self._cache, bg, (new_w, new_h))
                 bg_x = self.rect.x + (self.rect.width - new_w) // 2
                 bg_y = self.rect.y + (self.rect.height - new_h) // 2 - 3  # raise by 3px
                 surface.blit(bg_scaled, (bg_x, bg_y))
             else:
-                bg_scaled = pygame.transform.smoothscale(bg, (self.rect.width, self.rect.height))
+                bg_scaled = uicache.scaled(self._cache, bg, self.rect.size)
                 surface.blit(bg_scaled, (self.rect.x, self.rect.y))
             # If disabled, draw a dimmed background/icon to indicate locked state
             if not getattr(self, 'enabled', True):
                 # draw a slightly darker overlay on top of button background
-                overlay = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-                overlay.fill((0,0,0,120))
+                overlay = uicache.filled(self._cache, self.rect.size, (0,0,0,120))
                 surface.blit(overlay, (self.rect.x, self.rect.y))
 
             # Draw icon centered, keep original aspect ratio, fit within 40% of button size
@@ -334,7 +519,7 @@ def main():
             scale = min(max_w / iw, max_h / ih, 1.0)
             new_w = int(iw * scale)
             new_h = int(ih * scale)
-            icon_scaled = pygame.transform.smoothscale(icon, (new_w, new_h))
+            icon_scaled = uicache.scaled(self._cache, icon, (new_w, new_h))
             # Keep the icon centered in the original button rect.
             # When pressed, move the icon 3px lower to give a pressed-in effect.
             icon_x = self.rect.x + (self.rect.width - new_w) // 2
@@ -346,6 +531,11 @@ def main():
                 icon_y += 3
             surface.blit(icon_scaled, (icon_x, icon_y))
 
+        def state_key(self):
+            # everything draw() depends on besides the rect
+            return (self.toggled if self.toggle else self.down, getattr(self, 'enabled', True),
+                    getattr(self, 'is_reload', False))
+
         def handle_event(self, event):
             # Ignore interactions when disabled
             if not getattr(self, 'enabled', True):
@@ -393,18 +583,17 @@ def main():
     external_chart_open_time = None
     external_chart_block_autoclose = False
     external_chart_checker_thread = None
+    # viewer commands (open/xdg-open/osascript) run off the UI thread and report back
+    # as viewer_service.event_type events; HKVIS_VIEWER overrides the viewer command
+    viewer_service = viewerproc.ViewerService()
+    # document names Preview reported at the last query (macOS)
+    preview_documents = []
     # per-button debounce handled by OverlayButton.last_toggle_time
 
     def open_file(path):
-        """Open a file using system command."""
+        """Open a file using system command (returns at once; the result arrives as an event)."""
         try:
-            if sys.platform == 'darwin':
-                subprocess.Popen(['open', path])
-            elif sys.platform.startswith('win'):
-                os.startfile(path)
-            else:
-                # linux/unix
-                subprocess.Popen(['xdg-open', path])
+            viewer_service.open(path)
         except Exception:
             pass
 
@@ -416,14 +605,12 @@ def main():
             pass
         try:
             if external_chart_opened and external_chart_path:
-                if sys.platform == 'darwin':
-                    try:
-                        fname = os.path.basename(external_chart_path)
-                        script = f'tell application "Preview" to close (every document whose name is "{fname}")'
-                        subprocess.Popen(['osascript', '-e', script])
-                    except Exception:
-                        pass
-                # For other platforms we avoid force-closing arbitrary apps
+                try:
+                    # Preview is asked to close it on macOS, a viewer started via HKVIS_VIEWER is
+                    # terminated; other apps are never force-closed
+                    viewer_service.close(external_chart_path)
+                except Exception:
+                    pass
                 external_chart_opened = False
                 external_chart_open_time = None
                 external_chart_block_autoclose = False
@@ -444,27 +631,16 @@ def main():
     external_chart_block_autoclose = False
 
     def is_preview_document_open(fname):
-        """Return True if Preview has `fname` open (macOS only)."""
+        """Return True if Preview had `fname` open at the last query (macOS only).
+
+        Non-blocking: the answer comes from the previous query and a new one is
+        started to refresh it.
+        """
         try:
             if sys.platform != 'darwin':
                 return False
-            script = (
-                'tell application "System Events"\n'
-                ' set isRunning to (name of processes) contains "Preview"\n'
-                'end tell\n'
-                'if isRunning then\n'
-                ' tell application "Preview" to return (name of every document as string)\n'
-                'else\n'
-                ' return ""\n'
-                'end if'
-            )
-            proc = subprocess.Popen(['osascript', '-e', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = proc.communicate(timeout=0.5)
-            out = out.decode(errors='ignore').strip()
-            if not out:
-                return False
-            names = [n.strip() for n in out.split(',') if n.strip()]
-            return fname in names
+            viewer_service.query(fname)
+            return fname in preview_documents
         except Exception:
             return False
 
@@ -494,7 +670,10 @@ def main():
             pass
         # resume music (best-effort)
         try:
-            pygame.mixer.music.unpause()
+            if rain_audio is not None:
+                rain_audio.resume()
+            else:
+                pygame.mixer.music.unpause()
         except Exception:
             pass
         print("Start button clicked; animation enabled")
@@ -515,7 +694,10 @@ def main():
             pass
         # pause music (best-effort)
         try:
-            pygame.mixer.music.pause()
+            if rain_audio is not None:
+                rain_audio.pause()
+            else:
+                pygame.mixer.music.pause()
         except Exception:
             pass
         print("Stop button clicked; animation disabled and chart locked/closed")
@@ -523,22 +705,15 @@ def main():
     def on_reload(btn):
         # reset animation state so it restarts from initial frame
         try:
-            nonlocal anim_frame_time, anim_surface, anim_font, anim_char_w, anim_char_h, rainfall_by_year
+            nonlocal anim_frame_time
         except SyntaxError:
             pass
+        # the animation font and surface are kept: only the data and the clock restart
         anim_frame_time = 0.0
-        anim_surface = None
-        anim_font = None
-        anim_char_w = anim_char_h = None
-        # attempt to re-load rainfall data if loader is available
-        try:
-            if load_rainfall_data is not None:
-                xml_path = os.path.join(os.path.dirname(__file__), 'data', 'monthlyElement.xml')
-                if os.path.exists(xml_path):
-                    years_list, rainfall_list = load_rainfall_data(xml_path)
-                    rainfall_by_year = {str(y): vals for y, vals in zip(years_list, rainfall_list)}
-        except Exception:
-            rainfall_by_year = rainfall_by_year
+        # re-load rainfall data on the background worker; current data stays live until swapped
+        if load_rainfall_data is not None:
+            data_loader.start(initial_load=False)
+            data_loader.request_reload(download=RELOAD_DOWNLOADS)
         print("Reload button clicked; animation reset")
     def on_chart(btn):
         # Chart button callback: open/close external chart viewer and prepare in-window panel.
@@ -557,6 +732,8 @@ def main():
             return
         # Otherwise, show chart in-window (panel positioning will be handled in main loop)
         chart_alpha = 255
+        if not CHART_EXTERNAL_VIEWER and chartsurface is not None:
+            return
         # Try to open an on-disk PNG for the selected year; otherwise dump cached surface to temp PNG
         try:
             chart_year = year_slider.year
@@ -570,7 +747,10 @@ def main():
                 chart_temp_file = None
             else:
                 # fallback to cached surface if present
-                surf = chart_image_cache.get(chart_year)
+                if chartsurface is not None:
+                    surf = chart_image_cache.latest_for_year(chart_year)
+                else:
+                    surf = chart_image_cache.get(chart_year)
                 if surf is not None:
                     try:
                         fd, tmp = tempfile.mkstemp(suffix='.png', prefix=f'rainfall_{chart_year}_')
@@ -597,6 +777,122 @@ def main():
     btn_chart.callback = on_chart
 
 
+    def draw_loading_indicator(surface, center, radius=9):
+        # three-quarter arc rotating once per second
+        start = (time.time() * 2 * math.pi) % (2 * math.pi)
+        rect = pygame.Rect(0, 0, radius * 2, radius * 2)
+        rect.center = center
+        pygame.draw.circle(surface, (0, 0, 0), center, radius + 4)
+        pygame.draw.arc(surface, (120, 160, 255), rect, start, start + 1.5 * math.pi, 3)
+
+    def update_music_volume(dt):
+        # low-rate audio timer (AUDIO_UPDATE_HZ): step the month that drives the
+        # volume and ease the music volume toward that month's rainfall intensity
+        try:
+            nonlocal music_month_index, music_month_time_acc, current_music_volume, rain_audio_key
+        except SyntaxError:
+            pass
+        if not (animation_enabled and animationtest is not None):
+            return
+        sel_year = str(year_slider.year)
+        if rainfall_by_year and sel_year in rainfall_by_year:
+            data_for_year = rainfall_by_year[sel_year]
+        else:
+            data_for_year = getattr(animationtest, 'RAIN_DATA', None)
+        if rain_audio is not None:
+            # the synth steps through the months on its own audio clock; only hand it
+            # the precomputed envelope when the year (or the dataset) changes
+            key = (data_generation, sel_year)
+            if key == rain_audio_key:
+                return
+            rain_audio_key = key
+            try:
+                if rain_audio_envelopes is not None and climatology.has_year(sel_year):
+                    rain_audio.set_envelope(rain_audio_envelopes[climatology.index_of(sel_year)])
+                elif data_for_year:
+                    vals = [float(v) for v in list(data_for_year)[:12]]
+                    lo, hi = min(vals), max(vals)
+                    rain_audio.set_envelope(rainaudio.month_params(
+                        [(v - lo) / (hi - lo) if hi > lo else 0.0 for v in vals] + [0.0] * (12 - len(vals))))
+            except Exception:
+                pass
+            return
+        try:
+            if music_available and data_for_year:
+                # advance month time accumulator
+                music_month_time_acc += dt
+                while music_month_time_acc >= MUSIC_MONTH_STEP:
+                    music_month_time_acc -= MUSIC_MONTH_STEP
+                    music_month_index = (music_month_index + 1) % 12
+                # pick month index and value (wrap if data shorter)
+                if len(data_for_year) >= 12:
+                    month_val = float(data_for_year[music_month_index % 12])
+                else:
+                    # if data_for_year is a yearly mean or shorter, fallback to mean
+                    try:
+                        month_val = float(sum(data_for_year) / max(1, len(data_for_year)))
+                    except Exception:
+                        month_val = 0.0
+                # normalize month_val to 0..1 using per-year min/max if available
+                vol = 0.35
+                try:
+                    if climatology is not None and climatology.has_year(sel_year):
+                        # precomputed per-year normalised intensity matrix
+                        t = float(climatology.intensity()[climatology.index_of(sel_year), music_month_index % 12])
+                    elif sel_year in per_year_month_minmax:
+                        lo, hi = per_year_month_minmax[sel_year]
+                        if hi > lo:
+                            t = (month_val - lo) / (hi - lo)
+                        else:
+                            t = 0.0
+                    else:
+                        t = 0.0
+                except Exception:
+                    t = 0.0
+                # curve and map to audible range
+                t = max(0.0, min(1.0, t))
+                target_vol = 0.05 + (t ** 0.9) * 0.95
+                # smooth toward target_vol using exponential smoothing
+                try:
+                    alpha = 1.0 - math.exp(-MUSIC_VOLUME_SMOOTHING * dt)
+                except Exception:
+                    alpha = 0.25
+                current_music_volume = (1.0 - alpha) * current_music_volume + alpha * target_vol
+                pygame.mixer.music.set_volume(max(0.0, min(1.0, current_music_volume)))
+        except Exception:
+            pass
+
+    def print_debug_status(dt):
+        # Terminal-only debug logging (periodic, DEBUG_STATUS)
+        try:
+            print(f"debug: animationtest_loaded={animationtest is not None} anim_surface_set={anim_surface is not None} last_anim_frame_set={last_anim_frame is not None}")
+            if chart_prefetcher is not None and btn_chart.toggled:
+                print(f"debug: chart cache {chart_prefetcher.stats()}")
+            print(f"debug: ui cache {uicache.stats()} compositor {compositor.stats()}")
+            print(f"debug: scheduler {frame_scheduler.stats()}")
+            if rain_audio is not None:
+                print(f"debug: rain audio {rain_audio.stats()}")
+        except Exception:
+            pass
+
+    def add_loading_indicator(name, center, radius=9):
+        # spinner as an overlay item; its key changes with the arc angle so it keeps animating
+        rect = pygame.Rect(0, 0, (radius + 5) * 2, (radius + 5) * 2)
+        rect.center = center
+        compositor.add(compositor_mod.OVERLAY, name, rect, int(time.time() * 30),
+                       lambda surface: draw_loading_indicator(surface, center, radius))
+
+    def set_frozen_backdrop(frame, size):
+        # paused: the last animation frame is scaled to the window once and then reused,
+        # so the compositor sees an unchanged backdrop and pushes nothing behind the chrome
+        if frame is None:
+            compositor.set_backdrop(uicache.filled(ui_cache, size, BG_COLOR), changed=False)
+            return None
+        if frame.get_size() != size:
+            frame = pygame.transform.smoothscale(frame, size)
+        compositor.set_backdrop(frame, changed=False)
+        return frame
+
     def layout(window_w, window_h):
         margin = int(min(window_w, window_h) * 0.03)
         return pygame.Rect(margin, margin, window_w - 2*margin, window_h - 2*margin)
@@ -604,7 +900,27 @@ def main():
 
     running = True
     # cache loaded yearly chart images to avoid repeated disk IO
-    chart_image_cache = {}
+    # in-window chart surfaces, LRU-capped by pixel memory
+    chart_image_cache = chartsurface.ChartCache(backend=CHART_BACKEND) if chartsurface is not None else {}
+    # background renderer that fills chart_image_cache around the slider year
+    chart_prefetcher = None
+    if chartsurface is not None and ChartPrefetcher is not None:
+        chart_prefetcher = ChartPrefetcher(chart_image_cache)
+    # last chart surface shown; reused while scrubbing past years not rendered yet
+    shown_chart_surf = None
+    # slider hover previews: small bars-only charts in their own bounded cache,
+    # rendered by a second prefetcher thread around the hovered year
+    slider_thumb_cache = None
+    slider_thumb_prefetcher = None
+    if chartsurface is not None:
+        slider_thumb_cache = chartsurface.ChartCache(max_bytes=2 * 1024 * 1024, backend='thumb')
+        if ChartPrefetcher is not None:
+            slider_thumb_prefetcher = ChartPrefetcher(slider_thumb_cache, ahead=4, behind=2)
+    shown_thumb = None  # (year, surface) of the last preview drawn
+    # text and cards drawn directly in the frame loop (hover preview), cached like the widgets'
+    ui_cache = uicache.SurfaceCache(max_entries=64)
+    # layered dirty-rect presentation: animation backdrop, chrome, overlays
+    compositor = compositor_mod.Compositor()
     # TSX background surface cache
     tsx_background_surface = None
     # cache last scaled animation frame so we can freeze it when paused
@@ -626,6 +942,31 @@ def main():
     last_chart_rect = None  # pygame.Rect of last drawn chart (for hit testing)
     # chart opacity (0..255). When animation is stopped we set to 0 to hide chart.
     chart_alpha = 255
+    # all-years overview: the atlas is loaded (and built if stale) on a worker the
+    # first time the overview opens, then reused for every later open
+    overview_open = False
+    overview = None  # chartatlas.AtlasOverview once the atlas is ready
+    overview_result = []  # filled by the worker with the loaded Atlas (or None)
+    overview_thread = None
+    chart_dir = os.path.join(os.path.dirname(__file__), 'rainfall_charts')
+
+    def load_overview_atlas(rainfall_snapshot, generation):
+        # tagged with the dataset generation, so an atlas of replaced data is dropped
+        try:
+            # fallback tiles are drawn with svgchart, whose fonts the chart prefetchers share
+            lock = chartsurface.render_lock if chartsurface is not None else None
+            overview_result.append((generation, chartatlas.ensure_atlas(chart_dir, rainfall_snapshot, render_lock=lock)))
+        except Exception as e:
+            print(f"Failed to build chart atlas: {e}")
+            overview_result.append((generation, None))
+
+    # anomaly heatmap of the whole record, built from the loaded climatology on first open
+    heatmap_open = False
+    heatmap = None  # heatmapview.HeatmapView
+    # line chart of the whole record; its LTTB pyramid is rebuilt when the dataset changes
+    timeseries_open = False
+    timeseries_view = None
+    timeseries_clim = None
     
     # Load TSX background if specified
     if TSX_BACKGROUND_PATH and os.path.exists(TSX_BACKGROUND_PATH):
@@ -640,15 +981,106 @@ def main():
             print(f"Error loading TSX background: {e}")
     elif TSX_BACKGROUND_PATH:
         print(f"TSX background file not found: {TSX_BACKGROUND_PATH}")
+    # frame pacing, idle blocking and the low-rate timers
+    frame_scheduler = scheduler.FrameScheduler(FPS)
+    frame_scheduler.add_timer('audio', 1.0 / AUDIO_UPDATE_HZ, update_music_volume)
+    if DEBUG_STATUS:
+        frame_scheduler.add_timer('debug', 1.0, print_debug_status, idle=True)
+    # set during a frame when it shows something a background worker is still producing,
+    # so an idle loop polls for it instead of sleeping for the full idle timeout
+    ui_pending = False
+    startup.mark('ui setup')
     
     while running:
-        for event in pygame.event.get():
+        # pick up a freshly loaded dataset (atomic swap done by the loader thread)
+        if data_loader.generation != data_generation:
+            data_generation = data_loader.generation
+            dataset = data_loader.dataset
+            if dataset.rainfall_by_year:
+                rainfall_by_year = dataset.rainfall_by_year
+                per_year_month_minmax = dataset.per_year_month_minmax
+                climatology = dataset.climatology
+                if rain_audio is not None and climatology is not None:
+                    rain_audio_envelopes = rainaudio.month_params(climatology.intensity())
+                # charts of the previous dataset are stale; the prefetchers are reset
+                # first so an in-flight render of the old data cannot land in the cleared cache
+                if chart_prefetcher is not None:
+                    chart_prefetcher.reset()
+                if chartsurface is not None:
+                    chart_image_cache.clear()
+                if slider_thumb_prefetcher is not None:
+                    slider_thumb_prefetcher.reset()
+                if slider_thumb_cache is not None:
+                    slider_thumb_cache.clear()
+                    shown_thumb = None
+                # the overview's thumbnails too; it is rebuilt on the next open
+                overview = None
+                overview_result.clear()
+        # paced to frame deadlines while animating; blocks in event.wait when idle
+        animating = animation_enabled and animationtest is not None and not tsx_background_surface
+        events = frame_scheduler.next_events(animating, pending=ui_pending)
+        ui_pending = False
+        for event in events:
+            if event.type == viewer_service.event_type:
+                # outcome of an external viewer command
+                if event.action == 'query':
+                    preview_documents = event.result or []
+                elif event.action == 'open' and not event.ok:
+                    print(f"Could not open chart viewer for {event.path}: {event.error}")
+                    if event.path == external_chart_path:
+                        close_external_chart()
+                continue
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.VIDEORESIZE:
-                pass
+                # every widget size changes: drop the cached scaled images and rebuild on next draw
+                uicache.invalidate_all()
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                if overview_open or heatmap_open or timeseries_open:
+                    overview_open = heatmap_open = timeseries_open = False
+                    continue
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == TIMESERIES_KEY and timeseries is not None:
+                timeseries_open = not timeseries_open and climatology is not None
+                overview_open = heatmap_open = False
+                continue
+            elif event.type == pygame.KEYDOWN and event.key == HEATMAP_KEY and heatmapview is not None:
+                heatmap_open = not heatmap_open and climatology is not None
+                overview_open = timeseries_open = False
+                if heatmap_open and heatmap is None:
+                    heatmap = heatmapview.HeatmapView(climatology, YEAR_FONT)
+                continue
+            elif event.type == pygame.KEYDOWN and event.key == OVERVIEW_KEY and chartatlas is not None:
+                overview_open = not overview_open
+                heatmap_open = timeseries_open = False
+            # overview is modal: a click picks that year, nothing underneath sees the event
+            if overview_open:
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and overview is not None:
+                    picked = overview.year_at(event.pos)
+                    if picked is not None:
+                        year_slider.year = int(picked)
+                        overview_open = False
+                continue
+            # the heatmap is modal too: a click selects the year and the heatmap stays open
+            if heatmap_open:
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    picked = heatmap.year_at(event.pos)
+                    if picked is not None and picked.isdigit():
+                        year_slider.year = int(picked)
+                elif event.type == pygame.MOUSEWHEEL:
+                    heatmap.adjust_scale(1.15 ** -event.y)
+                elif event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET):
+                    heatmap.adjust_scale(1.25 if event.key == pygame.K_RIGHTBRACKET else 0.8)
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+                    heatmap.toggle_mode()
+                continue
+            # so is the line chart: wheel zooms, drag pans, a click selects the year
+            if timeseries_open:
+                if timeseries_view is not None:
+                    picked = timeseries_view.handle_event(event, inner)
+                    if picked is not None and picked.isdigit():
+                        year_slider.year = int(picked)
+                continue
             # --- chart drag handling (start/stop/drag) ---
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 # start dragging if user clicked on the last drawn chart while it's visible
@@ -689,25 +1121,32 @@ def main():
         # place chart button above the reload button
         btn_chart.rect = pygame.Rect(base_x + (btn_size + spacing) * 2, base_y - (btn_size + spacing), btn_size, btn_size)
         
-        # Draw background - TSX background if available, otherwise animation or solid color
+        # Animation layer (the compositor's backdrop) - TSX background if available,
+        # otherwise animation or solid color
         if tsx_background_surface:
-            # Scale TSX background to current window size if needed
+            # Scale TSX background to current window size if needed (cached per size)
             current_w, current_h = screen.get_size()
             if (current_w, current_h) != (WIDTH, HEIGHT):
-                scaled_bg = pygame.transform.smoothscale(tsx_background_surface, (current_w, current_h))
-                screen.blit(scaled_bg, (0, 0))
+                compositor.set_backdrop(uicache.scaled(ui_cache, tsx_background_surface, (current_w, current_h)), changed=False)
             else:
-                screen.blit(tsx_background_surface, (0, 0))
+                compositor.set_backdrop(tsx_background_surface, changed=False)
         else:
+            if warm_fade is not None and not rainfall_by_year and data_loader.loading:
+                # hold the warm-start frame (and its animation time) until the first dataset
+                # is in, so the cross-fade goes to the real data and not the sample pattern
+                if warm_backdrop is None or warm_backdrop.get_size() != (w, h):
+                    warm_backdrop = warm_snapshot.scaled((w, h))
+                compositor.set_backdrop(warm_backdrop, changed=False)
             # update animation time
-            if animation_enabled and animationtest is not None:
-                now = time.time()
-                # use FPS_CLOCK to compute dt for smoother timing
-                dt = FPS_CLOCK.get_time() / 1000.0 if FPS_CLOCK else 1.0 / FPS
+            elif animation_enabled and animationtest is not None:
+                # time since the previous frame, from the frame scheduler
+                dt = frame_scheduler.dt
                 anim_frame_time += dt
                 # prepare font and surface on first use
                 if anim_font is None:
-                    monos = pygame.font.match_font('consolas, courier, monospace')
+                    monos = font_resolver.resolve('anim_font', lambda: pygame.font.match_font('consolas, courier, monospace'))
+                    if monos and not os.path.exists(monos):
+                        monos = None
                     if monos:
                         anim_font = pygame.font.Font(monos, animationtest.FONT_SIZE)
                     else:
@@ -716,65 +1155,33 @@ def main():
                     anim_char_w, anim_char_h = sample.get_size()
                     anim_surface = pygame.Surface((anim_char_w * animationtest.COLS + animationtest.PADDING*2,
                                                    anim_char_h * animationtest.ROWS + animationtest.PADDING*2))
+                    if ANIM_RENDER == 'palette' and palettedanim is not None:
+                        try:
+                            paletted_anim = palettedanim.PalettedAnimation(anim_font)
+                        except Exception as e:
+                            print(f"Palettized animation unavailable, using RGB: {e}")
                 # choose rainfall data for selected year
                 sel_year = str(year_slider.year)
                 if rainfall_by_year and sel_year in rainfall_by_year:
                     data_for_year = rainfall_by_year[sel_year]
                 else:
                     data_for_year = getattr(animationtest, 'RAIN_DATA', None)
-                # Update music month timer and set volume based on monthly rainfall
+                # generate grid (the palettized path computes it with NumPy itself)
                 try:
-                    if music_available and data_for_year:
-                        # advance month time accumulator
-                        music_month_time_acc += dt
-                        while music_month_time_acc >= MUSIC_MONTH_STEP:
-                            music_month_time_acc -= MUSIC_MONTH_STEP
-                            music_month_index = (music_month_index + 1) % 12
-                        # pick month index and value (wrap if data shorter)
-                        if len(data_for_year) >= 12:
-                            month_val = float(data_for_year[music_month_index % 12])
-                        else:
-                            # if data_for_year is a yearly mean or shorter, fallback to mean
-                            try:
-                                month_val = float(sum(data_for_year) / max(1, len(data_for_year)))
-                            except Exception:
-                                month_val = 0.0
-                        # normalize month_val to 0..1 using per-year min/max if available
-                        vol = 0.35
-                        try:
-                            if sel_year in per_year_month_minmax:
-                                lo, hi = per_year_month_minmax[sel_year]
-                                if hi > lo:
-                                    t = (month_val - lo) / (hi - lo)
-                                else:
-                                    t = 0.0
-                            else:
-                                t = 0.0
-                        except Exception:
-                            t = 0.0
-                        # curve and map to audible range
-                        t = max(0.0, min(1.0, t))
-                        target_vol = 0.05 + (t ** 0.9) * 0.95
-                        # smooth toward target_vol using exponential smoothing
-                        try:
-                            alpha = 1.0 - math.exp(-MUSIC_VOLUME_SMOOTHING * dt)
-                        except Exception:
-                            alpha = 0.25
-                        current_music_volume = (1.0 - alpha) * current_music_volume + alpha * target_vol
-                        pygame.mixer.music.set_volume(max(0.0, min(1.0, current_music_volume)))
-                except Exception:
-                    pass
-                # generate grid
-                try:
-                    grid = animationtest.generate_fluid_pattern(data_for_year, anim_frame_time,
-                                                               cols=animationtest.COLS, rows=animationtest.ROWS,
-                                                               speed_factor=animationtest.SPEED_FACTOR,
-                                                               base_scale=animationtest.BASE_TIME_SCALE)
+                    if paletted_anim is not None:
+                        grid = None
+                        anim_surface.blit(paletted_anim.render(data_for_year, anim_frame_time), (0, 0))
+                    else:
+                        grid = animationtest.generate_fluid_pattern(data_for_year, anim_frame_time,
+                                                                   cols=animationtest.COLS, rows=animationtest.ROWS,
+                                                                   speed_factor=animationtest.SPEED_FACTOR,
+                                                                   base_scale=animationtest.BASE_TIME_SCALE)
                 except Exception:
                     grid = None
                 # render to anim_surface
                 if anim_surface and anim_char_w is not None and anim_char_h is not None:
-                    anim_surface.fill(animationtest.BG_COLOR if hasattr(animationtest, 'BG_COLOR') else (0,0,0))
+                    if paletted_anim is None:
+                        anim_surface.fill(animationtest.BG_COLOR if hasattr(animationtest, 'BG_COLOR') else (0,0,0))
                     if grid:
                         for row_idx, row in enumerate(grid):
                             y = animationtest.PADDING + row_idx * anim_char_h
@@ -798,8 +1205,15 @@ def main():
                     try:
                         cur_w, cur_h = screen.get_size()
                         scaled = pygame.transform.smoothscale(anim_surface, (cur_w, cur_h))
-                        screen.blit(scaled, (0,0))
-                        last_anim_frame = scaled.copy()
+                        if warm_fade is not None:
+                            # fade the warm-start frame out over the first live frames
+                            compositor.set_backdrop(warm_fade.apply(scaled))
+                            if warm_fade.done:
+                                warm_fade = warm_backdrop = None
+                        else:
+                            compositor.set_backdrop(scaled)
+                        # a fresh surface every frame, so it can be kept for the pause as is
+                        last_anim_frame = scaled
                         # save a snapshot of the first rendered scaled frame for debugging
                         if not _debug_snapshot_saved:
                             try:
@@ -810,67 +1224,163 @@ def main():
                             except Exception as e:
                                 print(f"Failed to save snapshot: {e}")
                     except Exception:
-                        screen.blit(anim_surface, (0,0))
                         try:
                             last_anim_frame = anim_surface.copy()
+                            compositor.set_backdrop(last_anim_frame)
                         except Exception:
                             last_anim_frame = None
                 else:
                     # if we have a cached last frame, show it (freeze); otherwise fallback to BG
-                    if last_anim_frame is not None:
-                        try:
-                            cur_w, cur_h = screen.get_size()
-                            # if cached frame is different size, scale it to current window
-                            if (last_anim_frame.get_width(), last_anim_frame.get_height()) != (cur_w, cur_h):
-                                screen.blit(pygame.transform.smoothscale(last_anim_frame, (cur_w, cur_h)), (0,0))
-                            else:
-                                screen.blit(last_anim_frame, (0,0))
-                        except Exception:
-                            screen.fill(BG_COLOR)
-                    else:
-                        screen.fill(BG_COLOR)
+                    last_anim_frame = set_frozen_backdrop(last_anim_frame, (w, h))
             else:
                 # animation disabled: keep last frame visible (freeze) if present
-                if last_anim_frame is not None:
-                    try:
-                        cur_w, cur_h = screen.get_size()
-                        if (last_anim_frame.get_width(), last_anim_frame.get_height()) != (cur_w, cur_h):
-                            screen.blit(pygame.transform.smoothscale(last_anim_frame, (cur_w, cur_h)), (0,0))
-                        else:
-                            screen.blit(last_anim_frame, (0,0))
-                    except Exception:
-                        screen.fill(BG_COLOR)
-                else:
-                    screen.fill(BG_COLOR)
+                last_anim_frame = set_frozen_backdrop(last_anim_frame, (w, h))
         
-    # Panel layout (in-window chart rendering removed; charts are external)
+        # In-window chart panel: chart for the slider year, rendered in memory and
+        # drawn at chart_pos (draggable); default place near bottom-left.
         max_panel_w = int(w * 0.45)
         max_panel_h = int(h * 0.60)
         panel_x = int(w * 0.047)
         # default place near bottom with a small bottom margin
         bottom_margin = int(h * 0.04)
-        # We no longer draw the in-window chart panel. Clear hit-test rect to prevent dragging.
         last_chart_rect = None
-        btn_start.draw(screen)
-        btn_stop.draw(screen)
-        btn_reload.draw(screen)
-        btn_chart.draw(screen)
-        # draw year slider on bottom center
-        year_slider.draw(screen, UI_FONT)
-        # Terminal-only debug logging (periodic)
-        try:
-            # print status once per second
-            if not hasattr(main, '_last_dbg_print'):
-                main._last_dbg_print = 0.0
-            nowt = time.time()
-            if (nowt - main._last_dbg_print) >= 1.0:
-                main._last_dbg_print = nowt
-                print(f"debug: animationtest_loaded={animationtest is not None} anim_surface_set={anim_surface is not None} last_anim_frame_set={last_anim_frame is not None}")
-        except Exception:
-            pass
-        pygame.display.flip()
-        FPS_CLOCK.tick(FPS)
+        if (btn_chart.toggled and btn_chart.enabled and chart_alpha > 0
+                and not CHART_EXTERNAL_VIEWER and chartsurface is not None and rainfall_by_year):
+            chart_year = str(year_slider.year)
+            chart_vals = rainfall_by_year.get(chart_year)
+            if chart_vals:
+                panel_size = chartsurface.quantize_size(max_panel_w, min(max_panel_h, max_panel_w // 2))
+                if chart_prefetcher is not None:
+                    chart_prefetcher.update(chart_year, panel_size, rainfall_by_year)
+                chart_surf = chart_image_cache.lookup((chart_year, panel_size))
+                if chart_surf is None and year_slider.dragging and shown_chart_surf is not None:
+                    # still scrubbing: keep the previous chart up, the prefetcher renders this year first
+                    chart_surf = shown_chart_surf
+                    ui_pending = True
+                elif chart_surf is None:
+                    try:
+                        chart_surf, keepalive = chart_image_cache.render(chart_year, chart_vals, panel_size)
+                        chart_image_cache.put((chart_year, panel_size), chart_surf, keepalive)
+                    except Exception:
+                        chart_surf = None
+                shown_chart_surf = chart_surf
+                if chart_surf is not None:
+                    pw, ph = chart_surf.get_size()
+                    if chart_pos is None:
+                        cx, cy = panel_x, h - bottom_margin - ph
+                    else:
+                        cx, cy = chart_pos
+                    # keep at least a corner of the panel on screen so it can be dragged back
+                    cx = max(40 - pw, min(w - 40, cx))
+                    cy = max(0, min(h - 40, cy))
+                    last_chart_rect = pygame.Rect(cx, cy, pw, ph)
+
+                    def draw_chart_panel(surface, surf=chart_surf, rect=last_chart_rect, alpha=chart_alpha):
+                        surf.set_alpha(alpha if alpha < 255 else None)
+                        surface.blit(surf, rect.topleft)
+                        pygame.draw.rect(surface, (100, 120, 140), rect, 1)
+                    compositor.add(compositor_mod.CHROME, 'chart', last_chart_rect,
+                                   (id(chart_surf), chart_alpha), draw_chart_panel)
+        for name, btn in (('start', btn_start), ('stop', btn_stop), ('reload', btn_reload), ('chart', btn_chart)):
+            compositor.add(compositor_mod.CHROME, 'btn_' + name, btn.rect, btn.state_key(), btn.draw)
+        # year slider on bottom center
+        compositor.add(compositor_mod.CHROME, 'slider', year_slider.bounds(UI_FONT), year_slider.year,
+                       lambda surface: year_slider.draw(surface, UI_FONT))
+        # hover preview above the slider. Nothing is rendered here: the thumbnail
+        # comes from slider_thumb_cache, and until the prefetcher has drawn the
+        # hovered year the previous preview stays up.
+        hover_year = None if overview_open or heatmap_open or timeseries_open else year_slider.hover_year(pygame.mouse.get_pos())
+        if hover_year is not None and rainfall_by_year and slider_thumb_cache is not None:
+            hover_key = str(hover_year)
+            hover_vals = rainfall_by_year.get(hover_key)
+            if hover_vals:
+                if slider_thumb_prefetcher is not None:
+                    slider_thumb_prefetcher.update(hover_key, SLIDER_PREVIEW_SIZE, rainfall_by_year)
+                thumb = slider_thumb_cache.lookup((hover_key, SLIDER_PREVIEW_SIZE))
+                if thumb is not None:
+                    shown_thumb = (hover_key, thumb)
+                else:
+                    ui_pending = True
+                if shown_thumb is not None:
+                    label = uicache.text(ui_cache, YEAR_FONT, f"{hover_key}  {sum(hover_vals):,.0f} mm", (255, 255, 255))
+                    tw, th = SLIDER_PREVIEW_SIZE
+                    pad = 6
+                    card_w = max(tw, label.get_width()) + pad * 2
+                    card_h = th + label.get_height() + pad * 3
+                    card_x = year_slider.year_to_pos(hover_year) - card_w // 2
+                    card_x = max(4, min(w - card_w - 4, card_x))
+                    card_y = year_slider.rect.y - card_h - 2
+                    card = uicache.filled(ui_cache, (card_w, card_h), (0, 0, 0, 200), border_radius=6)
+                    thumb_pos = (card_x + (card_w - tw) // 2, card_y + pad * 2 + label.get_height())
+
+                    def draw_hover_card(surface, card=card, label=label, thumb=shown_thumb, hover_key=hover_key,
+                                        card_pos=(card_x, card_y), thumb_pos=thumb_pos, pad=pad):
+                        surface.blit(card, card_pos)
+                        surface.blit(label, (card_pos[0] + pad, card_pos[1] + pad))
+                        surface.blit(thumb[1], thumb_pos)
+                        if thumb[0] != hover_key:
+                            # outline the previous preview while the hovered year renders
+                            pygame.draw.rect(surface, (100, 120, 140), pygame.Rect(thumb_pos, SLIDER_PREVIEW_SIZE), 1)
+                    compositor.add(compositor_mod.OVERLAY, 'hover', pygame.Rect(card_x, card_y, card_w, card_h),
+                                   (hover_key, shown_thumb[0], id(shown_thumb[1])), draw_hover_card)
+        if overview_open:
+            if overview is None and overview_result:
+                generation, atlas = overview_result.pop()
+                overview_thread = None
+                if generation != data_generation:
+                    pass  # built from the previous dataset; a fresh one starts below
+                elif atlas is not None:
+                    overview = chartatlas.AtlasOverview(atlas.convert(), YEAR_FONT)
+                else:
+                    overview_open = False
+            if overview_open and overview is None and overview_thread is None:
+                overview_thread = threading.Thread(target=load_overview_atlas, args=(rainfall_by_year, data_generation),
+                                                   name='hkvis-atlas', daemon=True)
+                overview_thread.start()
+            if overview is not None:
+                mouse_pos = pygame.mouse.get_pos()
+                # inflated: the selection outline of edge cells reaches past `inner`
+                compositor.add(compositor_mod.OVERLAY, 'overview', inner.inflate(8, 8),
+                               (id(overview), year_slider.year, overview.year_at(mouse_pos)),
+                               lambda surface, rect=inner, pos=mouse_pos: overview.draw(surface, rect, year_slider.year, pos))
+            else:
+                ui_pending = True
+                add_loading_indicator('overview', inner.center)
+        if heatmap_open:
+            heatmap.set_climatology(climatology)
+            mouse_pos = pygame.mouse.get_pos()
+            compositor.add(compositor_mod.OVERLAY, 'heatmap', inner, heatmap.state_key(year_slider.year, mouse_pos),
+                           lambda surface, rect=inner, pos=mouse_pos: heatmap.draw(surface, rect, year_slider.year, pos))
+        if timeseries_open:
+            if timeseries_clim is not climatology:
+                timeseries_view = timeseries.TimeSeriesView.from_climatology(climatology, YEAR_FONT)
+                timeseries_clim = climatology
+            if timeseries_view.update():
+                ui_pending = True  # keep easing the zoom/pan
+            compositor.add(compositor_mod.OVERLAY, 'timeseries', inner, timeseries_view.state_key(year_slider.year),
+                           lambda surface, rect=inner: timeseries_view.draw(surface, rect, year_slider.year))
+        # small loading indicator while the background loader is busy
+        if data_loader.loading:
+            ui_pending = True
+            add_loading_indicator('loading', (inner.x + 18, inner.y + 18))
+        # push only what changed (everything while the animation runs)
+        compositor.present()
+        if startup.first_frame_at is None:
+            startup.first_frame()
+            if startup.exit_after_first_frame:
+                running = False
 
+    if WARM_START and warmstart is not None and animationtest is not None and not tsx_background_surface:
+        warmstart.save_snapshot(anim_surface, year_slider.year, anim_frame_time,
+                                warmstart.pattern_params(animationtest, ANIM_RENDER))
+    data_loader.stop()
+    viewer_service.stop()
+    if rain_audio is not None:
+        rain_audio.stop()
+    if chart_prefetcher is not None:
+        chart_prefetcher.stop()
+    if slider_thumb_prefetcher is not None:
+        slider_thumb_prefetcher.stop()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,137 @@
+// Plays the precomputed animation from docs/bundle/ (built by `python -m hkvis_core.webbundle`).
+// Nothing is simulated here: frames, glyph masks and colours all come from the Python engine,
+// the page only inflates the per-year pack and blits glyph masks into an ImageData.
+(function(){
+	const BASE = 'bundle/';
+	const canvas = document.getElementById('animCanvas');
+	const ctx = canvas.getContext('2d');
+	const status = document.getElementById('bundleStatus');
+	const chartImg = document.getElementById('yearChart');
+	const playPauseBtn = document.getElementById('playPauseBtn');
+	const yearSelect = document.getElementById('yearSelect');
+
+	async function fetchBytes(name){
+		const r = await fetch(BASE + name);
+		if(!r.ok) throw new Error(name + ': HTTP ' + r.status);
+		return new Uint8Array(await r.arrayBuffer());
+	}
+	async function inflate(bytes){
+		// packs are zlib streams ('deflate' in the Compression Streams API)
+		const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+		return new Uint8Array(await new Response(stream).arrayBuffer());
+	}
+	async function loadPack(name){
+		const raw = await fetchBytes(name);
+		if(String.fromCharCode(raw[0], raw[1], raw[2], raw[3]) !== 'HKF1') throw new Error(name + ': not a frame pack');
+		const dv = new DataView(raw.buffer, raw.byteOffset, 12);
+		const pack = { cols: dv.getUint16(4, true), rows: dv.getUint16(6, true), frames: dv.getUint16(8, true), fps: dv.getUint16(10, true) };
+		// cell-major: byte (row * cols + col) * frames + frame
+		pack.cells = await inflate(raw.subarray(12));
+		return pack;
+	}
+
+	let manifest = null, glyphs = null, palette = null, sparkle = null, image = null;
+	let pack = null, selectedYear = null;
+	const packCache = new Map();  // year -> pack, the few most recent only
+	const PACK_CACHE_SIZE = 4;
+
+	async function selectYear(year){
+		selectedYear = year;
+		const entry = manifest.years[year];
+		chartImg.src = BASE + entry.chart;
+		let p = packCache.get(year);
+		if(!p){
+			p = await loadPack(entry.pack);
+			packCache.set(year, p);
+			if(packCache.size > PACK_CACHE_SIZE) packCache.delete(packCache.keys().next().value);
+		}
+		if(selectedYear === year) pack = p;
+	}
+
+	function drawFrame(f){
+		const m = manifest, cols = m.cols, rows = m.rows, frames = m.frames;
+		const [cw, ch] = m.cell, pad = m.padding, width = image.width;
+		const px = image.data, shades = m.shades, glyphSize = cw * ch;
+		const lift = m.sparkle_max / (m.sparkle_levels - 1);
+		const [bgR, bgG, bgB] = m.background;
+		for(let i = 0; i < px.length; i += 4){ px[i] = bgR; px[i+1] = bgG; px[i+2] = bgB; px[i+3] = 255; }
+		for(let r = 0; r < rows; r++){
+			for(let c = 0; c < cols; c++){
+				const cell = (r * cols + c) * frames + f;
+				const v = pack.cells[cell];
+				const g = (v / shades) | 0, s = v % shades;
+				// same white lift as final_cell_color's white_factor
+				const w = sparkle.cells[cell] * lift;
+				const p = (r * shades + s) * 3;
+				const cr = 255 * w + palette[p] * (1 - w), cg = 255 * w + palette[p+1] * (1 - w), cb = 255 * w + palette[p+2] * (1 - w);
+				const mask = g * glyphSize;
+				const x0 = pad + c * cw, y0 = pad + r * ch;
+				for(let y = 0; y < ch; y++){
+					let o = ((y0 + y) * width + x0) * 4, mo = mask + y * cw;
+					for(let x = 0; x < cw; x++, o += 4){
+						const a = glyphs[mo + x];
+						if(a === 0) continue;
+						const t = a / 255;
+						px[o] = bgR + (cr - bgR) * t; px[o+1] = bgG + (cg - bgG) * t; px[o+2] = bgB + (cb - bgB) * t;
+					}
+				}
+			}
+		}
+		ctx.putImageData(image, 0, 0);
+	}
+
+	let playing = true, clock = 0, last = performance.now();
+	function tick(now){
+		if(playing) clock += Math.min(0.1, (now - last) / 1000);
+		last = now;
+		if(pack) drawFrame(Math.floor(clock * manifest.fps) % manifest.frames);
+		requestAnimationFrame(tick);
+	}
+
+	function bindControls(){
+		const audio = new Audio('assets/rain_sound_image.mp3');
+		audio.loop = true;
+		audio.volume = 0.36;
+		playPauseBtn.addEventListener('click', ()=>{
+			playing = !playing;
+			playPauseBtn.textContent = playing ? 'Pause' : 'Play';
+			if(playing){ audio.play().catch(()=>{}); } else { audio.pause(); }
+		});
+		yearSelect.addEventListener('change', ()=>{ selectYear(yearSelect.value).catch(e => { status.textContent = e.message; }); });
+		window.addEventListener('pagehide', ()=>{ audio.pause(); });
+	}
+
+	function startFallback(reason){
+		// no bundle published yet: run the in-browser port instead of an empty canvas
+		status.textContent = 'Showing the in-browser approximation (' + reason + '). Build the exact frames with: python -m hkvis_core.webbundle';
+		chartImg.hidden = true;
+		const script = document.createElement('script');
+		script.src = 'fallback.js';
+		document.body.appendChild(script);
+	}
+
+	(async function init(){
+		try{
+			manifest = JSON.parse(new TextDecoder().decode(await fetchBytes('manifest.json')));
+			[glyphs, palette, sparkle] = await Promise.all([fetchBytes(manifest.glyphs), fetchBytes(manifest.palette), loadPack(manifest.sparkle)]);
+			canvas.width = manifest.cols * manifest.cell[0] + manifest.padding * 2;
+			canvas.height = manifest.rows * manifest.cell[1] + manifest.padding * 2;
+			image = ctx.createImageData(canvas.width, canvas.height);
+			const years = Object.keys(manifest.years).sort((a, b) => a - b);
+			for(const y of years){
+				const opt = document.createElement('option');
+				opt.value = y;
+				opt.textContent = y + ' (' + manifest.years[y].total_mm + ' mm)';
+				yearSelect.appendChild(opt);
+			}
+			yearSelect.value = years[years.length - 1];
+			await selectYear(yearSelect.value);
+			status.textContent = '';
+			bindControls();
+			requestAnimationFrame(tick);
+		}catch(e){
+			yearSelect.innerHTML = '';
+			startFallback(e.message);
+		}
+	})();
+})();
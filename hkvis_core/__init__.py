@@ -9,6 +9,30 @@ Modules included:
 - scraping_utils
 - saveallcharts
 - Viusalizedatatest
+- fetcher
+- datacache
+- bulkfetch
+- dataloader
+- climatology
+- queryservice
+- chartsurface
+- chartprefetch
+- svgchart
+- startupprofile
+- chartatlas
+- uicache
+- compositor
+- scheduler
+- assetbundle
+- rainaudio
+- viewerproc
+- webbundle
+- framestream
+- palettedanim
+- heatmapview
+- timeseries
+- warmstart
+- pipeline
 
 Import as:
     from hkvis_core.viewchart import load_rainfall_data
@@ -23,4 +47,28 @@ __all__ = [
     'scraping_utils',
     'saveallcharts',
     'Viusalizedatatest',
+    'fetcher',
+    'datacache',
+    'bulkfetch',
+    'dataloader',
+    'climatology',
+    'queryservice',
+    'chartsurface',
+    'chartprefetch',
+    'svgchart',
+    'startupprofile',
+    'chartatlas',
+    'uicache',
+    'compositor',
+    'scheduler',
+    'assetbundle',
+    'rainaudio',
+    'viewerproc',
+    'webbundle',
+    'framestream',
+    'palettedanim',
+    'heatmapview',
+    'timeseries',
+    'warmstart',
+    'pipeline',
 ]
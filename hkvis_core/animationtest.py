@@ -82,6 +82,53 @@ def generate_fluid_pattern(data, global_time, cols=COLS, rows=ROWS, speed_factor
         grid.append(row_chars)
     return grid
 
+# --- vectorised pattern (NumPy; imported on first use) ---
+def fluid_norm_array(data, global_time, cols=COLS, rows=ROWS, speed_factor=SPEED_FACTOR, base_scale=BASE_TIME_SCALE):
+    """`generate_fluid_pattern` for the whole grid at once: a (rows, cols) array of norms."""
+    import numpy as np
+    if data:
+        max_val = max(max(data), 1.0)
+        mean_intensity = min(1.0, (sum(data) / len(data)) / GLOBAL_MEAN_CAP)
+    else:
+        max_val = 1.0
+        mean_intensity = 0.0
+    data_speed_multiplier = 0.3 + (mean_intensity ** 0.7) * 2.0
+    effective_speed_factor = speed_factor * data_speed_multiplier * SPEED_MULTIPLIER
+    x = np.arange(cols, dtype=float)[None, :]
+    y = np.arange(rows, dtype=float)[:, None]
+    data_index = (np.arange(cols) * len(data)) // cols
+    intensity = (np.asarray(data, dtype=float)[data_index] / max_val)[None, :]
+    t = global_time * (base_scale + intensity * effective_speed_factor)
+    flowX = x + (t * 0.2)
+    flowY = y - (t * 0.8)
+    wave1 = np.sin((x * 0.18) + (flowY * 0.12) + (t * 0.05)) * 0.5 + 0.5
+    wave2 = np.sin((x * 0.08) + (flowY * 0.22) + (t * 0.08)) * 0.4 + 0.6
+    wave3 = np.cos((x * 0.25) + (flowY * 0.08) - (t * 0.06)) * 0.5 + 0.5
+    wave4 = np.sin((flowX * 0.15) + (flowY * 0.35) + (t * 0.1)) * 0.3 + 0.7
+    horizontalFlow = np.sin((x * 0.15) + (t * 0.12)) * 0.3
+    diagonalFlow = np.cos((x * 0.08) + (y * 0.08) + (t * 0.09)) * 0.25
+    combined = (wave1 + wave2 + wave3 + wave4) / 4.0 + horizontalFlow + diagonalFlow
+    modulated = combined * intensity
+    noise1 = np.sin(x * 0.5 + flowY * 0.4 + t * 0.15) * 0.2
+    noise2 = np.cos(x * 0.7 + y * 0.3 + t * 0.12) * 0.15
+    randomness = np.sin(x * 1.2 + y * 0.8 + t * 0.18) * np.cos(x * 0.6 + y * 1.1) * 0.25
+    charRandom = np.sin(x * 0.3 + y * 0.5 + t * 0.1) * 0.1
+    return (np.tanh(modulated + noise1 + noise2 + randomness + charRandom) + 1.0) / 2.0
+
+def glyph_indices(norm):
+    """Index into ASCII_CHARS for each norm (same rounding as the per-cell loop)."""
+    import numpy as np
+    return np.clip((norm * (len(ASCII_CHARS) - 1)).astype(int), 0, len(ASCII_CHARS) - 1)
+
+def white_factor_array(global_time, cols=COLS, rows=ROWS):
+    """(rows, cols) sparkle amount toward white, as computed per cell in the render loop."""
+    import numpy as np
+    seed = (np.arange(rows, dtype=np.int64)[:, None] * 1315423911) ^ (np.arange(cols, dtype=np.int64)[None, :] * 2654435761)
+    phase = (seed % 1000) / 1000.0
+    white_osc = (np.sin(global_time * 1.5 + phase * 6.28318) + 1) / 2
+    sparsity = ((seed >> 3) & 31) / 31.0
+    return (white_osc ** 3) * 0.9 * (sparsity * 0.8)
+
 def lerp_color(a, b, t):
     return (int(a[0] + (b[0]-a[0]) * t),
             int(a[1] + (b[1]-a[1]) * t),
@@ -0,0 +1,196 @@
+"""Packed UI image bundle and cached font discovery.
+
+`image/ui_bundle.hkb` holds every UI image as raw RGBA pixels behind a small
+JSON header, so startup reads one file and skips PNG decoding:
+
+    b'HKB1' | u32 header length | header JSON | pixel data
+
+The header lists each image's offset and size plus the size and SHA-1 of the
+PNG it came from (content, not mtime: the PyInstaller one-file build unpacks
+`image/` into a new temp folder on every launch and zip releases reset
+mtimes). `load_images` falls back to the PNGs when any source changed or the
+bundle is missing, truncated or corrupt; it never writes at runtime. The
+release workflow builds it before packaging, and a source checkout with
+
+    python -m hkvis_core.assetbundle [--image-dir image]
+
+`FontResolver` remembers font lookups (`pygame.font.get_fonts()` scans and
+`match_font` calls run fc-list or walk the font folders) in a JSON file in the
+user cache directory. Entries are keyed by the font path / query and only
+trusted while the fingerprint of the packaged font and the system font
+folders is unchanged.
+"""
+import os
+import sys
+import json
+import struct
+import hashlib
+import argparse
+
+import pygame
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IMAGE_DIR = os.path.join(script_dir, '..', 'image')
+BUNDLE_NAME = 'ui_bundle.hkb'
+MAGIC = b'HKB1'
+UI_IMAGES = ('button_on', 'button_off', 'start_black', 'start_green', 'stop_black', 'stop_red',
+             'reload_black', 'chart_off', 'chart_on')
+
+CACHE_DIR = os.environ.get('HKVIS_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'hkvis')
+FONT_CACHE_PATH = os.path.join(CACHE_DIR, 'fonts.json')
+SYSTEM_FONT_DIRS = (
+    '/usr/share/fonts', '/usr/local/share/fonts', os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'), '/Library/Fonts', '/System/Library/Fonts',
+    os.path.expanduser('~/Library/Fonts'), os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+)
+
+
+def _source_stamp(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [len(data), hashlib.sha1(data).hexdigest()]
+
+
+def bundle_path(image_dir=DEFAULT_IMAGE_DIR):
+    return os.path.join(image_dir, BUNDLE_NAME)
+
+
+def build_bundle(image_dir=DEFAULT_IMAGE_DIR, names=UI_IMAGES, images=None):
+    """Write the bundle for `names`; `images` may pass already-loaded surfaces."""
+    entries = {}
+    chunks = []
+    offset = 0
+    for name in names:
+        src = os.path.join(image_dir, name + '.png')
+        surf = images[name] if images and name in images else pygame.image.load(src)
+        data = pygame.image.tobytes(surf, 'RGBA')
+        entries[name] = {'offset': offset, 'size': list(surf.get_size()), 'source': _source_stamp(src)}
+        chunks.append(data)
+        offset += len(data)
+    header = json.dumps({'images': entries}).encode('utf-8')
+    path = bundle_path(image_dir)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for data in chunks:
+            f.write(data)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def read_bundle(image_dir=DEFAULT_IMAGE_DIR, names=UI_IMAGES):
+    """{name: Surface} (not yet converted) from a fresh bundle, or None."""
+    try:
+        with open(bundle_path(image_dir), 'rb') as f:
+            blob = f.read()
+    except OSError:
+        return None
+    if blob[:4] != MAGIC:
+        return None
+    try:
+        (hlen,) = struct.unpack('<I', blob[4:8])
+        base = 8 + hlen
+        if base > len(blob):
+            return None  # truncated inside the header
+        entries = json.loads(blob[8:base].decode('utf-8'))['images']
+        images = {}
+        for name in names:
+            e = entries.get(name)
+            if e is None:
+                return None
+            try:
+                if _source_stamp(os.path.join(image_dir, name + '.png')) != e['source']:
+                    return None
+            except OSError:
+                pass  # shipped without the PNGs: the bundle is the only copy
+            w, h = e['size']
+            start = base + e['offset']
+            if w <= 0 or h <= 0 or e['offset'] < 0 or start + w * h * 4 > len(blob):
+                return None  # truncated pixel data
+            images[name] = pygame.image.frombytes(blob[start:start + w * h * 4], (w, h), 'RGBA')
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None  # corrupt: fall back to the PNGs
+    return images
+
+
+def load_images(image_dir=DEFAULT_IMAGE_DIR, names=UI_IMAGES):
+    """UI images converted for the display (call after set_mode).
+
+    Reads the bundle when it is current; otherwise loads the PNGs. The
+    bundle is built ahead of time (`main`), not here.
+    """
+    images = read_bundle(image_dir, names)
+    if images is None:
+        images = {name: pygame.image.load(os.path.join(image_dir, name + '.png')) for name in names}
+    return {name: surf.convert_alpha() for name, surf in images.items()}
+
+
+def font_fingerprint(extra_paths=()):
+    """Changes when the packaged font or a system font folder changes."""
+    h = hashlib.sha1()
+    for path in tuple(extra_paths) + SYSTEM_FONT_DIRS:
+        if not path or not os.path.exists(path):
+            continue
+        try:
+            h.update(f'{path}:{os.stat(path).st_mtime_ns}:{os.stat(path).st_size}'.encode())
+            if os.path.isdir(path):
+                # font packages usually install into a subfolder per family
+                for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                    if entry.is_dir():
+                        h.update(f'{entry.path}:{entry.stat().st_mtime_ns}'.encode())
+        except OSError:
+            continue
+    return h.hexdigest()
+
+
+class FontResolver:
+    """Persistent memo of font lookups, invalidated when the font set changes."""
+
+    def __init__(self, cache_path=FONT_CACHE_PATH, packaged_fonts=()):
+        self.cache_path = cache_path
+        self.fingerprint = font_fingerprint(packaged_fonts)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(cache_path) as f:
+                data = json.load(f)
+            if data.get('fingerprint') == self.fingerprint:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    def resolve(self, key, finder):
+        """Cached result of `finder()` (a font path or name, or None) for `key`."""
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        value = finder()
+        self.entries[key] = value
+        self._save()
+        return value
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path + '.tmp', 'w') as f:
+                json.dump({'fingerprint': self.fingerprint, 'entries': self.entries}, f)
+            os.replace(self.cache_path + '.tmp', self.cache_path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pack the UI images into one pre-decoded bundle.')
+    parser.add_argument('--image-dir', default=DEFAULT_IMAGE_DIR)
+    args = parser.parse_args(argv)
+    path = build_bundle(args.image_dir)
+    print(f'Wrote {path} ({os.path.getsize(path)} bytes, {len(UI_IMAGES)} images)')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Concurrent bulk download of HKO monthly files for many stations/elements.
+
+Every (station, element) pair is fetched with `fetcher.fetch` on a bounded
+thread pool that shares one connection-pooled session. Requests to the same
+host are spaced by a per-host rate limit, the whole run is bounded by a global
+timeout, and each downloaded file is parsed straight into `datacache`.
+
+The global timeout is passed to `fetcher.fetch` as its deadline, so a download
+reported as 'timeout' stops at its next chunk and never replaces its file,
+even though its worker thread may still be winding down when `bulk_fetch`
+returns. A file that downloaded but could not be parsed (e.g. it lacks the
+element) keeps its download status and has the parse error in `cache_error`.
+
+Usage:
+    python -m hkvis_core.bulkfetch --stations HKO,KP --elements RF,MEANTEMP
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+try:
+    from hkvis_core import fetcher, datacache
+except ImportError:
+    import fetcher
+    import datacache
+
+# Override with --url-template or the BULK_URL_TEMPLATE environment variable
+DEFAULT_URL_TEMPLATE = "https://www.hko.gov.hk/cis/individual_month/monthlyElement.xml?stn={station}&ele={element}"
+DEFAULT_STATIONS = ['HKO']
+DEFAULT_ELEMENTS = ['RF']
+DEFAULT_WORKERS = 8
+DEFAULT_HOST_RATE = 4.0        # requests per second per host
+DEFAULT_GLOBAL_TIMEOUT = 120.0  # seconds for the whole run
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'mirror')
+
+BulkItem = namedtuple('BulkItem', ['station', 'element', 'url', 'path'])
+BulkRow = namedtuple('BulkRow', ['station', 'element', 'status', 'bytes', 'latency', 'error', 'cache_error'])
+
+
+class HostRateLimiter:
+    """Space out request starts per host to at most `rate` per second."""
+
+    def __init__(self, rate=DEFAULT_HOST_RATE):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url, deadline=None):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if deadline is not None and slot > deadline:
+            raise TimeoutError('global timeout reached before request slot')
+        if delay > 0:
+            time.sleep(delay)
+
+
+def plan(stations, elements, url_template=DEFAULT_URL_TEMPLATE, out_dir=DEFAULT_OUT_DIR):
+    items = []
+    for station in stations:
+        for element in elements:
+            url = url_template.format(station=station, element=element)
+            path = os.path.abspath(os.path.join(out_dir, f'{station}_{element}.xml'))
+            items.append(BulkItem(station, element, url, path))
+    return items
+
+
+def _fetch_one(item, session, limiter, deadline, timeout):
+    limiter.acquire(item.url, deadline)
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError('global timeout reached')
+    result = fetcher.fetch(item.url, item.path, session=session,
+                           timeout=min(timeout, remaining), deadline=deadline)
+    # warm the parsed-data cache so the app and chart scripts start hot;
+    # a parse failure does not undo the download
+    cache_error = None
+    try:
+        datacache.load_element(item.path, item.element)
+    except Exception as e:
+        cache_error = str(e)
+    return result, cache_error
+
+
+def bulk_fetch(items, workers=DEFAULT_WORKERS, host_rate=DEFAULT_HOST_RATE,
+               global_timeout=DEFAULT_GLOBAL_TIMEOUT, timeout=fetcher.DEFAULT_TIMEOUT, session=None):
+    """Fetch all `items` concurrently; return one BulkRow per item (same order)."""
+    session = session or fetcher.get_session(pool_size=max(workers, fetcher.POOL_SIZE))
+    limiter = HostRateLimiter(host_rate)
+    deadline = time.monotonic() + global_timeout
+    starts = {}
+    rows = [None] * len(items)
+
+    def run(i, item):
+        starts[i] = time.perf_counter()
+        return _fetch_one(item, session, limiter, deadline, timeout)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(run, i, item): i for i, item in enumerate(items)}
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for fut, i in futures.items():
+            item = items[i]
+            if fut not in done:
+                # still running: fetch's deadline stops it without touching the file
+                fut.cancel()
+                rows[i] = BulkRow(item.station, item.element, 'timeout', 0, None, 'global timeout', None)
+                continue
+            try:
+                res, cache_error = fut.result()
+                rows[i] = BulkRow(item.station, item.element, res.status, res.bytes, res.elapsed, None, cache_error)
+            except TimeoutError as e:
+                latency = time.perf_counter() - starts[i] if i in starts else None
+                rows[i] = BulkRow(item.station, item.element, 'timeout', 0, latency, str(e), None)
+            except Exception as e:
+                latency = time.perf_counter() - starts[i] if i in starts else None
+                rows[i] = BulkRow(item.station, item.element, 'error', 0, latency, str(e), None)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return rows
+
+
+def format_summary(rows, wall_time):
+    lines = [f"{'station':<8} {'element':<10} {'status':>7} {'bytes':>10} {'latency':>9}"]
+    for r in rows:
+        latency = f"{r.latency * 1000:.0f}ms" if r.latency is not None else '-'
+        lines.append(f"{r.station:<8} {r.element:<10} {str(r.status):>7} {r.bytes:>10} {latency:>9}"
+                     + (f"  {r.error}" if r.error else '')
+                     + (f"  not cached: {r.cache_error}" if r.cache_error else ''))
+    ok = sum(1 for r in rows if isinstance(r.status, int))
+    unparsed = sum(1 for r in rows if r.cache_error)
+    total = sum(r.bytes for r in rows)
+    lines.append(f"{ok}/{len(rows)} files ok, {total} bytes in {wall_time:.2f}s"
+                 + (f", {unparsed} could not be parsed" if unparsed else ''))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-download HKO monthly files.')
+    parser.add_argument('--stations', default=','.join(DEFAULT_STATIONS))
+    parser.add_argument('--elements', default=','.join(DEFAULT_ELEMENTS))
+    parser.add_argument('--url-template', default=os.environ.get('BULK_URL_TEMPLATE', DEFAULT_URL_TEMPLATE))
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--host-rate', type=float, default=DEFAULT_HOST_RATE)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_GLOBAL_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    stations = [s.strip() for s in args.stations.split(',') if s.strip()]
+    elements = [e.strip() for e in args.elements.split(',') if e.strip()]
+    items = plan(stations, elements, args.url_template, args.out_dir)
+    start = time.perf_counter()
+    rows = bulk_fetch(items, workers=args.workers, host_rate=args.host_rate, global_timeout=args.timeout)
+    print(format_summary(rows, time.perf_counter() - start))
+    return 0 if all(isinstance(r.status, int) and not r.cache_error for r in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
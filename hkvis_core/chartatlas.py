@@ -0,0 +1,285 @@
+"""Packed thumbnail atlas of the per-year charts.
+
+`build_atlas` scales every `rainfall_charts/rainfall_<year>.png` down to a
+thumbnail and packs them row by row into one `atlas.png` next to an
+`atlas.json` index:
+
+    {"thumb": [w, h], "columns": c,
+     "tiles": {"1884": [x, y], ...},
+     "sources": {"1884": [size, mtime_ns], ...}}
+
+Rebuilds are incremental: tiles whose source PNG is unchanged are copied from
+the previous atlas instead of being decoded and scaled again. Years without a
+PNG can be drawn with `svgchart.render_chart_raster` when the rainfall data is
+passed in.
+
+`AtlasOverview` draws all years as a small-multiples grid from the single
+atlas texture (Main.py's overview screen) and maps clicks back to years.
+
+    python -m hkvis_core.chartatlas [--charts rainfall_charts] [--thumb 200x100]
+"""
+import os
+import re
+import contextlib
+import sys
+import json
+import time
+import argparse
+
+import pygame
+
+try:
+    from hkvis_core import datacache, svgchart
+except ImportError:
+    import datacache
+    import svgchart
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CHART_DIR = os.path.join(script_dir, '..', 'rainfall_charts')
+ATLAS_NAME = 'atlas.png'
+INDEX_NAME = 'atlas.json'
+THUMB_SIZE = (200, 100)
+COLUMNS = 12
+CHART_RE = re.compile(r'^rainfall_(\d{4})\.png$')
+
+
+def atlas_paths(chart_dir=DEFAULT_CHART_DIR):
+    return os.path.join(chart_dir, ATLAS_NAME), os.path.join(chart_dir, INDEX_NAME)
+
+
+def chart_sources(chart_dir=DEFAULT_CHART_DIR):
+    """{year: (path, [size, mtime_ns])} for the chart PNGs in `chart_dir`."""
+    sources = {}
+    try:
+        names = os.listdir(chart_dir)
+    except OSError:
+        return sources
+    for name in names:
+        m = CHART_RE.match(name)
+        if m:
+            path = os.path.join(chart_dir, name)
+            st = os.stat(path)
+            sources[m.group(1)] = (path, [st.st_size, st.st_mtime_ns])
+    return sources
+
+
+def _data_signature(vals):
+    return ['data', datacache.content_key([float(v) for v in vals])]
+
+
+def load_index(chart_dir=DEFAULT_CHART_DIR):
+    _, index_path = atlas_paths(chart_dir)
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(chart_dir=DEFAULT_CHART_DIR, rainfall_by_year=None, thumb=THUMB_SIZE):
+    """True when the atlas is missing or no longer matches its sources."""
+    atlas_path, _ = atlas_paths(chart_dir)
+    index = load_index(chart_dir)
+    if index is None or not os.path.exists(atlas_path) or tuple(index.get('thumb', ())) != tuple(thumb):
+        return True
+    wanted = {y: sig for y, (_, sig) in chart_sources(chart_dir).items()}
+    for y, vals in (rainfall_by_year or {}).items():
+        if y not in wanted and vals:
+            wanted[y] = _data_signature(vals)
+    return wanted != index.get('sources')
+
+
+def _fallback_size(thumb):
+    # draw missing charts at twice the thumbnail size so the text survives scaling
+    return (thumb[0] * 2, thumb[1] * 2)
+
+
+def build_atlas(chart_dir=DEFAULT_CHART_DIR, thumb=THUMB_SIZE, columns=COLUMNS, rainfall_by_year=None,
+                verbose=False, render_lock=None, force=False):
+    """Write atlas.png/atlas.json for `chart_dir`; returns the index dict.
+
+    `render_lock` is held around fallback chart renders (svgchart's font cache
+    is shared with whatever else renders charts on other threads); `force`
+    redraws every tile instead of reusing the previous atlas.
+    """
+    start = time.perf_counter()
+    atlas_path, index_path = atlas_paths(chart_dir)
+    sources = chart_sources(chart_dir)
+    wanted = {y: sig for y, (_, sig) in sources.items()}
+    for y, vals in (rainfall_by_year or {}).items():
+        if y not in wanted and vals:
+            wanted[y] = _data_signature(vals)
+    years = sorted(wanted, key=int)
+    tw, th = thumb
+    rows = max(1, (len(years) + columns - 1) // columns)
+    atlas = pygame.Surface((tw * columns, th * rows))
+    atlas.fill((255, 255, 255))
+
+    # tiles of the previous atlas that can be reused as they are
+    old_index = load_index(chart_dir)
+    old_atlas = None
+    if not force and old_index and tuple(old_index.get('thumb', ())) == tuple(thumb) and os.path.exists(atlas_path):
+        try:
+            old_atlas = pygame.image.load(atlas_path)
+        except pygame.error:
+            old_atlas = None
+
+    tiles = {}
+    reused = 0
+    for i, year in enumerate(years):
+        x, y = (i % columns) * tw, (i // columns) * th
+        tiles[year] = [x, y]
+        sig = wanted[year]
+        if old_atlas is not None and old_index['sources'].get(year) == sig and year in old_index['tiles']:
+            ox, oy = old_index['tiles'][year]
+            atlas.blit(old_atlas, (x, y), pygame.Rect(ox, oy, tw, th))
+            reused += 1
+            continue
+        if year in sources:
+            img = pygame.image.load(sources[year][0])
+        else:
+            with render_lock or contextlib.nullcontext():
+                img = svgchart.render_chart_raster(year, rainfall_by_year[year], _fallback_size(thumb))
+        if img.get_bitsize() < 24:
+            img = img.convert(24, 0)
+        atlas.blit(pygame.transform.smoothscale(img, thumb), (x, y))
+
+    index = {'thumb': [tw, th], 'columns': columns, 'tiles': tiles, 'sources': wanted}
+    os.makedirs(chart_dir, exist_ok=True)
+    # write next to the final names and swap, so a reader never sees half an atlas
+    pygame.image.save(atlas, atlas_path + '.tmp.png')
+    os.replace(atlas_path + '.tmp.png', atlas_path)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f)
+    os.replace(index_path + '.tmp', index_path)
+    if verbose:
+        print(f'Packed {len(years)} charts ({reused} reused) into {atlas_path} '
+              f'in {time.perf_counter() - start:.2f}s')
+    return index
+
+
+class Atlas:
+    """The loaded atlas texture plus its tile index."""
+
+    def __init__(self, surface, index):
+        self.surface = surface
+        self.index = index
+        self.thumb = tuple(index['thumb'])
+        self.years = sorted(index['tiles'], key=int)
+        self._rects = {y: pygame.Rect(x, yy, *self.thumb) for y, (x, yy) in index['tiles'].items()}
+
+    @classmethod
+    def load(cls, chart_dir=DEFAULT_CHART_DIR):
+        index = load_index(chart_dir)
+        if index is None:
+            return None
+        atlas_path, _ = atlas_paths(chart_dir)
+        try:
+            surface = pygame.image.load(atlas_path)
+        except (pygame.error, FileNotFoundError):
+            return None
+        return cls(surface, index)
+
+    def convert(self):
+        """Convert the texture to the display format (main thread, after set_mode)."""
+        self.surface = self.surface.convert()
+        return self
+
+    def tile_rect(self, year):
+        return self._rects.get(str(year))
+
+    def tile(self, year):
+        rect = self.tile_rect(year)
+        return self.surface.subsurface(rect) if rect is not None else None
+
+
+def ensure_atlas(chart_dir=DEFAULT_CHART_DIR, rainfall_by_year=None, thumb=THUMB_SIZE, render_lock=None):
+    """Load the atlas, (re)building it first when it is missing or stale."""
+    if is_stale(chart_dir, rainfall_by_year, thumb):
+        build_atlas(chart_dir, thumb, rainfall_by_year=rainfall_by_year, render_lock=render_lock)
+    return Atlas.load(chart_dir)
+
+
+def grid_shape(n, width, height, aspect):
+    """Columns/rows that give the largest cells of `aspect` (w/h) for `n` items."""
+    best = (1, n, 0.0)
+    for cols in range(1, n + 1):
+        rows = (n + cols - 1) // cols
+        cell_w = min(width / cols, height / rows * aspect)
+        if cell_w > best[2]:
+            best = (cols, rows, cell_w)
+    return best[0], best[1]
+
+
+class AtlasOverview:
+    """Small multiples of all years drawn from one atlas texture."""
+
+    LABEL_COLOR = (255, 255, 255)
+    SELECTED_COLOR = (234, 128, 28)
+    HOVER_COLOR = (120, 160, 255)
+
+    def __init__(self, atlas, font=None, gap=4):
+        self.atlas = atlas
+        self.font = font
+        self.gap = gap
+        self._key = None
+        self._grid = None
+        self._cells = {}
+
+    def _build(self, rect):
+        # the scaled grid is rebuilt only when the window (or atlas) changes
+        tw, th = self.atlas.thumb
+        years = self.atlas.years
+        cols, rows = grid_shape(len(years), rect.width, rect.height, tw / th)
+        cell_w = min(rect.width // cols, int(rect.height // rows * tw / th))
+        cell_h = int(cell_w * th / tw)
+        cw, ch = max(1, cell_w - self.gap), max(1, cell_h - self.gap)
+        grid = pygame.Surface(rect.size, pygame.SRCALPHA)
+        grid.fill((0, 0, 0, 210))
+        ox = (rect.width - cols * cell_w) // 2
+        oy = (rect.height - rows * cell_h) // 2
+        cells = {}
+        for i, year in enumerate(years):
+            x = ox + (i % cols) * cell_w
+            y = oy + (i // cols) * cell_h
+            grid.blit(pygame.transform.smoothscale(self.atlas.tile(year), (cw, ch)), (x, y))
+            if self.font is not None:
+                label = self.font.render(year, True, self.LABEL_COLOR, (0, 0, 0))
+                grid.blit(label, (x + 2, y + ch - label.get_height() - 1))
+            cells[year] = pygame.Rect(rect.x + x, rect.y + y, cw, ch)
+        self._grid = grid
+        self._cells = cells
+
+    def draw(self, surface, rect, selected=None, hover_pos=None):
+        key = (tuple(rect), id(self.atlas))
+        if key != self._key:
+            self._build(rect)
+            self._key = key
+        surface.blit(self._grid, rect.topleft)
+        cell = self._cells.get(str(selected))
+        if cell is not None:
+            pygame.draw.rect(surface, self.SELECTED_COLOR, cell.inflate(4, 4), 2)
+        hovered = self.year_at(hover_pos) if hover_pos is not None else None
+        if hovered is not None and hovered != str(selected):
+            pygame.draw.rect(surface, self.HOVER_COLOR, self._cells[hovered].inflate(4, 4), 2)
+
+    def year_at(self, pos):
+        for year, cell in self._cells.items():
+            if cell.collidepoint(pos):
+                return year
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pack the per-year chart PNGs into one thumbnail atlas.')
+    parser.add_argument('--charts', default=DEFAULT_CHART_DIR)
+    parser.add_argument('--thumb', default=f'{THUMB_SIZE[0]}x{THUMB_SIZE[1]}', help='WxH')
+    parser.add_argument('--columns', type=int, default=COLUMNS)
+    args = parser.parse_args(argv)
+    thumb = tuple(int(v) for v in args.thumb.lower().split('x'))
+    build_atlas(args.charts, thumb, args.columns, verbose=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
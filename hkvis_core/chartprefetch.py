@@ -0,0 +1,123 @@
+"""Speculative chart prefetch around the year slider.
+
+`ChartPrefetcher.update(year, size, rainfall_by_year)` is called every frame
+while the chart panel is open. When the year (or panel size / dataset)
+changes it builds a new plan of nearby years, ordered by distance with the
+current scrub direction weighted ahead of the opposite one, and bumps a
+generation counter. The worker thread checks the generation before each
+render, so a plan made obsolete by further scrubbing is abandoned after at
+most one in-flight chart.
+"""
+import threading
+
+AHEAD = 8    # years rendered in the scrub direction
+BEHIND = 3   # years rendered against it
+BEHIND_WEIGHT = 2.0  # a year behind counts as this many years of distance
+
+
+def plan_years(year, years, direction, ahead=AHEAD, behind=BEHIND):
+    """Nearby years in render order; `years` is the sorted list of data years."""
+    year = str(year)
+    if year not in years:
+        return []
+    i = years.index(year)
+    direction = direction or 1
+    candidates = [(0.0, year)]
+    for k in range(1, max(ahead, behind) + 1):
+        fwd = i + k * direction
+        back = i - k * direction
+        if k <= ahead and 0 <= fwd < len(years):
+            candidates.append((float(k), years[fwd]))
+        if k <= behind and 0 <= back < len(years):
+            candidates.append((k * BEHIND_WEIGHT, years[back]))
+    candidates.sort(key=lambda c: c[0])
+    return [y for _, y in candidates]
+
+
+class ChartPrefetcher:
+    def __init__(self, cache, ahead=AHEAD, behind=BEHIND):
+        self.cache = cache
+        self.ahead = ahead
+        self.behind = behind
+        self.rendered = 0
+        self.cancelled = 0
+        self._generation = 0
+        self._plan = []
+        self._size = None
+        self._data = None
+        self._last = None  # (year, size, id(data)) of the current plan
+        self._direction = 1
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name='hkvis-chart-prefetch', daemon=True)
+        self._thread.start()
+
+    def update(self, year, size, rainfall_by_year):
+        year = str(year)
+        state = (year, size, id(rainfall_by_year))
+        if state == self._last or not rainfall_by_year:
+            return
+        if self._last is not None and self._last[0] != year:
+            try:
+                self._direction = 1 if int(year) > int(self._last[0]) else -1
+            except ValueError:
+                pass
+        self._last = state
+        years = sorted(rainfall_by_year, key=lambda y: int(y))
+        plan = [y for y in plan_years(year, years, self._direction, self.ahead, self.behind)
+                if (y, size) not in self.cache]
+        with self._cond:
+            if self._plan:
+                self.cancelled += len(self._plan)
+            self._generation += 1
+            self._plan = plan
+            self._size = size
+            self._data = rainfall_by_year
+            self._cond.notify()
+
+    def reset(self):
+        """Forget the current plan (e.g. after a data reload)."""
+        with self._cond:
+            self._generation += 1
+            self._plan = []
+            self._last = None
+            # an in-flight render for the old data must not pass the check in _run
+            self._data = None
+            self._size = None
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+
+    def stats(self):
+        s = self.cache.stats()
+        s.update(rendered=self.rendered, cancelled=self.cancelled, queued=len(self._plan))
+        return s
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._plan and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                generation = self._generation
+                year = self._plan.pop(0)
+                size, data = self._size, self._data
+            key = (year, size)
+            vals = data.get(year)
+            if not vals or key in self.cache:
+                continue
+            try:
+                surf, keepalive = self.cache.render(year, vals, size)
+            except Exception:
+                continue
+            with self._cond:
+                # a newer plan for another size/dataset makes this chart useless
+                if generation != self._generation and (size != self._size or data is not self._data):
+                    self.cancelled += 1
+                    continue
+                # under the lock, so a reset() cannot slip in between the check and the put
+                self.cache.put(key, surf, keepalive)
+                self.rendered += 1
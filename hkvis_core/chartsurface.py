@@ -0,0 +1,163 @@
+"""In-memory chart rendering for the in-window chart panel.
+
+`render_chart_surface` draws the same chart as `downloadchart.plot_rainfall_for_year`
+on a matplotlib Agg canvas and wraps the canvas' RGBA buffer as a pygame
+surface with `pygame.image.frombuffer`, so no PNG is encoded or written.
+Every render uses its own Figure, so a cached surface never aliases another
+one's pixels.
+
+`ChartCache` is a byte-capped LRU for those surfaces (Main.py's
+`chart_image_cache`). Its `backend` picks the renderer: 'mpl' (above),
+'raster' (`svgchart.render_chart_raster`, no matplotlib) or 'thumb'
+(`svgchart.render_chart_thumbnail`, bars only, for the slider hover preview).
+"""
+import threading
+from collections import OrderedDict
+
+import pygame
+
+try:
+    from hkvis_core import svgchart
+except ImportError:
+    import svgchart
+
+CHART_DPI = 100
+CACHE_MAX_BYTES = 48 * 1024 * 1024
+BACKENDS = ('mpl', 'raster', 'thumb')
+# matplotlib is not thread-safe across figures sharing global state (font
+# cache, text layout); the prefetcher and the UI thread take turns rendering
+render_lock = threading.Lock()
+# panel sizes are rounded to this step so small window resizes reuse cached charts
+SIZE_STEP = 16
+
+
+def quantize_size(w, h, step=SIZE_STEP):
+    return (max(step * 8, (int(w) // step) * step), max(step * 6, (int(h) // step) * step))
+
+
+def render_chart_surface(year, vals, size, dpi=CHART_DPI):
+    """Render the monthly bar chart for `year` at `size` pixels.
+
+    Returns (surface, keepalive); keep `keepalive` (the Agg buffer) referenced
+    for as long as the surface is used.
+    """
+    # matplotlib is only imported once a chart is actually requested
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.patches as mpatches
+
+    w, h = size
+    with render_lock:
+        fig = Figure(figsize=(w / dpi, h / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+        vals = list(vals)[:12]
+        ax.bar(svgchart.MONTHS[:len(vals)], vals, color=svgchart.bar_colors(vals))
+        ax.set_title(f"Monthly Rainfall in Hong Kong ({year})")
+        ax.set_xlabel("Month")
+        ax.set_ylabel("Rainfall (mm)")
+        orange_patch = mpatches.Patch(color=svgchart.COLOR_ORANGE, label='Highest Month')
+        blue_patch = mpatches.Patch(color=svgchart.COLOR_BLUE, label='Lowest Month')
+        ax.legend(handles=[orange_patch, blue_patch], loc='upper right', frameon=False)
+        fig.tight_layout()
+        canvas.draw()
+        buf = canvas.buffer_rgba()
+        bw, bh = canvas.get_width_height()
+    surface = pygame.image.frombuffer(buf, (bw, bh), 'RGBA')
+    return surface, buf
+
+
+class ChartCache:
+    """LRU of chart surfaces keyed by (year, size), capped by pixel bytes."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, backend='mpl'):
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown chart backend: {backend}')
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # counted by lookup()/get_or_render(), i.e. by what the panel asked for
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def lookup(self, key):
+        """`get` that also counts a hit or miss."""
+        surf = self.get(key)
+        with self._lock:
+            if surf is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return surf
+
+    def put(self, key, surface, keepalive=None):
+        nbytes = surface.get_width() * surface.get_height() * 4
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (surface, keepalive, nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > 1 and self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= dropped[2]
+        return surface
+
+    def render(self, year, vals, size):
+        """Render with this cache's backend; returns (surface, keepalive)."""
+        if self.backend == 'raster':
+            with render_lock:
+                return svgchart.render_chart_raster(year, vals, size), None
+        if self.backend == 'thumb':
+            return svgchart.render_chart_thumbnail(year, vals, size), None
+        return render_chart_surface(year, vals, size)
+
+    def get_or_render(self, year, vals, size):
+        key = (str(year), size)
+        surf = self.lookup(key)
+        if surf is None:
+            surf, keepalive = self.render(year, vals, size)
+            self.put(key, surf, keepalive)
+        return surf
+
+    def latest_for_year(self, year):
+        """Most recently used surface for `year` at any size, or None."""
+        year = str(year)
+        with self._lock:
+            for key in reversed(self._entries):
+                if key[0] == year:
+                    return self._entries[key][0]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
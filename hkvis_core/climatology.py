@@ -0,0 +1,207 @@
+"""Climatology and anomaly statistics over the year x month rainfall matrix.
+
+`Climatology` holds the full record as a float (n_years, 12) array (NaN for
+missing months) and computes everything in vectorised NumPy passes. Results
+are cached until the data changes; `append_month` keeps the running per-month
+sums and the cumulative sums behind the rolling normals up to date instead of
+rebuilding them, and only drops the order statistics (medians, percentiles,
+ranks) which are cheap to recompute on demand.
+
+    clim = Climatology.from_xml(xml_path)
+    clim.monthly_mean()            # (12,) climatological mean per month
+    clim.rolling_normals(30)       # (n_years, 12) trailing 30-year normals
+    clim.year_stats('1997')        # dict used by the chart printouts
+"""
+import numpy as np
+
+try:
+    from hkvis_core import datacache
+except ImportError:
+    import datacache
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+NORMAL_WINDOW = 30
+
+
+class Climatology:
+    def __init__(self, years, rainfall):
+        self.years = [str(y) for y in years]
+        self._index = {y: i for i, y in enumerate(self.years)}
+        matrix = np.full((len(self.years), 12), np.nan)
+        for i, vals in enumerate(rainfall):
+            row = np.asarray(list(vals)[:12], dtype=float)
+            matrix[i, :len(row)] = row
+        self.matrix = matrix
+        self.version = 0
+        self._cache = {}
+        self._rebuild_running()
+
+    @classmethod
+    def from_matrix(cls, years, matrix):
+        """From a (n_years, 12) array with NaN for missing months, e.g. `datacache.load_matrix`."""
+        return cls(years, matrix)
+
+    @classmethod
+    def from_xml(cls, xml_path, code='RF'):
+        years, matrix = datacache.load_matrix(xml_path, code)
+        return cls.from_matrix(years, matrix)
+
+    # --- incremental state ---
+    def _rebuild_running(self):
+        valid = ~np.isnan(self.matrix)
+        filled = np.where(valid, self.matrix, 0.0)
+        self._sum = filled.sum(axis=0)
+        self._count = valid.sum(axis=0)
+        # cumulative sums with a leading zero row, used for rolling windows
+        self._csum = np.vstack([np.zeros(12), np.cumsum(filled, axis=0)])
+        self._ccount = np.vstack([np.zeros(12), np.cumsum(valid, axis=0)])
+
+    def append_month(self, year, month, value):
+        """Set `value` for (`year`, `month` 1..12), adding the year if new.
+
+        Appending to the latest year only touches the last row of the running
+        sums; older edits fall back to rebuilding them.
+        """
+        year = str(year)
+        m = int(month) - 1
+        value = float(value)
+        i = self._index.get(year)
+        if i is None:
+            i = len(self.years)
+            self.years.append(year)
+            self._index[year] = i
+            self.matrix = np.vstack([self.matrix, np.full((1, 12), np.nan)])
+            self._csum = np.vstack([self._csum, self._csum[-1]])
+            self._ccount = np.vstack([self._ccount, self._ccount[-1]])
+        old = self.matrix[i, m]
+        self.matrix[i, m] = value
+        if i == len(self.years) - 1:
+            had = not np.isnan(old)
+            delta = value - (old if had else 0.0)
+            self._sum[m] += delta
+            self._count[m] += 0 if had else 1
+            self._csum[-1, m] += delta
+            self._ccount[-1, m] += 0 if had else 1
+        else:
+            self._rebuild_running()
+        self.version += 1
+        self._cache.clear()
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def index_of(self, year):
+        return self._index[str(year)]
+
+    def has_year(self, year):
+        return str(year) in self._index
+
+    # --- per-month climatology ---
+    def monthly_mean(self):
+        return self._cached('mean', lambda: self._sum / np.maximum(self._count, 1))
+
+    def monthly_median(self):
+        return self._cached('median', lambda: np.nanmedian(self.matrix, axis=0))
+
+    def monthly_percentiles(self, q=(10, 25, 50, 75, 90)):
+        """(len(q), 12) array of per-month percentiles."""
+        q = tuple(q)
+        return self._cached(('pct', q), lambda: np.nanpercentile(self.matrix, q, axis=0))
+
+    def rolling_normals(self, window=NORMAL_WINDOW):
+        """(n_years, 12) mean of the trailing `window` years including each year."""
+        def compute():
+            n = len(self.years)
+            hi = np.arange(1, n + 1)
+            lo = np.maximum(0, hi - window)
+            sums = self._csum[hi] - self._csum[lo]
+            counts = self._ccount[hi] - self._ccount[lo]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        return self._cached(('normals', window), compute)
+
+    # --- per-year values ---
+    def annual_totals(self):
+        def compute():
+            totals = np.nansum(self.matrix, axis=1)
+            totals[np.isnan(self.matrix).all(axis=1)] = np.nan
+            return totals
+        return self._cached('totals', compute)
+
+    def anomalies(self):
+        """Monthly departures from the climatological mean, (n_years, 12)."""
+        return self._cached('anom', lambda: self.matrix - self.monthly_mean())
+
+    def annual_anomalies(self):
+        """Annual total minus the sum of monthly means over the months present."""
+        def compute():
+            valid = ~np.isnan(self.matrix)
+            expected = (valid * self.monthly_mean()).sum(axis=1)
+            return self.annual_totals() - expected
+        return self._cached('annual_anom', compute)
+
+    def ranks(self):
+        """Rank of each year's total, 1 = wettest; NaN for empty years."""
+        def compute():
+            totals = self.annual_totals()
+            order = np.argsort(-np.where(np.isnan(totals), -np.inf, totals), kind='stable')
+            ranks = np.empty(len(totals))
+            ranks[order] = np.arange(1, len(totals) + 1)
+            ranks[np.isnan(totals)] = np.nan
+            return ranks
+        return self._cached('ranks', compute)
+
+    def year_minmax(self):
+        """(n_years, 2) per-year lowest and highest monthly values."""
+        def compute():
+            out = np.full((len(self.years), 2), np.nan)
+            has = ~np.isnan(self.matrix).all(axis=1)
+            out[has, 0] = np.nanmin(self.matrix[has], axis=1)
+            out[has, 1] = np.nanmax(self.matrix[has], axis=1)
+            return out
+        return self._cached('minmax', compute)
+
+    def intensity(self):
+        """(n_years, 12) months scaled 0..1 within their own year (animation/audio)."""
+        def compute():
+            mm = self.year_minmax()
+            lo, hi = mm[:, :1], mm[:, 1:]
+            span = hi - lo
+            with np.errstate(invalid='ignore', divide='ignore'):
+                t = np.where(span > 0, (self.matrix - lo) / np.where(span > 0, span, 1.0), 0.0)
+            return np.clip(np.nan_to_num(t), 0.0, 1.0)
+        return self._cached('intensity', compute)
+
+    def extremes(self):
+        """Per-month record wet/dry values and the years they occurred."""
+        def compute():
+            filled_hi = np.where(np.isnan(self.matrix), -np.inf, self.matrix)
+            filled_lo = np.where(np.isnan(self.matrix), np.inf, self.matrix)
+            wet = np.argmax(filled_hi, axis=0)
+            dry = np.argmin(filled_lo, axis=0)
+            cols = np.arange(12)
+            return {
+                'wettest_value': self.matrix[wet, cols],
+                'wettest_year': [self.years[i] for i in wet],
+                'driest_value': self.matrix[dry, cols],
+                'driest_year': [self.years[i] for i in dry],
+            }
+        return self._cached('extremes', compute)
+
+    def year_stats(self, year):
+        i = self.index_of(year)
+        row = self.matrix[i]
+        lo, hi = self.year_minmax()[i]
+        return {
+            'highest': hi,
+            'lowest': lo,
+            'average': float(np.nanmean(row)) if not np.isnan(row).all() else np.nan,
+            'range': hi - lo,
+            'total': self.annual_totals()[i],
+            'anomaly': self.annual_anomalies()[i],
+            'rank': self.ranks()[i],
+            'ranked_years': int(np.count_nonzero(~np.isnan(self.annual_totals()))),
+            'monthly_anomaly': self.anomalies()[i],
+        }
@@ -0,0 +1,140 @@
+"""Layered dirty-rect compositor for the main window.
+
+The frame is built from three layers, bottom to top:
+
+- ANIMATION: one full-window backdrop surface (the scaled animation frame,
+  the frozen last frame while paused, or a solid fill)
+- CHROME: buttons, the year slider, the chart panel
+- OVERLAY: hover preview, overview grid, loading indicator
+
+Every frame Main.py sets the backdrop and registers each chrome/overlay item
+with its screen rect, a key describing its current look (state, year, size,
+...) and a draw callback. `present()` then compares the items with the
+previous frame:
+
+- if the backdrop changed (the animation advanced) or the window was resized,
+  everything is drawn and the whole window is pushed with one `flip()`
+- otherwise only items that appeared, disappeared, moved or changed key are
+  damaged: the backdrop is restored under the damaged rects, every item
+  overlapping them is redrawn clipped to them, and just those rects are
+  pushed with `display.update(rects)`; an unchanged frame pushes nothing
+
+Items must not draw outside the rect they register.
+"""
+import pygame
+
+ANIMATION, CHROME, OVERLAY = 0, 1, 2
+LAYER_NAMES = ('animation', 'chrome', 'overlay')
+# damaged rects covering more than this share of the window are pushed as one flip
+FULL_UPDATE_FRACTION = 0.6
+
+
+def merge_rects(rects):
+    """Union overlapping rects so no pixel is restored or pushed twice."""
+    merged = [pygame.Rect(r) for r in rects if r.width > 0 and r.height > 0]
+    changed = True
+    while changed:
+        # a union can overlap rects already merged; repeat until stable
+        changed = False
+        out = []
+        for r in merged:
+            for i, m in enumerate(out):
+                if m.colliderect(r):
+                    out[i] = m.union(r)
+                    changed = True
+                    break
+            else:
+                out.append(r)
+        merged = out
+    return merged
+
+
+class Compositor:
+    def __init__(self):
+        self._backdrop = None
+        self._backdrop_changed = True
+        self._items = {}       # name -> (layer, rect, key, draw) for the current frame
+        self._previous = {}    # name -> (layer, rect, key) presented last frame
+        self._size = None
+        self.frames = 0
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.idle_frames = 0
+        self.pixels_pushed = 0
+
+    def set_backdrop(self, surface, changed=True):
+        """Animation layer for this frame; `changed=False` keeps last frame's pixels."""
+        if surface is not self._backdrop:
+            changed = True
+        self._backdrop = surface
+        self._backdrop_changed = self._backdrop_changed or changed
+
+    def damage_all(self):
+        self._backdrop_changed = True
+
+    def add(self, layer, name, rect, key, draw):
+        """Register an item for this frame; `draw(surface)` paints it inside `rect`."""
+        self._items[name] = (layer, pygame.Rect(rect), key, draw)
+
+    def _draw_items(self, screen, clip=None):
+        for layer, rect, key, draw in sorted(self._items.values(), key=lambda it: it[0]):
+            if clip is not None and not rect.colliderect(clip):
+                continue
+            draw(screen)
+
+    def present(self):
+        """Draw the damaged parts of the frame and push them to the display."""
+        screen = pygame.display.get_surface()
+        size = screen.get_size()
+        area = size[0] * size[1]
+        self.frames += 1
+        damaged = []
+        full = self._backdrop_changed or size != self._size
+        if not full:
+            for name, (layer, rect, key, draw) in self._items.items():
+                prev = self._previous.get(name)
+                if prev is None:
+                    damaged.append(rect)
+                elif prev[1] != rect or prev[2] != key:
+                    damaged.append(prev[1])
+                    damaged.append(rect)
+            for name, prev in self._previous.items():
+                if name not in self._items:
+                    damaged.append(prev[1])
+            damaged = [r.clip(screen.get_rect()) for r in merge_rects(damaged)]
+            damaged = [r for r in damaged if r.width and r.height]
+            if sum(r.width * r.height for r in damaged) > area * FULL_UPDATE_FRACTION:
+                full = True
+        if full:
+            if self._backdrop is not None:
+                screen.blit(self._backdrop, (0, 0))
+            self._draw_items(screen)
+            pygame.display.flip()
+            self.full_frames += 1
+            self.pixels_pushed += area
+        elif damaged:
+            for r in damaged:
+                screen.set_clip(r)
+                if self._backdrop is not None:
+                    screen.blit(self._backdrop, r.topleft, r)
+                self._draw_items(screen, r)
+            screen.set_clip(None)
+            pygame.display.update(damaged)
+            self.partial_frames += 1
+            self.pixels_pushed += sum(r.width * r.height for r in damaged)
+        else:
+            self.idle_frames += 1
+        self._previous = {name: (layer, rect, key) for name, (layer, rect, key, draw) in self._items.items()}
+        self._items = {}
+        self._backdrop_changed = False
+        self._size = size
+        return damaged if not full else [screen.get_rect()]
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'full': self.full_frames,
+            'partial': self.partial_frames,
+            'idle': self.idle_frames,
+            'mpixels_pushed': round(self.pixels_pushed / 1e6, 1),
+        }
@@ -0,0 +1,125 @@
+"""Parsed-data cache for HKO monthlyElement files.
+
+Parsing is done once per (file, element code) and reused until the file's
+size or mtime changes, so the app, the chart scripts and the bulk fetcher can
+all call `load_element` freely.
+"""
+import os
+import json
+import hashlib
+import threading
+
+MISSING_VALUES = ("Trace", "", "***")
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def content_key(*parts):
+    """SHA-1 of `parts` as JSON; the content key the build outputs (pipeline,
+    webbundle, chartatlas) use for data-derived files."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def _to_float(v):
+    v = str(v).strip()
+    if v in MISSING_VALUES:
+        return 0.0
+    try:
+        return float(v)
+    except Exception:
+        return 0.0
+
+
+def parse_monthly_element(content, code='RF'):
+    """Return (years, values) for element `code` from the file's JSON text."""
+    data = json.loads(content)
+    section = None
+    for s in data['stn']['data']:
+        if s.get('code') == code:
+            section = s
+            break
+    if not section:
+        raise ValueError(f'Element data ({code}) not found in file.')
+    years = []
+    values = []
+    for row in section['monthData']:
+        years.append(row[0])
+        values.append([_to_float(v) for v in row[1:]])
+    return years, values
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def load_matrix(xml_path, code='RF'):
+    """Cached (years, matrix) with a float (n_years, 12) NumPy array.
+
+    Unlike `load_element`, missing months ("***" / blank) are NaN so the
+    statistics in `climatology` can skip them; "Trace" counts as 0.0.
+    """
+    import numpy as np
+
+    key = (os.path.abspath(xml_path), code, 'matrix')
+    stamp = _stamp(key[0])
+    with _lock:
+        hit = _cache.get(key)
+    if hit is None or hit[0] != stamp:
+        with open(key[0], 'r', encoding='utf-8') as f:
+            data = json.loads(f.read())
+        rows = None
+        for s in data['stn']['data']:
+            if s.get('code') == code:
+                rows = s['monthData']
+                break
+        if rows is None:
+            raise ValueError(f'Element data ({code}) not found in file.')
+        years = [row[0] for row in rows]
+        matrix = np.full((len(rows), 12), np.nan)
+        for i, row in enumerate(rows):
+            for m, v in enumerate(row[1:13]):
+                v = str(v).strip()
+                if v == "Trace":
+                    matrix[i, m] = 0.0
+                elif v not in MISSING_VALUES:
+                    try:
+                        matrix[i, m] = float(v)
+                    except ValueError:
+                        pass
+        matrix.setflags(write=False)
+        hit = (stamp, years, matrix)
+        with _lock:
+            _cache[key] = hit
+    return list(hit[1]), hit[2]
+
+
+def load_element(xml_path, code='RF'):
+    """Cached `parse_monthly_element` for a file on disk.
+
+    Returns fresh outer lists so callers may reorder or append without
+    touching the cache.
+    """
+    key = (os.path.abspath(xml_path), code)
+    stamp = _stamp(key[0])
+    with _lock:
+        hit = _cache.get(key)
+    if hit is None or hit[0] != stamp:
+        with open(key[0], 'r', encoding='utf-8') as f:
+            years, values = parse_monthly_element(f.read(), code)
+        hit = (stamp, years, values)
+        with _lock:
+            _cache[key] = hit
+    return list(hit[1]), [list(v) for v in hit[2]]
+
+
+def invalidate(xml_path=None):
+    """Drop cached entries for `xml_path`, or everything when None."""
+    with _lock:
+        if xml_path is None:
+            _cache.clear()
+            return
+        path = os.path.abspath(xml_path)
+        for key in [k for k in _cache if k[0] == path]:
+            del _cache[key]
@@ -0,0 +1,125 @@
+"""Background data loading for the visualiser.
+
+`BackgroundLoader` parses (and optionally re-downloads) the rainfall file on a
+worker thread. The UI thread only ever reads `loader.dataset`, a complete
+immutable snapshot: the worker builds the next snapshot on the side and swaps
+the reference in one assignment when it is ready, so the animation keeps
+playing the old data while a reload is in flight.
+"""
+import os
+import time
+import threading
+from collections import namedtuple
+
+
+RainfallDataset = namedtuple('RainfallDataset', ['rainfall_by_year', 'per_year_month_minmax', 'climatology', 'loaded_at'])
+
+EMPTY_DATASET = RainfallDataset(None, {}, None, None)
+
+
+def _climatology_class():
+    # imported on first load (i.e. on the loader thread) so NumPy stays off the
+    # UI's startup path; climatology needs NumPy, without it the dataset carries None
+    try:
+        from hkvis_core.climatology import Climatology
+    except Exception:
+        try:
+            from climatology import Climatology
+        except Exception:
+            Climatology = None
+    return Climatology
+
+
+def build_dataset(years_list, rainfall_list, xml_path=None):
+    rainfall_by_year = {str(y): vals for y, vals in zip(years_list, rainfall_list)}
+    # per-year min/max monthly values for audio/intensity normalisation
+    minmax = {y: (min(vals), max(vals)) for y, vals in rainfall_by_year.items() if vals}
+    Climatology = _climatology_class()
+    clim = None
+    if Climatology is not None:
+        # the statistics need the missing months as NaN; `rainfall_list` has them as 0.0
+        clim = Climatology.from_xml(xml_path) if xml_path is not None else Climatology(years_list, rainfall_list)
+    return RainfallDataset(rainfall_by_year, minmax, clim, time.time())
+
+
+class BackgroundLoader:
+    """Load `xml_path` with `load_fn` on a daemon thread.
+
+    `download_fn`, if given, is called before parsing on refreshes (manual
+    reloads with download=True and every `refresh_interval` seconds) and should
+    return a falsy value when nothing changed, in which case the parse is
+    skipped.
+    """
+
+    def __init__(self, xml_path, load_fn, download_fn=None, refresh_interval=None):
+        self.xml_path = xml_path
+        self.load_fn = load_fn
+        self.download_fn = download_fn
+        self.refresh_interval = refresh_interval
+        self.dataset = EMPTY_DATASET
+        self.generation = 0
+        self.last_error = None
+        self._pending = None
+        self._busy = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+
+    @property
+    def loading(self):
+        return self._busy or self._pending is not None
+
+    def start(self, initial_load=True):
+        if self._thread is not None:
+            return
+        if initial_load:
+            self._pending = False
+        self._thread = threading.Thread(target=self._run, name='hkvis-data-loader', daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        self._stop = True
+        self._wake.set()
+
+    def request_reload(self, download=False):
+        with self._lock:
+            # a queued download request wins over a plain re-parse
+            self._pending = bool(download or self._pending)
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(timeout=self.refresh_interval)
+            self._wake.clear()
+            if self._stop:
+                break
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if pending is None:
+                if not self.refresh_interval:
+                    continue
+                pending = True  # periodic auto-refresh
+            self._busy = True
+            try:
+                self._load(download=pending)
+            finally:
+                self._busy = False
+
+    def _load(self, download):
+        try:
+            if download and self.download_fn is not None:
+                changed = self.download_fn()
+                if not changed and self.dataset.rainfall_by_year is not None:
+                    return
+            if not os.path.exists(self.xml_path):
+                return
+            years_list, rainfall_list = self.load_fn(self.xml_path)
+            dataset = build_dataset(years_list, rainfall_list, self.xml_path)
+            # single reference swap; readers see either the old or new snapshot
+            self.dataset = dataset
+            self.generation += 1
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
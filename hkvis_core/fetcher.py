@@ -0,0 +1,219 @@
+"""Conditional, resumable HTTP fetcher.
+
+Used by `xmldata.download_xml` and `scraping_utils` so a failed download never
+leaves a truncated file behind. Downloads go through one pooled
+`requests.Session`, send `If-None-Match` / `If-Modified-Since` from the
+metadata saved by the previous run, retry with exponential backoff and stream
+into `<dest>.part` before an atomic `os.replace` onto the final path.
+
+Fetch metadata (ETag, Last-Modified, size, timestamp) is kept next to the
+downloaded file in `<dest>.meta.json`.
+
+    python -m hkvis_core.fetcher URL DEST [--force]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 8.0
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 16
+
+USER_AGENT = "python-requests/2.0 (+https://example.com/)"
+
+# HTTP statuses worth another attempt; everything else >= 400 fails immediately
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+FetchResult = namedtuple('FetchResult', ['url', 'path', 'status', 'modified', 'bytes', 'elapsed', 'attempts'])
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class RetryableStatus(Exception):
+    """Raised for a response status in RETRY_STATUSES."""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def get_session(pool_size=POOL_SIZE):
+    """Return the shared, connection-pooled session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept-Encoding": "gzip, deflate",
+            })
+            _session = session
+        return _session
+
+
+def meta_path(dest):
+    return dest + '.meta.json'
+
+
+def load_meta(dest):
+    """Return the metadata saved for `dest`, or {} if missing/unreadable."""
+    try:
+        with open(meta_path(dest), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_meta(dest, meta):
+    path = meta_path(dest)
+    tmp = path + '.part'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _backoff_delay(attempt, backoff):
+    return min(MAX_BACKOFF, backoff * (2 ** attempt))
+
+
+def _conditional_headers(url, dest, meta):
+    headers = {}
+    if not os.path.exists(dest) or meta.get('url') != url:
+        return headers
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+def _can_resume(resp):
+    # Byte ranges refer to the encoded body, so only resume identity responses
+    # that carry a validator we can send back in If-Range.
+    encoding = resp.headers.get('Content-Encoding', 'identity').lower()
+    return (resp.headers.get('Accept-Ranges', '').lower() == 'bytes'
+            and encoding in ('', 'identity')
+            and bool(resp.headers.get('ETag') or resp.headers.get('Last-Modified')))
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise TimeoutError('deadline reached')
+
+
+def fetch(url, dest, session=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+          backoff=DEFAULT_BACKOFF, headers=None, force=False, deadline=None):
+    """Download `url` to `dest` if it changed since the last run.
+
+    Returns a FetchResult; `modified` is False when the server answered 304 and
+    `dest` was left untouched. Raises the last error once `retries` extra
+    attempts are exhausted; `dest` is never left partially written.
+
+    `deadline` (a `time.monotonic()` value) is a hard stop: past it the
+    download raises TimeoutError between chunks, retries and before the final
+    replace, so nothing is written to `dest` once it has passed.
+    """
+    session = session or get_session()
+    dest = os.path.abspath(dest)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    part = dest + '.part'
+    meta = {} if force else load_meta(dest)
+    base_headers = dict(headers or {})
+    base_headers.update(_conditional_headers(url, dest, meta))
+
+    start = time.perf_counter()
+    resume = None  # (validator, bytes already in `part`) carried between attempts
+    attempt = 0
+    try:
+        while True:
+            req_headers = dict(base_headers)
+            if resume is not None and os.path.exists(part):
+                req_headers['Range'] = f"bytes={resume[1]}-"
+                req_headers['If-Range'] = resume[0]
+            _check_deadline(deadline)
+            request_timeout = timeout if deadline is None else min(timeout, max(0.01, deadline - time.monotonic()))
+            try:
+                with session.get(url, headers=req_headers, timeout=request_timeout, stream=True) as resp:
+                    if resp.status_code == 304:
+                        meta['checked_at'] = time.time()
+                        save_meta(dest, meta)
+                        return FetchResult(url, dest, 304, False, 0,
+                                           time.perf_counter() - start, attempt + 1)
+                    if resp.status_code in RETRY_STATUSES:
+                        raise RetryableStatus(resp.status_code)
+                    resp.raise_for_status()
+                    appending = resp.status_code == 206 and resume is not None
+                    if _can_resume(resp):
+                        validator = resp.headers.get('ETag') or resp.headers.get('Last-Modified')
+                        resume = (validator, resume[1] if appending else 0)
+                    else:
+                        resume = None
+                    with open(part, 'ab' if appending else 'wb') as f:
+                        # iter_content decodes gzip/deflate and keeps chunks small
+                        for chunk in resp.iter_content(CHUNK_SIZE):
+                            _check_deadline(deadline)
+                            if chunk:
+                                f.write(chunk)
+                                if resume is not None:
+                                    resume = (resume[0], resume[1] + len(chunk))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    _check_deadline(deadline)
+                    os.replace(part, dest)
+                    size = os.path.getsize(dest)
+                    save_meta(dest, {
+                        'url': url,
+                        'etag': resp.headers.get('ETag'),
+                        'last_modified': resp.headers.get('Last-Modified'),
+                        'size': size,
+                        'fetched_at': time.time(),
+                        'checked_at': time.time(),
+                    })
+                    return FetchResult(url, dest, resp.status_code, True, size,
+                                       time.perf_counter() - start, attempt + 1)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError,
+                    RetryableStatus):
+                if attempt >= retries:
+                    raise
+                delay = _backoff_delay(attempt, backoff)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise TimeoutError('deadline reached before the next attempt')
+                time.sleep(delay)
+                attempt += 1
+    finally:
+        if os.path.exists(part):
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Conditional, resumable HTTP fetcher.')
+    parser.add_argument('url')
+    parser.add_argument('dest')
+    parser.add_argument('--force', action='store_true', help='ignore the saved ETag/Last-Modified')
+    args = parser.parse_args(argv)
+    result = fetch(args.url, args.dest, force=args.force)
+    print(f"{result.status} {result.bytes} bytes in {result.elapsed:.2f}s ({result.attempts} attempt(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
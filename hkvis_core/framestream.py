@@ -0,0 +1,506 @@
+"""Stream the animation to many displays over WebSocket.
+
+One process computes the pattern once per frame (`animationtest`'s vectorised
+`fluid_norm_array`, i.e. `generate_fluid_pattern` for the whole grid) and
+broadcasts it to every connected client:
+
+    GET /      a small canvas viewer page that connects to /ws
+    GET /ws    WebSocket (RFC 6455, implemented on asyncio streams)
+
+After the handshake the server sends one text message with the grid, glyphs
+and palette (the same cell encoding as `webbundle`), then binary frames:
+
+    b'K' u32 frame | cols*rows cell bytes | cols*rows sparkle bytes    keyframe
+    b'D' u32 frame | cell change bitmap | changed cell bytes
+                   | sparkle change bitmap | changed sparkle bytes      delta
+
+cell = glyph index * SHADES + density shade; sparkle = quantised white
+factor. The fluid pattern moves about half the glyphs every frame, so a
+delta is a change bitmap per plane (one bit per cell, most significant bit
+first) followed by only the changed bytes, in cell order - roughly 40% of a
+keyframe. Both encodings are built once per frame and shared by all clients.
+
+Backpressure: the broadcaster never waits for a client. Each client's
+kernel send buffer is sized to about one keyframe, and a client whose
+previous frame is still partly queued in asyncio (a non-zero write buffer)
+skips the frame (counted as dropped) and, because its next delta would no
+longer apply, gets the next keyframe instead. Slow clients therefore lose
+frames rather than reading a backlog that grows seconds old. Client frames
+larger than `MAX_CLIENT_FRAME` close the connection; only control frames
+and "stats" are expected.
+
+    python -m hkvis_core.framestream [--port 8766] [--year 1997] [--fps 20]
+    python -m hkvis_core.framestream --load-test 300 [--seconds 10]
+
+The load test starts the server as a subprocess, connects the clients from
+this process and reports server CPU per frame and per client plus bytes per
+frame (the server reports its own CPU time on a "stats" text message), and
+how many frames each client lags behind the newest frame seen by any client.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import socket
+import struct
+import asyncio
+import hashlib
+import argparse
+import subprocess
+
+import numpy as np
+
+try:
+    from hkvis_core import animationtest, webbundle
+    from hkvis_core.viewchart import load_rainfall_data
+except ImportError:
+    import animationtest
+    import webbundle
+    from viewchart import load_rainfall_data
+
+DEFAULT_PORT = 8766
+FPS = 20
+HIGH_WATER = 0  # unsent bytes in asyncio's buffer above which a client skips frames
+MAX_HEADER = 8192
+MAX_CLIENT_FRAME = 4096  # control frames and "stats" only
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+def ws_frame(opcode, payload):
+    """One unmasked, unfragmented server frame."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack('!BB', 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def read_ws_frame(reader, max_size=None):
+    """(opcode, payload) of the next frame; client frames are masked, server frames are not.
+
+    Raises ValueError when the declared payload length exceeds `max_size`.
+    """
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        (n,) = struct.unpack('!H', await reader.readexactly(2))
+    elif n == 127:
+        (n,) = struct.unpack('!Q', await reader.readexactly(8))
+    if max_size is not None and n > max_size:
+        raise ValueError(f'frame of {n} bytes exceeds {max_size}')
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), n)).tobytes()
+    return b0 & 0x0F, payload
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1(key.strip().encode() + WS_GUID).digest()).decode()
+
+
+async def read_http_request(reader):
+    """(method, path, headers) of one HTTP request head."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    if len(head) > MAX_HEADER:
+        raise ValueError('request head too large')
+    lines = head.decode('latin-1').split('\r\n')
+    method, path, _ = lines[0].split(' ', 2)
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+    return method, path, headers
+
+
+class FrameEncoder:
+    """Grid state -> shared keyframe / delta payloads."""
+
+    def __init__(self, cols=animationtest.COLS, rows=animationtest.ROWS):
+        self.cols = cols
+        self.rows = rows
+        self.prev = None
+        self.frame = 0
+        self.key = None
+        self.delta = None
+
+    def update(self, data, t):
+        norm = animationtest.fluid_norm_array(data, t, cols=self.cols, rows=self.rows)
+        shade = np.minimum((norm * webbundle.SHADES).astype(int), webbundle.SHADES - 1)
+        cell = (animationtest.glyph_indices(norm) * webbundle.SHADES + shade).astype(np.uint8)
+        wf = animationtest.white_factor_array(t, cols=self.cols, rows=self.rows)
+        sparkle = np.rint(wf / webbundle.SPARKLE_MAX * (webbundle.SPARKLE_LEVELS - 1)).astype(np.uint8)
+        state = np.stack((cell.ravel(), sparkle.ravel()))
+        self.frame += 1
+        header = struct.pack('<I', self.frame)
+        self.key = b'K' + header + state.tobytes()
+        if self.prev is None:
+            self.delta = self.key
+        else:
+            parts = [b'D', header]
+            for plane, prev in zip(state, self.prev):
+                changed = plane != prev
+                parts.append(np.packbits(changed).tobytes())
+                parts.append(plane[changed].tobytes())
+            self.delta = b''.join(parts)
+            if len(self.delta) >= len(self.key):
+                self.delta = self.key
+        self.prev = state
+        return self.key, self.delta
+
+
+class Client:
+    __slots__ = ('writer', 'needs_key', 'sent', 'dropped', 'bytes')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.needs_key = True
+        self.sent = 0
+        self.dropped = 0
+        self.bytes = 0
+
+
+class FrameStreamServer:
+    def __init__(self, data, fps=FPS, high_water=HIGH_WATER):
+        self.data = data
+        self.fps = fps
+        self.high_water = high_water
+        self.encoder = FrameEncoder()
+        # what a keyframe occupies on the wire, header included
+        self.key_wire_size = len(ws_frame(OP_BINARY, bytes(5 + 2 * self.encoder.cols * self.encoder.rows)))
+        self.clients = set()
+        self.frames = 0
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.payload_bytes = 0  # key/delta sizes summed over frames (what a fast client receives)
+        self.encode_seconds = 0.0
+        self.hello = json.dumps({
+            'cols': self.encoder.cols, 'rows': self.encoder.rows, 'fps': fps,
+            'chars': animationtest.ASCII_CHARS, 'shades': webbundle.SHADES,
+            'sparkle_levels': webbundle.SPARKLE_LEVELS, 'sparkle_max': webbundle.SPARKLE_MAX,
+            'background': list(animationtest.BG_COLOR),
+            'palette': webbundle.palette(self.encoder.rows).ravel().tolist(),
+        }).encode()
+
+    def stats(self):
+        return {
+            'clients': len(self.clients),
+            'frames': self.frames,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'bytes_sent': self.bytes_sent,
+            'payload_bytes': self.payload_bytes,
+            'encode_ms_per_frame': round(1000.0 * self.encode_seconds / max(1, self.frames), 3),
+            'cpu_seconds': time.process_time(),
+        }
+
+    async def run(self):
+        period = 1.0 / self.fps
+        start = time.perf_counter()
+        deadline = start
+        while True:
+            t0 = time.perf_counter()
+            key, delta = self.encoder.update(self.data, t0 - start)
+            self.encode_seconds += time.perf_counter() - t0
+            self.frames += 1
+            self.payload_bytes += len(delta)
+            key_frame = ws_frame(OP_BINARY, key)
+            delta_frame = key_frame if delta is key else ws_frame(OP_BINARY, delta)
+            for client in list(self.clients):
+                transport = client.writer.transport
+                if transport.is_closing():
+                    self.clients.discard(client)
+                    continue
+                if transport.get_write_buffer_size() > self.high_water:
+                    # slow client: skip this frame, resynchronise with a keyframe later
+                    client.dropped += 1
+                    client.needs_key = True
+                    self.dropped += 1
+                    continue
+                payload = key_frame if client.needs_key else delta_frame
+                client.writer.write(payload)
+                client.needs_key = False
+                client.sent += 1
+                client.bytes += len(payload)
+                self.sent += 1
+                self.bytes_sent += len(payload)
+            deadline += period
+            now = time.perf_counter()
+            if deadline < now - period:
+                deadline = now  # fell behind: do not burst
+            await asyncio.sleep(max(0.0, deadline - now))
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, headers = await read_http_request(reader)
+            if path.startswith('/ws') and headers.get('upgrade', '').lower() == 'websocket':
+                await self._websocket(reader, writer, headers)
+            elif path in ('/', '/index.html'):
+                body = VIEWER_PAGE.encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                             b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body)
+            else:
+                writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _websocket(self, reader, writer, headers):
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f"Sec-WebSocket-Accept: {accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n").encode())
+        writer.write(ws_frame(OP_TEXT, self.hello))
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # room for about one keyframe, so the kernel cannot queue seconds of frames behind a slow
+            # reader (Linux doubles the requested size for its own bookkeeping)
+            sndbuf = self.key_wire_size // 2 if sys.platform.startswith('linux') else self.key_wire_size
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+        client = Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    opcode, payload = await read_ws_frame(reader, MAX_CLIENT_FRAME)
+                except ValueError:
+                    writer.write(ws_frame(OP_CLOSE, struct.pack('!H', 1009)))  # message too big
+                    break
+                if opcode == OP_CLOSE:
+                    writer.write(ws_frame(OP_CLOSE, payload[:2]))
+                    break
+                if opcode == OP_PING:
+                    writer.write(ws_frame(OP_PONG, payload))
+                elif opcode == OP_TEXT and payload == b'stats':
+                    writer.write(ws_frame(OP_TEXT, json.dumps(self.stats()).encode()))
+        finally:
+            self.clients.discard(client)
+
+
+def load_year(xml_path, year):
+    try:
+        years, rainfall = load_rainfall_data(xml_path)
+        by_year = {str(y): v for y, v in zip(years, rainfall)}
+        if str(year) in by_year and by_year[str(year)]:
+            return by_year[str(year)]
+    except Exception as e:
+        print(f"Could not load {xml_path}: {e}; using the sample data")
+    return animationtest.RAIN_DATA
+
+
+async def serve(data, host='127.0.0.1', port=DEFAULT_PORT, fps=FPS, ready=None):
+    stream = FrameStreamServer(data, fps)
+    server = await asyncio.start_server(stream.handle, host, port, limit=MAX_HEADER)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await stream.run()
+
+
+# --- load test ---
+async def _ws_connect(host, port, limit=2 ** 16, rcvbuf=None):
+    if rcvbuf:
+        # the receive window is negotiated at connect, so shrink the buffer before connecting
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=limit)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=limit)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f'GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                  f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n').encode())
+    head = await reader.readuntil(b'\r\n\r\n')
+    if b' 101 ' not in head.split(b'\r\n', 1)[0]:
+        raise ConnectionError('handshake refused')
+    return reader, writer
+
+
+def _client_frame(opcode, payload):
+    # clients must mask; a zero mask keeps the payload as is
+    return struct.pack('!BB', 0x80 | opcode, 0x80 | len(payload)) + b'\0\0\0\0' + payload
+
+
+async def _stats(host, port):
+    reader, writer = await _ws_connect(host, port)
+    await read_ws_frame(reader)  # hello
+    writer.write(_client_frame(OP_TEXT, b'stats'))
+    while True:
+        opcode, payload = await read_ws_frame(reader)
+        if opcode == OP_TEXT:
+            writer.close()
+            return json.loads(payload)
+
+
+async def _load_client(host, port, counts, latest, stop, slow=False):
+    # counts: this client's totals; latest[0]: newest frame number any client has received
+    # a slow client has a small receive window and read buffer, so the server sees the backlog
+    # instead of the kernel or asyncio in this process absorbing it
+    if slow:
+        reader, writer = await _ws_connect(host, port, limit=1024, rcvbuf=4096)
+    else:
+        reader, writer = await _ws_connect(host, port)
+    try:
+        while not stop.is_set():
+            opcode, payload = await read_ws_frame(reader)
+            if opcode == OP_BINARY:
+                (frame,) = struct.unpack_from('<I', payload, 1)
+                latest[0] = max(latest[0], frame)
+                counts['frames'] += 1
+                counts['bytes'] += len(payload)
+                counts['keyframes'] += payload[:1] == b'K'
+                counts['lags'].append(latest[0] - frame)
+                if slow:
+                    await asyncio.sleep(0.5)  # a display that cannot keep up
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _load_test(host, port, clients, seconds, slow_share):
+    base0 = await _stats(host, port)
+    await asyncio.sleep(seconds / 2)
+    base1 = await _stats(host, port)
+    stop = asyncio.Event()
+    n_slow = int(clients * slow_share)
+    counts = [{'slow': i < n_slow, 'frames': 0, 'bytes': 0, 'keyframes': 0, 'lags': []} for i in range(clients)]
+    latest = [0]
+    tasks = []
+    for i in range(clients):
+        tasks.append(asyncio.ensure_future(_load_client(host, port, counts[i], latest, stop, slow=i < n_slow)))
+        if i % 50 == 49:
+            await asyncio.sleep(0.05)  # do not flood the accept queue
+    await asyncio.sleep(1.0)  # let every client connect
+    s0 = await _stats(host, port)
+    await asyncio.sleep(seconds)
+    s1 = await _stats(host, port)
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return base0, base1, s0, s1, counts
+
+
+def run_load_test(clients, seconds=10.0, fps=FPS, slow_share=0.05, xml_path=webbundle.DEFAULT_XML, year='2000'):
+    port = DEFAULT_PORT + 1
+    cmd = [sys.executable, '-m', 'hkvis_core.framestream', '--port', str(port), '--fps', str(fps),
+           '--xml', xml_path, '--year', str(year)]
+    server = subprocess.Popen(cmd, cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in server.stdout:
+            if line.startswith('Streaming'):  # listening
+                break
+        else:
+            print('server did not start')
+            return 1
+        base0, base1, s0, s1, counts = asyncio.run(_load_test('127.0.0.1', port, clients, seconds, slow_share))
+    finally:
+        server.terminate()
+        server.wait()
+    frames = max(1, s1['frames'] - s0['frames'])
+    base_cpu = (base1['cpu_seconds'] - base0['cpu_seconds']) / max(1, base1['frames'] - base0['frames'])
+    cpu = (s1['cpu_seconds'] - s0['cpu_seconds']) / frames
+    sent = s1['sent'] - s0['sent']
+    dropped = s1['dropped'] - s0['dropped']
+    print(f"{s1['clients'] - 1} clients ({int(clients * slow_share)} slow), {frames} frames at {fps} fps target "
+          f"({frames / seconds:.1f} achieved)")
+    print(f"server CPU per frame: {cpu * 1000:.2f} ms with clients, {base_cpu * 1000:.2f} ms without "
+          f"(encode {s1['encode_ms_per_frame']:.2f} ms); per client {(cpu - base_cpu) / max(1, clients) * 1e6:.1f} us/frame")
+    print(f"server CPU load: {cpu * frames / seconds * 100:.0f}% of one core")
+    print(f"bytes per frame: {(s1['payload_bytes'] - s0['payload_bytes']) / frames:,.0f} per client, "
+          f"{(s1['bytes_sent'] - s0['bytes_sent']) / frames:,.0f} total sent")
+    print(f"frames sent {sent:,}, dropped {dropped:,} ({100.0 * dropped / max(1, sent + dropped):.1f}%); "
+          f"test clients received {sum(c['frames'] for c in counts):,} frames in total, "
+          f"{sum(c['keyframes'] for c in counts):,} of them keyframes")
+    print(f"lag behind the newest frame (frames at {fps} fps):")
+    fast = [c for c in counts if not c['slow'] and c['lags']]
+    if fast:
+        worst = sorted(max(c['lags']) for c in fast)
+        mean = sorted(sum(c['lags']) / len(c['lags']) for c in fast)
+        print(f"  {len(fast)} fast clients: mean lag median {mean[len(mean) // 2]:.1f}, worst {mean[-1]:.1f}; "
+              f"max lag median {worst[len(worst) // 2]}, worst {worst[-1]}")
+    for i, c in enumerate(counts):
+        if c['slow']:
+            lags = c['lags'] or [0]
+            print(f"  slow client {i}: {c['frames']} frames ({c['keyframes']} keyframes), "
+                  f"lag mean {sum(lags) / len(lags):.1f}, max {max(lags)}, last {lags[-1]}")
+    return 0
+
+
+VIEWER_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>HK Rainfall stream</title>
+<style>html,body{margin:0;height:100%;background:#000}canvas{width:100vw;height:100vh;display:block}</style>
+</head><body><canvas id="c"></canvas><script>
+const canvas = document.getElementById('c'), ctx = canvas.getContext('2d');
+let hello = null, state = null;
+function connect(){
+  const ws = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + '/ws');
+  ws.binaryType = 'arraybuffer';
+  ws.onmessage = (m) => {
+    if(typeof m.data === 'string'){ hello = JSON.parse(m.data); state = new Uint8Array(hello.cols * hello.rows * 2); return; }
+    const b = new Uint8Array(m.data), n = hello.cols * hello.rows;
+    if(b[0] === 75){ state.set(b.subarray(5)); }            // 'K': cell plane, sparkle plane
+    else {                                                  // 'D': per plane, change bitmap + changed bytes
+      let o = 5;
+      for(let plane = 0; plane < 2; plane++){
+        const bits = o, base = plane * n;
+        o += (n + 7) >> 3;
+        for(let i = 0; i < n; i++) if(b[bits + (i >> 3)] & (128 >> (i & 7))) state[base + i] = b[o++];
+      }
+    }
+    requestAnimationFrame(draw);
+  };
+  ws.onclose = () => setTimeout(connect, 1000);
+}
+function draw(){
+  const h = hello, cw = 8, ch = 14;
+  canvas.width = h.cols * cw; canvas.height = h.rows * ch;
+  ctx.fillStyle = `rgb(${h.background})`; ctx.fillRect(0, 0, canvas.width, canvas.height);
+  ctx.font = '13px monospace'; ctx.textBaseline = 'top';
+  const lift = h.sparkle_max / (h.sparkle_levels - 1);
+  for(let r = 0; r < h.rows; r++) for(let c = 0; c < h.cols; c++){
+    const k = r * h.cols + c, v = state[k], g = (v / h.shades) | 0, p = (r * h.shades + v % h.shades) * 3;
+    const w = state[k + h.cols * h.rows] * lift, col = [0, 1, 2].map(i => Math.round(255 * w + h.palette[p+i] * (1 - w)));
+    ctx.fillStyle = `rgb(${col})`; ctx.fillText(h.chars[g], c * cw, r * ch);
+  }
+}
+connect();
+</script></body></html>
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Broadcast the animation to WebSocket clients.')
+    parser.add_argument('--xml', default=webbundle.DEFAULT_XML)
+    parser.add_argument('--year', default='2000')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--fps', type=int, default=FPS)
+    parser.add_argument('--load-test', type=int, metavar='CLIENTS', help='run a local load test and exit')
+    parser.add_argument('--seconds', type=float, default=10.0, help='load test duration')
+    parser.add_argument('--slow-share', type=float, default=0.05, help='share of deliberately slow test clients')
+    args = parser.parse_args(argv)
+    if args.load_test:
+        return run_load_test(args.load_test, args.seconds, args.fps, args.slow_share, args.xml, args.year)
+    data = load_year(args.xml, args.year)
+
+    def ready(port):
+        print(f"Streaming year {args.year} on http://{args.host}:{port}/ (Ctrl+C to stop)", flush=True)
+    try:
+        asyncio.run(serve(data, args.host, args.port, args.fps, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Year x month anomaly heatmap of the whole record.
+
+Every month of every year is one cell: years run left to right, months top
+to bottom, coloured by the departure from that month's climatological mean
+(`Climatology.anomalies`), dry in brown, wet in blue, missing months grey.
+
+Drawing is array work only:
+
+- `anomaly_colors` maps the whole (n_years, 12) anomaly matrix to RGB with
+  one `np.interp` per channel, so a new colour scale costs a fraction of a
+  millisecond and the view redraws at once
+- the cell colours are expanded to the on-screen size with one gather
+  through precomputed pixel -> (year, month) index arrays and written with a
+  single `pygame.surfarray.blit_array`; grid gaps index a background entry
+
+The pixel index arrays depend only on the view size and are rebuilt when the
+window changes; the colours are rebuilt when the data, scale or mode change.
+
+    view = HeatmapView(climatology, font)
+    view.draw(surface, rect, selected_year, mouse_pos)
+    view.year_at(pos); view.cell_at(pos)     # hit testing
+    view.adjust_scale(1.25)                  # wider colour scale
+
+    python -m hkvis_core.heatmapview [--xml data/monthlyElement.xml] [--out heatmap.png]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pygame
+
+try:
+    from hkvis_core.climatology import Climatology, MONTHS
+except ImportError:
+    from climatology import Climatology, MONTHS
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_XML = os.path.join(script_dir, '..', 'data', 'monthlyElement.xml')
+
+# diverging colour scale: -1 (driest) .. 0 (normal) .. +1 (wettest)
+COLOR_STOPS = np.array([-1.0, -0.5, 0.0, 0.5, 1.0])
+COLOR_RGB = np.array([
+    (140, 81, 10),
+    (216, 179, 101),
+    (245, 245, 245),
+    (90, 174, 230),
+    (8, 48, 150),
+], dtype=float)
+MISSING_COLOR = (70, 70, 70)
+BACKGROUND = (20, 20, 24)
+MODES = ('mm', 'percent')  # anomaly in mm, or relative to the monthly mean
+
+
+def anomaly_colors(values, scale):
+    """RGB uint8 array (values.shape + (3,)) for anomalies in units of `scale`; NaN -> missing colour."""
+    t = np.clip(np.asarray(values, dtype=float) / float(scale), -1.0, 1.0)
+    missing = np.isnan(t)
+    t = np.where(missing, 0.0, t)
+    out = np.empty(t.shape + (3,), dtype=np.uint8)
+    for c in range(3):
+        out[..., c] = np.interp(t, COLOR_STOPS, COLOR_RGB[:, c])
+    out[missing] = MISSING_COLOR
+    return out
+
+
+def anomaly_matrix(clim, mode='mm'):
+    """(n_years, 12) anomalies in mm, or in percent of the monthly mean."""
+    anom = clim.anomalies()
+    if mode == 'percent':
+        mean = clim.monthly_mean()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(mean > 0, anom / np.where(mean > 0, mean, 1.0) * 100.0, np.nan)
+    return anom
+
+
+def default_scale(values):
+    """A scale that saturates only the most extreme ~5% of cells."""
+    finite = np.abs(values[~np.isnan(values)])
+    if finite.size == 0:
+        return 1.0
+    return float(max(1.0, np.percentile(finite, 95)))
+
+
+class HeatmapView:
+    SELECTED_COLOR = (234, 128, 28)
+    HOVER_COLOR = (255, 255, 255)
+    LABEL_COLOR = (230, 230, 230)
+    LABEL_GAP = 22  # text above (readout, legend) and below (year labels) the grid
+
+    def __init__(self, clim, font=None, mode='mm', gap=1):
+        self.font = font
+        self.gap = gap
+        self.mode = mode
+        self.clim = None
+        self.scale = 1.0
+        self._colors = None      # (n_years * 12 + 1, 3): the last entry is the background
+        self._color_key = None
+        self._layout_key = None
+        self._surface = None
+        self._surface_key = None
+        self._axis_key = None
+        self._legend_key = None
+        self.set_climatology(clim)
+
+    # --- data and colour scale ---
+    def set_climatology(self, clim):
+        if clim is self.clim:
+            return
+        self.clim = clim
+        self.values = anomaly_matrix(clim, self.mode)
+        self.scale = default_scale(self.values)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.values = anomaly_matrix(self.clim, mode)
+        self.scale = default_scale(self.values)
+
+    def toggle_mode(self):
+        self.set_mode(MODES[(MODES.index(self.mode) + 1) % len(MODES)])
+
+    def adjust_scale(self, factor):
+        self.scale = max(1.0, self.scale * factor)
+
+    def _cell_colors(self):
+        key = (id(self.clim), self.clim.version, self.mode, self.scale)
+        if key != self._color_key:
+            if self.clim.version != (self._color_key or (None, None))[1]:
+                self.values = anomaly_matrix(self.clim, self.mode)
+            colors = np.empty((len(self.clim.years) * 12 + 1, 3), dtype=np.uint8)
+            colors[:-1] = anomaly_colors(self.values, self.scale).reshape(-1, 3)
+            colors[-1] = BACKGROUND
+            self._colors = colors
+            self._color_key = key
+        return self._colors
+
+    # --- layout ---
+    def _layout(self, rect):
+        n = len(self.clim.years)
+        key = (tuple(rect), n, id(self.clim))
+        if key == self._layout_key:
+            return
+        label_w = self.font.size('Mmm ')[0] if self.font is not None else 0
+        grid_w = rect.width - label_w
+        grid_h = rect.height - self.LABEL_GAP * 2
+        cell_w = max(1, grid_w // max(1, n))
+        cell_h = max(1, grid_h // 12)
+        self.grid = pygame.Rect(rect.x + label_w + (grid_w - cell_w * n) // 2,
+                                rect.y + self.LABEL_GAP + (grid_h - cell_h * 12) // 2, cell_w * n, cell_h * 12)
+        self.cell = (cell_w, cell_h)
+        # pixel -> flat cell index (year * 12 + month); the last `gap` pixels of each
+        # cell index the background entry at the end of the colour table
+        x = np.arange(self.grid.width)[:, None]
+        y = np.arange(self.grid.height)[None, :]
+        gap_x = self.gap if cell_w > 3 else 0
+        gap_y = self.gap if cell_h > 3 else 0
+        inside = (x % cell_w < cell_w - gap_x) & (y % cell_h < cell_h - gap_y)
+        self._pixel_index = np.where(inside, (x // cell_w) * 12 + y // cell_h, n * 12).astype(np.intp)
+        self._layout_key = key
+        self._surface_key = None
+
+    def _grid_surface(self):
+        colors = self._cell_colors()
+        key = (self._layout_key, self._color_key)
+        if key != self._surface_key:
+            if self._surface is None or self._surface.get_size() != self.grid.size:
+                self._surface = pygame.Surface(self.grid.size, 0, 32)
+            # colours packed into pixel values, then one gather and one blit
+            rs, gs, bs, _ = self._surface.get_shifts()
+            c = colors.astype(np.uint32)
+            packed = (c[:, 0] << rs) | (c[:, 1] << gs) | (c[:, 2] << bs)
+            pygame.surfarray.blit_array(self._surface, packed[self._pixel_index])
+            self._surface_key = key
+        return self._surface
+
+    # --- hit testing ---
+    def cell_at(self, pos):
+        """(year, month index) under `pos`, or None."""
+        if pos is None or self._layout_key is None or not self.grid.collidepoint(pos):
+            return None
+        i = (pos[0] - self.grid.x) // self.cell[0]
+        m = (pos[1] - self.grid.y) // self.cell[1]
+        return self.clim.years[i], m
+
+    def year_at(self, pos):
+        cell = self.cell_at(pos)
+        return cell[0] if cell is not None else None
+
+    def readout(self, cell):
+        year, m = cell
+        i = self.clim.index_of(year)
+        value = self.clim.matrix[i, m]
+        if np.isnan(value):
+            return f"{MONTHS[m]} {year}: no data"
+        mean = self.clim.monthly_mean()[m]
+        anom = value - mean
+        pct = f" ({anom / mean * 100:+.0f}%)" if mean > 0 else ''
+        return f"{MONTHS[m]} {year}: {value:,.1f} mm, {anom:+,.1f} mm vs mean {mean:,.1f}{pct}"
+
+    # --- drawing ---
+    def draw(self, surface, rect, selected=None, hover_pos=None):
+        self._layout(rect)
+        pygame.draw.rect(surface, BACKGROUND, rect)
+        surface.blit(self._grid_surface(), self.grid.topleft)
+        cw, ch = self.cell
+        if selected is not None and self.clim.has_year(selected):
+            x = self.grid.x + self.clim.index_of(selected) * cw
+            pygame.draw.rect(surface, self.SELECTED_COLOR, pygame.Rect(x - 1, self.grid.y - 1, cw + 2, self.grid.height + 2), 2)
+        hovered = self.cell_at(hover_pos)
+        if hovered is not None:
+            x = self.grid.x + self.clim.index_of(hovered[0]) * cw
+            pygame.draw.rect(surface, self.HOVER_COLOR, pygame.Rect(x - 1, self.grid.y + hovered[1] * ch - 1, cw + 2, ch + 2), 1)
+        if self.font is None:
+            return
+        for label, pos in self._axis_labels():
+            surface.blit(label, pos)
+        for label, pos in self._legend():
+            surface.blit(label, pos)
+        text = self.readout(hovered) if hovered is not None else \
+            "Click a year to select it   [ ] colour scale   M mm / %   H close"
+        surface.blit(self.font.render(text, True, self.LABEL_COLOR), (self.grid.x, self.grid.y - self.LABEL_GAP + 3))
+
+    def _axis_labels(self):
+        # month names on the left, a year label every decade that fits below
+        if self._axis_key != self._layout_key:
+            cw, ch = self.cell
+            labels = []
+            for m, name in enumerate(MONTHS):
+                label = self.font.render(name, True, self.LABEL_COLOR)
+                labels.append((label, (self.grid.x - self.font.size('Mmm ')[0], self.grid.y + m * ch + (ch - label.get_height()) // 2)))
+            step = 10
+            while step * cw < self.font.size('0000 ')[0]:
+                step *= 2
+            for i, year in enumerate(self.clim.years):
+                if year.isdigit() and int(year) % step == 0:
+                    labels.append((self.font.render(year, True, self.LABEL_COLOR), (self.grid.x + i * cw, self.grid.bottom + 3)))
+            self._axis = labels
+            self._axis_key = self._layout_key
+        return self._axis
+
+    def _legend(self):
+        # the colour scale as a strip with its end labels, top right, and a swatch for missing months
+        key = (self._layout_key, self.mode, self.scale, id(self.clim), self.clim.version)
+        if self._legend_key != key:
+            unit = 'mm' if self.mode == 'mm' else '%'
+            lo = self.font.render(f"-{self.scale:,.0f} {unit} drier", True, self.LABEL_COLOR)
+            hi = self.font.render(f"wetter +{self.scale:,.0f} {unit}", True, self.LABEL_COLOR)
+            strip_w = min(200, self.grid.width // 5)
+            y = self.grid.y - self.LABEL_GAP + 3
+            strip = pygame.Rect(self.grid.right - strip_w - hi.get_width() - 6, y + 2, strip_w, max(4, lo.get_height() - 4))
+            ramp = anomaly_colors(np.linspace(-self.scale, self.scale, strip_w), self.scale)
+            ramp_surface = pygame.transform.scale(pygame.surfarray.make_surface(ramp[:, None, :]), strip.size)
+            self._legend_items = [(ramp_surface, strip.topleft), (lo, (strip.x - lo.get_width() - 6, y)),
+                                  (hi, (strip.right + 6, y))]
+            if np.isnan(self.clim.matrix).any():
+                none = self.font.render("no data", True, self.LABEL_COLOR)
+                swatch = pygame.Surface((strip.height, strip.height))
+                swatch.fill(MISSING_COLOR)
+                x = strip.x - lo.get_width() - 18 - none.get_width() - swatch.get_width() - 4
+                self._legend_items += [(swatch, (x, strip.y)), (none, (x + swatch.get_width() + 4, y))]
+            self._legend_key = key
+        return self._legend_items
+
+    def state_key(self, selected, hover_pos):
+        """Changes whenever `draw` would paint something different."""
+        clim = self.clim
+        return (id(clim), clim.version, self.mode, self.scale, str(selected), self.cell_at(hover_pos))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the year x month anomaly heatmap.')
+    parser.add_argument('--xml', default=DEFAULT_XML)
+    parser.add_argument('--size', default='1200x560', help='WxH')
+    parser.add_argument('--mode', choices=MODES, default='mm')
+    parser.add_argument('--out', default='heatmap.png')
+    args = parser.parse_args(argv)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    clim = Climatology.from_xml(args.xml)
+    if not clim.years:
+        print(f"No rainfall data in {args.xml}")
+        return 1
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    surface = pygame.Surface(size)
+    view = HeatmapView(clim, pygame.font.Font(None, 18), mode=args.mode)
+    rect = surface.get_rect()
+    view.draw(surface, rect, clim.years[-1])
+    # a new colour scale: recolour + gather + blit, the cost of one interactive redraw
+    runs = 50
+    t0 = time.perf_counter()
+    for i in range(runs):
+        view.adjust_scale(1.1 if i % 2 else 1 / 1.1)
+        view.draw(surface, rect, clim.years[-1], rect.center)
+    ms = (time.perf_counter() - t0) / runs * 1000
+    pygame.image.save(surface, args.out)
+    print(f"{len(clim.years)} years x 12 months; redraw with a new colour scale {ms:.2f} ms; saved {args.out}")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
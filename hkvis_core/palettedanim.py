@@ -0,0 +1,188 @@
+"""8-bit palettized rendering of the ASCII rain animation.
+
+The RGB path in Main.py computes a colour for every cell every frame, because
+the column wave (`col_mod`) and the per-cell sparkle (`white_osc`) change
+with time. Here the animation surface is 8-bit and each cell only writes a
+palette index:
+
+    index = 1 + (row band * SHADES + density shade) * SPARKLE_GROUPS + sparkle group
+
+Index 0 is the background. Row band and density shade select the base
+colour (`row_base_color` + `final_cell_color`), and the sparkle group stands
+for the cell's phase: cells whose sparkle is faint (low sparsity) share group
+0, the others are bucketed by phase into `SPARKLE_GROUPS - 1` groups. Glyph
+pixels come from per-glyph coverage masks with NumPy, so no text is rendered
+per frame.
+
+The time-varying part moves into the palette: every frame the 6*6*7 = 252
+colours are recomputed and applied with `Surface.set_palette`, so the colour
+cost no longer depends on the number of cells. The approximations: rows and
+densities are banded, a sparkle group shimmers in unison at its members'
+mean phase and strength, the column wave is taken at the centre column (a
+gentle pulse of the whole field) and glyphs are not antialiased (coverage
+is thresholded at `COVERAGE`).
+
+    anim = PalettedAnimation(font)
+    frame = anim.render(rainfall, t)     # 8-bit surface, palette already set
+
+    python -m hkvis_core.palettedanim [--frames 120]
+
+times both paths and saves a side-by-side image for comparison.
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import numpy as np
+import pygame
+
+try:
+    from hkvis_core import animationtest
+except ImportError:
+    import animationtest
+
+ROW_BANDS = 6
+SHADES = 6
+SPARKLE_GROUPS = 7        # group 0: no visible sparkle; 1..: phase buckets
+SPARKLE_CUTOFF = 0.25     # cells with a lower sparsity do not sparkle
+COVERAGE = 96             # glyph alpha from which a pixel is drawn
+
+
+def cell_phase(cols=animationtest.COLS, rows=animationtest.ROWS):
+    """(rows, cols) sparkle phase and sparsity, the per-cell constants of the RGB loop."""
+    seed = (np.arange(rows, dtype=np.int64)[:, None] * 1315423911) ^ (np.arange(cols, dtype=np.int64)[None, :] * 2654435761)
+    return (seed % 1000) / 1000.0, ((seed >> 3) & 31) / 31.0
+
+
+def glyph_masks(font, threshold=COVERAGE):
+    """(len(ASCII_CHARS), h, w) bool glyph masks and the cell size (w, h)."""
+    w, h = font.size('M')
+    masks = np.zeros((len(animationtest.ASCII_CHARS), h, w), dtype=bool)
+    for i, ch in enumerate(animationtest.ASCII_CHARS):
+        alpha = pygame.surfarray.array_alpha(font.render(ch, True, (255, 255, 255))).T
+        gh, gw = min(h, alpha.shape[0]), min(w, alpha.shape[1])
+        masks[i, :gh, :gw] = alpha[:gh, :gw] >= threshold
+    return masks, (w, h)
+
+
+class PalettedAnimation:
+    def __init__(self, font, cols=animationtest.COLS, rows=animationtest.ROWS, padding=animationtest.PADDING):
+        self.cols = cols
+        self.rows = rows
+        self.padding = padding
+        self.masks, (self.char_w, self.char_h) = glyph_masks(font)
+        self.surface = pygame.Surface((self.char_w * cols + padding * 2, self.char_h * rows + padding * 2), 0, 8)
+        self._palette = np.zeros((256, 3), dtype=np.uint8)
+        self._palette[0] = animationtest.BG_COLOR
+        # base colours (row band, shade) without the column wave
+        self._tint = np.empty((ROW_BANDS, SHADES, 3))
+        for b in range(ROW_BANDS):
+            row = int((b + 0.5) * rows / ROW_BANDS)
+            base = animationtest.row_base_color(row, rows, top_whiten=animationtest.TOP_WHITEN_BIAS,
+                                                bottom_boost=animationtest.BOTTOM_WHITEN_BOOST)
+            for s in range(SHADES):
+                self._tint[b, s] = animationtest.apply_density_tint(base, (s + 0.5) / SHADES)
+        # sparkle groups: members' mean phase and strength
+        phase, sparsity = cell_phase(cols, rows)
+        group = np.where(sparsity < SPARKLE_CUTOFF, 0,
+                         1 + np.minimum((phase * (SPARKLE_GROUPS - 1)).astype(int), SPARKLE_GROUPS - 2))
+        self._group_phase = np.zeros(SPARKLE_GROUPS)
+        self._group_sparsity = np.zeros(SPARKLE_GROUPS)
+        for g in range(1, SPARKLE_GROUPS):
+            members = group == g
+            if members.any():
+                self._group_phase[g] = phase[members].mean()
+                self._group_sparsity[g] = sparsity[members].mean()
+        band = (np.arange(rows) * ROW_BANDS // rows)[:, None]
+        self._cell_base = (1 + band * SHADES * SPARKLE_GROUPS + group).astype(np.uint8)
+        self._view = (slice(padding, padding + self.char_w * cols), slice(padding, padding + self.char_h * rows))
+        self.surface.fill(0)
+
+    def palette(self, t):
+        """(256, 3) colours for time t: the column wave and the sparkle of every group."""
+        col_mod = (np.sin(t * 1.2 + (self.cols // 2) * 0.12) + 1) / 2
+        mod = 1.0 + (col_mod - 0.5) * 0.08
+        white = (((np.sin(t * 1.5 + self._group_phase * 6.28318) + 1) / 2) ** 3) * 0.9 * (self._group_sparsity * 0.8)
+        rgb = np.clip(np.floor(self._tint * mod), 0, 255)[:, :, None, :]
+        w = white[None, None, :, None]
+        colours = (255 * w + rgb * (1 - w)).astype(np.uint8)
+        self._palette[1:1 + colours.size // 3] = colours.reshape(-1, 3)
+        return self._palette
+
+    def render(self, data, t):
+        """Draw the frame for time t into `self.surface` and return it."""
+        norm = animationtest.fluid_norm_array(data, t, cols=self.cols, rows=self.rows,
+                                              speed_factor=animationtest.SPEED_FACTOR,
+                                              base_scale=animationtest.BASE_TIME_SCALE)
+        shade = np.minimum((norm * SHADES).astype(np.uint8), SHADES - 1)
+        index = self._cell_base + shade * SPARKLE_GROUPS
+        # (rows, cols, h, w) glyph pixels -> (rows*h, cols*w) image
+        cells = self.masks[animationtest.glyph_indices(norm)] * index[:, :, None, None]
+        image = cells.transpose(0, 2, 1, 3).reshape(self.rows * self.char_h, self.cols * self.char_w)
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        pixels[self._view] = image.T
+        del pixels
+        self.surface.set_palette(self.palette(t).tolist())
+        return self.surface
+
+
+def _render_rgb(font, surface, data, t):
+    # the per-cell loop from Main.py, for comparison
+    char_w, char_h = font.size('M')
+    surface.fill(animationtest.BG_COLOR)
+    grid = animationtest.generate_fluid_pattern(data, t, cols=animationtest.COLS, rows=animationtest.ROWS,
+                                                speed_factor=animationtest.SPEED_FACTOR,
+                                                base_scale=animationtest.BASE_TIME_SCALE)
+    white = animationtest.white_factor_array(t)
+    for row_idx, row in enumerate(grid):
+        base = animationtest.row_base_color(row_idx, animationtest.ROWS)
+        for col_idx, (ch, norm) in enumerate(row):
+            col_mod = (np.sin((t * 1.2) + col_idx * 0.12) + 1) / 2
+            color = animationtest.final_cell_color(base, norm, row_idx, animationtest.ROWS,
+                                                   time_mod=col_mod, white_factor=white[row_idx, col_idx])
+            surface.blit(font.render(ch, True, color),
+                         (animationtest.PADDING + col_idx * char_w, animationtest.PADDING + row_idx * char_h))
+    return surface
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the palettized and RGB animation paths.')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--out', default=os.path.join(tempfile.gettempdir(), 'hkvis_palette_compare.png'))
+    args = parser.parse_args(argv)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    monos = pygame.font.match_font('consolas, courier, monospace')
+    font = pygame.font.Font(monos, animationtest.FONT_SIZE) if monos else pygame.font.SysFont('couriernew', animationtest.FONT_SIZE)
+    anim = PalettedAnimation(font)
+    rgb = pygame.Surface(anim.surface.get_size())
+    data = animationtest.RAIN_DATA
+    results = {}
+    for name, draw in (('palette', lambda t: anim.render(data, t)), ('rgb', lambda t: _render_rgb(font, rgb, data, t))):
+        frames = args.frames if name == 'palette' else max(1, args.frames // 4)
+        t0 = time.perf_counter()
+        for i in range(frames):
+            draw(i / 60.0)
+        results[name] = (time.perf_counter() - t0) / frames * 1000
+    t0 = time.perf_counter()
+    for i in range(args.frames):
+        anim.surface.set_palette(anim.palette(i / 60.0).tolist())
+    palette_ms = (time.perf_counter() - t0) / args.frames * 1000
+    w, h = anim.surface.get_size()
+    print(f"rgb per-cell loop: {results['rgb']:.2f} ms/frame ({w * h * rgb.get_bytesize():,} byte surface)")
+    print(f"palettized:        {results['palette']:.2f} ms/frame ({w * h * anim.surface.get_bytesize():,} byte surface), "
+          f"of which palette update {palette_ms:.3f} ms")
+    t = 2.0
+    side = pygame.Surface((w * 2 + 8, h))
+    side.blit(_render_rgb(font, rgb, data, t), (0, 0))
+    side.blit(anim.render(data, t), (w + 8, 0))
+    pygame.image.save(side, args.out)
+    print(f"saved {args.out} (left: rgb, right: palettized)")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
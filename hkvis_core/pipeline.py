@@ -0,0 +1,335 @@
+"""Incremental build pipeline for the batch outputs: fetch -> parse -> charts -> atlas / frames.
+
+The batch outputs used to come from separate entry points (`xmldata` for the
+download, `saveallcharts` for the chart images, `chartatlas` and `webbundle`
+for the overview atlas and the web bundle, or the interactive menu in
+Viusalizedatatest.py), each of which redid all of its work. Here they are
+the stages of one dependency graph:
+
+    fetch    download the XML if the server has a newer copy (only with --fetch)
+    parse    XML -> monthly values per year, cached in the manifest
+    charts   rainfall_<year>.png (or .svg) with a saveallcharts backend
+    atlas    rainfall_charts/atlas.png, the thumbnails of the chart overview
+    frames   the web bundle in docs/bundle (frame packs and chart copies)
+
+The manifest (`MANIFEST_PATH`) records, per stage and per year, a hash of
+everything that year's output depends on: the year's values and the stage
+parameters (backend and size, clip length and engine settings) and, for the
+bundle, the key of the year's chart. A stage redoes only the years whose key
+changed or whose output is missing, so appending one month to the XML
+re-renders one chart and one frame pack instead of every year; a stage whose
+keys all match is skipped. Charts of years that left the data are removed.
+The parse stage keeps the values of every year in the manifest, keyed by a
+hash of the XML, so an unchanged file is not parsed again.
+
+Stages whose dependencies are done run side by side on a thread pool (atlas
+and frames both wait for charts only; their fallback chart renders share
+svgchart's font cache, so both take `chartsurface.render_lock`); charts
+spreads its years over the saveallcharts process pool. `--force` also makes
+the atlas and the web bundle ignore what they could reuse. Every stage reports its time and how many years
+it redid, and `--dry-run` prints that plan without writing anything.
+
+    python -m hkvis_core.pipeline [--fetch] [--stages charts,atlas] [--force] [--dry-run]
+                                  [--backend mpl|svg|raster] [--workers N]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pygame
+
+try:
+    from hkvis_core import chartatlas, chartsurface, datacache, saveallcharts, webbundle, xmldata
+except ImportError:
+    import chartatlas
+    import chartsurface
+    import datacache
+    import saveallcharts
+    import webbundle
+    import xmldata
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(script_dir, '..')
+DEFAULT_XML = os.path.join(ROOT_DIR, 'data', 'monthlyElement.xml')
+DEFAULT_CHART_DIR = os.path.join(ROOT_DIR, 'rainfall_charts')
+DEFAULT_BUNDLE_DIR = os.path.join(ROOT_DIR, 'docs', 'bundle')
+MANIFEST_PATH = os.path.join(ROOT_DIR, 'data', 'pipeline.json')
+FORMAT_VERSION = 1
+STAGES = ('fetch', 'parse', 'charts', 'atlas', 'frames')
+DEPENDS = {
+    'fetch': (),
+    'parse': ('fetch',),
+    'charts': ('parse',),
+    'atlas': ('charts',),
+    'frames': ('parse', 'charts'),
+}
+
+
+def _key(*parts):
+    return datacache.content_key(*parts)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == FORMAT_VERSION else {}
+
+
+class StageResult:
+    def __init__(self, name):
+        self.name = name
+        self.status = 'pending'   # ran, planned, skipped, off, failed, blocked
+        self.done = 0
+        self.total = 0
+        self.seconds = 0.0
+        self.note = ''
+
+    def line(self):
+        counts = f'{self.done}/{self.total}' if self.total else '-'
+        return f'{self.name:<8} {self.status:<8} {counts:>9} {self.seconds:>8.2f}s  {self.note}'
+
+
+class Pipeline:
+    """One run over the stage graph; `run()` returns the StageResults in stage order."""
+
+    def __init__(self, xml_path=DEFAULT_XML, chart_dir=DEFAULT_CHART_DIR, bundle_dir=DEFAULT_BUNDLE_DIR,
+                 manifest_path=MANIFEST_PATH, stages=None, fetch=False, force=False, dry_run=False,
+                 backend='mpl', workers=saveallcharts.DEFAULT_WORKERS, seconds=webbundle.SECONDS,
+                 fps=webbundle.FPS):
+        self.xml_path = xml_path
+        self.chart_dir = chart_dir
+        self.bundle_dir = bundle_dir
+        self.manifest_path = manifest_path
+        self.stages = [s for s in STAGES if stages is None or s in stages]
+        self.fetch = fetch
+        self.force = force
+        self.dry_run = dry_run
+        self.backend = backend
+        self.workers = workers
+        self.seconds = seconds
+        self.fps = fps
+        self.old = load_manifest(manifest_path)
+        # stages that do not run keep what the previous run recorded, even with --force
+        self.manifest = {'version': FORMAT_VERSION,
+                         'stages': {k: v for k, v in self.old.get('stages', {}).items() if k not in self.stages}}
+        if force:
+            self.old = {}
+        self.results = {name: StageResult(name) for name in STAGES}
+        for name in STAGES:
+            if name not in self.stages:
+                self.results[name].status = 'off'
+        self._lock = threading.Lock()
+
+    # -- manifest helpers
+
+    def _previous(self, stage):
+        return self.old.get('stages', {}).get(stage, {})
+
+    def _record(self, stage, entry):
+        with self._lock:
+            self.manifest['stages'][stage] = entry
+
+    def _recorded(self, stage):
+        with self._lock:
+            return self.manifest['stages'].get(stage, {})
+
+    def values(self):
+        """{year: [12 monthly values]} from the parse stage."""
+        values = self._recorded('parse').get('values')
+        if values is None:
+            raise RuntimeError('no parsed data: run the parse stage first')
+        return values
+
+    def _stale(self, stage, keys, output_exists):
+        old = self._previous(stage).get('years', {})
+        return [y for y, k in keys.items() if old.get(y) != k or not output_exists(y)]
+
+    # -- stages
+
+    def stage_fetch(self, result):
+        if not self.fetch:
+            result.status = 'off'
+            return
+        result.total = 1
+        if self.dry_run:
+            result.note = 'would ask the server for a newer XML'
+            return
+        fetched = xmldata.download_xml(output_file=self.xml_path)
+        if fetched is None:
+            raise RuntimeError('download failed')
+        result.done = int(fetched.modified)
+        result.note = 'new XML' if fetched.modified else 'not modified'
+
+    def stage_parse(self, result):
+        with open(self.xml_path, 'rb') as f:
+            source = hashlib.sha1(f.read()).hexdigest()
+        prev = self._previous('parse')
+        result.total = 1
+        if prev.get('source') == source and 'values' in prev:
+            self._record('parse', prev)
+            result.note = f"{len(prev['values'])} years, XML unchanged"
+            return
+        years, values = datacache.load_element(self.xml_path)
+        entry = {'source': source, 'values': {str(y): v for y, v in zip(years, values)}}
+        changed = [y for y, v in entry['values'].items() if prev.get('values', {}).get(y) != v]
+        self._record('parse', entry)
+        result.done = 1
+        result.note = f'{len(years)} years, {len(changed)} changed'
+
+    def _chart_path(self, year):
+        ext = 'svg' if self.backend == 'svg' else 'png'
+        return os.path.join(self.chart_dir, f'rainfall_{year}.{ext}')
+
+    def chart_keys(self):
+        params = [self.backend, saveallcharts.LIGHT_SIZE]
+        return {y: _key(params, v) for y, v in self.values().items()}
+
+    def stage_charts(self, result):
+        keys = self.chart_keys()
+        stale = self._stale('charts', keys, lambda y: os.path.exists(self._chart_path(y)))
+        gone = [y for y in self._previous('charts').get('years', {}) if y not in keys]
+        result.total = len(keys)
+        result.done = len(stale)
+        if gone:
+            result.note = f'{len(gone)} removed'
+        if not self.dry_run:
+            if stale:
+                saveallcharts.export_all(self.xml_path, self.chart_dir, years=stale, workers=self.workers,
+                                         verbose=False, backend=self.backend)
+            for y in gone:
+                for ext in ('png', 'svg'):
+                    try:
+                        os.remove(os.path.join(self.chart_dir, f'rainfall_{y}.{ext}'))
+                    except OSError:
+                        pass
+        self._record('charts', {'years': keys})
+
+    def stage_atlas(self, result):
+        chart_keys = self._recorded('charts').get('years', {})
+        key = _key(chartatlas.THUMB_SIZE, chartatlas.COLUMNS, chart_keys)
+        prev = self._previous('atlas')
+        result.total = len(chart_keys)
+        atlas_path, _ = chartatlas.atlas_paths(self.chart_dir)
+        if prev.get('key') == key and os.path.exists(atlas_path):
+            self._record('atlas', prev)
+            return
+        if os.path.exists(atlas_path):
+            old_keys = prev.get('charts', {})
+            result.done = sum(1 for y, k in chart_keys.items() if old_keys.get(y) != k)
+        else:
+            result.done = len(chart_keys)
+        if not self.dry_run:
+            chartatlas.build_atlas(self.chart_dir, rainfall_by_year=self.values(),
+                                   render_lock=chartsurface.render_lock, force=self.force)
+        self._record('atlas', {'key': key, 'charts': chart_keys})
+
+    def stage_frames(self, result):
+        chart_keys = self._recorded('charts').get('years', {})
+        keys = {y: _key(webbundle._input_key(v, self.seconds, self.fps), chart_keys.get(y))
+                for y, v in self.values().items() if v}
+        bundle = webbundle.load_manifest(self.bundle_dir) or {}
+        stale = self._stale('frames', keys, lambda y: y in bundle.get('years', {}))
+        gone = [y for y in self._previous('frames').get('years', {}) if y not in keys]
+        result.total = len(keys)
+        result.done = len(stale)
+        if (stale or gone) and not self.dry_run:
+            # webbundle keeps its own per-year keys, so only the stale years are rebuilt (all with --force)
+            webbundle.build_bundle(self.xml_path, self.bundle_dir, self.chart_dir, seconds=self.seconds,
+                                   fps=self.fps, verbose=False, force=self.force,
+                                   render_lock=chartsurface.render_lock)
+        self._record('frames', {'years': keys})
+
+    # -- scheduling
+
+    def _run_stage(self, name):
+        result = self.results[name]
+        start = time.perf_counter()
+        getattr(self, 'stage_' + name)(result)
+        result.seconds = time.perf_counter() - start
+        if result.status == 'pending':
+            result.status = ('planned' if self.dry_run else 'ran') if result.done else 'skipped'
+        return result
+
+    def run(self):
+        """Run the selected stages as their dependencies finish."""
+        pending = list(self.stages)
+        finished = set(s for s in STAGES if s not in self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=len(STAGES)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = DEPENDS[name]
+                    if any(self.results[d].status in ('failed', 'blocked') for d in deps):
+                        self.results[name].status = 'blocked'
+                        pending.remove(name)
+                        finished.add(name)
+                    elif all(d in finished for d in deps):
+                        running[pool.submit(self._run_stage, name)] = name
+                        pending.remove(name)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.results[name].status = 'failed'
+                        self.results[name].note = f'{type(e).__name__}: {e}'
+                    finished.add(name)
+        if not self.dry_run:
+            self.save()
+        return [self.results[s] for s in STAGES]
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        with open(self.manifest_path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, separators=(',', ':'))
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild charts, atlas and web bundle for the years that changed.')
+    parser.add_argument('--xml', default=DEFAULT_XML)
+    parser.add_argument('--chart-dir', default=DEFAULT_CHART_DIR)
+    parser.add_argument('--bundle-dir', default=DEFAULT_BUNDLE_DIR)
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--stages', help=f"comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument('--fetch', action='store_true', help='download the XML first if it changed')
+    parser.add_argument('--force', action='store_true', help='ignore the manifest and redo everything')
+    parser.add_argument('--dry-run', action='store_true', help='print what would be redone')
+    parser.add_argument('--backend', choices=saveallcharts.BACKENDS, default='mpl')
+    parser.add_argument('--workers', type=int, default=saveallcharts.DEFAULT_WORKERS)
+    parser.add_argument('--seconds', type=float, default=webbundle.SECONDS)
+    parser.add_argument('--fps', type=int, default=webbundle.FPS)
+    args = parser.parse_args(argv)
+    stages = None
+    if args.stages:
+        stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+        unknown = [s for s in stages if s not in STAGES]
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    start = time.perf_counter()
+    pipeline = Pipeline(args.xml, args.chart_dir, args.bundle_dir, args.manifest, stages=stages,
+                        fetch=args.fetch, force=args.force, dry_run=args.dry_run, backend=args.backend,
+                        workers=args.workers, seconds=args.seconds, fps=args.fps)
+    results = pipeline.run()
+    print(f"{'stage':<8} {'status':<8} {'redone':>9} {'time':>9}")
+    for result in results:
+        print(result.line())
+    print(f"{'dry run' if args.dry_run else 'total'} {time.perf_counter() - start:.2f}s")
+    return 1 if any(r.status in ('failed', 'blocked') for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""Local HTTP query service for rainfall slices and charts.
+
+Runs fully offline against data/monthlyElement.xml:
+
+    GET /years                          -> ["1884", ..., "2025"]
+    GET /rainfall?from=1990&to=1999     -> {"1990": [12 values], ...}
+    GET /rainfall?from=1990&to=1999&months=6-9
+    GET /stats/1997                     -> climatology figures for one year
+    GET /chart/1997.png                 -> downloadchart.plot_rainfall_for_year as PNG
+
+Responses are kept in an LRU cache keyed by request and data-file version and
+carry an ETag (If-None-Match answers 304). Charts are rendered in a process
+pool so matplotlib never runs on the request threads.
+
+    python -m hkvis_core.queryservice --port 8765
+    python -m hkvis_core.queryservice --bench
+"""
+import os
+import io
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import http.client
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+try:
+    from hkvis_core import datacache
+    from hkvis_core.climatology import Climatology
+except ImportError:
+    import datacache
+    from climatology import Climatology
+
+DEFAULT_XML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'monthlyElement.xml')
+DEFAULT_PORT = 8765
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_ENTRIES = 1024
+CHART_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+class ResponseCache:
+    """Byte-bounded LRU of (etag, content_type, body) entries."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, content_type, body):
+        entry = ('"' + hashlib.sha1(body).hexdigest() + '"', content_type, body)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[2])
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped[2])
+        return entry
+
+
+def _render_chart_png(xml_path, year):
+    # runs in a worker process; keep matplotlib off the service process entirely
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    try:
+        from hkvis_core.downloadchart import plot_rainfall_for_year
+    except ImportError:
+        from downloadchart import plot_rainfall_for_year
+    fig, ax = plot_rainfall_for_year(xml_path, year)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    plt.close(fig)
+    return buf.getvalue()
+
+
+class QueryService:
+    def __init__(self, xml_path=DEFAULT_XML_PATH, chart_workers=CHART_WORKERS, cache=None):
+        self.xml_path = os.path.abspath(xml_path)
+        self.cache = cache or ResponseCache()
+        self.chart_pool = ProcessPoolExecutor(max_workers=chart_workers)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._clim = None
+        self._clim_version = None
+
+    def close(self):
+        self.chart_pool.shutdown(wait=True, cancel_futures=True)
+
+    def data_version(self):
+        st = os.stat(self.xml_path)
+        return (st.st_size, st.st_mtime_ns)
+
+    def climatology(self):
+        version = self.data_version()
+        if self._clim is None or self._clim_version != version:
+            self._clim = Climatology.from_xml(self.xml_path)
+            self._clim_version = version
+        return self._clim
+
+    # --- endpoint bodies: return (content_type, bytes) or raise LookupError/ValueError ---
+    def _json(self, obj):
+        return 'application/json', json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def years(self, query):
+        years, _ = datacache.load_element(self.xml_path)
+        return self._json(years)
+
+    def rainfall(self, query):
+        years, values = datacache.load_element(self.xml_path)
+        lo = query.get('from', [years[0]])[0]
+        hi = query.get('to', [years[-1]])[0]
+        m_lo, m_hi = 1, 12
+        if 'months' in query:
+            parts = query['months'][0].split('-')
+            m_lo, m_hi = int(parts[0]), int(parts[-1])
+            if not (1 <= m_lo <= m_hi <= 12):
+                raise ValueError('months must be within 1-12')
+        out = {y: v[m_lo - 1:m_hi] for y, v in zip(years, values) if int(lo) <= int(y) <= int(hi)}
+        return self._json(out)
+
+    def stats(self, year):
+        clim = self.climatology()
+        if not clim.has_year(year):
+            raise LookupError(f'Year {year} not found')
+        s = clim.year_stats(year)
+        as_float = lambda v: None if v != v else float(v)
+        return self._json({
+            'year': year,
+            'highest': as_float(s['highest']),
+            'lowest': as_float(s['lowest']),
+            'average': as_float(s['average']),
+            'total': as_float(s['total']),
+            'anomaly': as_float(s['anomaly']),
+            'rank': as_float(s['rank']),
+            'ranked_years': s['ranked_years'],
+            'monthly_anomaly': [as_float(v) for v in s['monthly_anomaly']],
+        })
+
+    def chart(self, year):
+        years, _ = datacache.load_element(self.xml_path)
+        if year not in years:
+            raise LookupError(f'Year {year} not found')
+        key = (year, self.data_version())
+        # concurrent requests for the same chart share one render
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = self.chart_pool.submit(_render_chart_png, self.xml_path, year)
+                self._inflight[key] = fut
+        try:
+            return 'image/png', fut.result()
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def respond(self, path, query):
+        """Return (etag, content_type, body) for a request, using the cache."""
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in query.items())), self.data_version())
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+        parts = [p for p in path.split('/') if p]
+        if parts == ['years']:
+            content_type, body = self.years(query)
+        elif parts == ['rainfall']:
+            content_type, body = self.rainfall(query)
+        elif len(parts) == 2 and parts[0] == 'stats':
+            content_type, body = self.stats(parts[1])
+        elif len(parts) == 2 and parts[0] == 'chart' and parts[1].endswith('.png'):
+            content_type, body = self.chart(parts[1][:-4])
+        else:
+            raise LookupError(f'No route for {path}')
+        return self.cache.put(key, content_type, body)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # headers and body go out in separate writes; avoid the Nagle/delayed-ACK stall
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, content_type=None, body=b'', etag=None):
+            self.send_response(status)
+            if content_type:
+                self.send_header('Content-Type', content_type)
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body and self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                etag, content_type, body = service.respond(url.path, parse_qs(url.query))
+            except LookupError as e:
+                return self._send(404, 'text/plain', str(e).encode('utf-8'))
+            except ValueError as e:
+                return self._send(400, 'text/plain', str(e).encode('utf-8'))
+            except Exception as e:
+                return self._send(500, 'text/plain', str(e).encode('utf-8'))
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, etag=etag)
+            self._send(200, content_type, body, etag)
+
+        do_HEAD = do_GET
+
+    return Handler
+
+
+def serve(xml_path=DEFAULT_XML_PATH, host='127.0.0.1', port=DEFAULT_PORT, chart_workers=CHART_WORKERS):
+    """Start the service on a background thread; returns (server, service)."""
+    service = QueryService(xml_path, chart_workers=chart_workers)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='hkvis-query-service', daemon=True).start()
+    return server, service
+
+
+def benchmark(host, port, paths, total=500, concurrency=8, use_etag=False):
+    """Issue `total` GETs over `concurrency` keep-alive connections.
+
+    Returns a dict with throughput and latency percentiles (milliseconds).
+    """
+    latencies = []
+    lock = threading.Lock()
+    per_worker = max(1, total // concurrency)
+
+    def worker(n):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        etags = {}
+        local = []
+        for i in range(per_worker):
+            path = paths[(n + i) % len(paths)]
+            headers = {'If-None-Match': etags[path]} if use_etag and path in etags else {}
+            t = time.perf_counter()
+            conn.request('GET', path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            local.append(time.perf_counter() - t)
+            if resp.getheader('ETag'):
+                etags[path] = resp.getheader('ETag')
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return {
+        'requests': len(latencies),
+        'seconds': wall,
+        'rps': len(latencies) / wall if wall else 0.0,
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def run_benchmark(xml_path=DEFAULT_XML_PATH, total=500, concurrency=8):
+    server, service = serve(xml_path, port=0)
+    port = server.server_address[1]
+    try:
+        years, _ = datacache.load_element(xml_path)
+        sample = years[::max(1, len(years) // 10)]
+        scenarios = [
+            ('json slices', [f'/rainfall?from={y}&to={y}' for y in sample] + ['/years']),
+            ('charts (cold)', [f'/chart/{y}.png' for y in sample]),
+            ('charts (warm)', [f'/chart/{y}.png' for y in sample]),
+        ]
+        for name, paths in scenarios:
+            n = len(paths) if name == 'charts (cold)' else total
+            r = benchmark('127.0.0.1', port, paths, total=n, concurrency=min(concurrency, n))
+            print(f"{name:<14} {r['requests']:>5} req  {r['rps']:>8.1f} req/s  "
+                  f"p50 {r['p50_ms']:.2f} ms  p95 {r['p95_ms']:.2f} ms  max {r['max_ms']:.2f} ms")
+        r = benchmark('127.0.0.1', port, scenarios[2][1], total=total, concurrency=concurrency, use_etag=True)
+        print(f"{'charts (304)':<14} {r['requests']:>5} req  {r['rps']:>8.1f} req/s  "
+              f"p50 {r['p50_ms']:.2f} ms  p95 {r['p95_ms']:.2f} ms  max {r['max_ms']:.2f} ms")
+        print(f"cache hits {service.cache.hits}, misses {service.cache.misses}")
+    finally:
+        server.shutdown()
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve rainfall data and charts over local HTTP.')
+    parser.add_argument('--xml', default=DEFAULT_XML_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=CHART_WORKERS)
+    parser.add_argument('--bench', action='store_true', help='run the latency/throughput benchmark and exit')
+    args = parser.parse_args(argv)
+    if args.bench:
+        run_benchmark(args.xml)
+        return 0
+    server, service = serve(args.xml, args.host, args.port, args.workers)
+    print(f"Serving rainfall data on http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Procedural rain audio driven by the monthly rainfall.
+
+`RainAudio` synthesizes rain with NumPy and streams it through one reserved
+mixer channel (`pygame.sndarray.make_sound` + `Channel.queue`) in short
+blocks from its own thread, so the sound neither needs the MP3 decoder nor
+depends on the visual frame rate. Each block is
+
+- a noise bed: white noise through a box low-pass whose width shrinks as the
+  rain gets heavier (light rain sounds distant and dull, heavy rain bright)
+- drops: Poisson-distributed impacts drawn from a small bank of decaying
+  "bubble" chirps, randomly panned and scattered into the block with one
+  `np.bincount` per channel; a drop crossing the block end carries over
+
+The rainfall only enters through an envelope computed ahead of time:
+`month_params(intensity)` maps the 0..1 monthly intensities of a year (see
+`Climatology.intensity`) to per-month drop density, bed level, filter width
+and output level, and the audio thread walks through the months on its own
+clock (`MONTH_STEP` seconds each), easing between neighbouring months.
+
+Memory stays fixed: the drop bank and the mixing buffers are allocated once,
+and at most two sounds are ever queued on the channel. A sound is one block;
+when the queue runs dry (the thread was starved of CPU or the GIL) later
+sounds carry more blocks, up to `MAX_BLOCKS_PER_SOUND`, trading envelope
+latency for fewer gaps.
+
+    audio = RainAudio()            # after pygame.mixer.init()
+    audio.set_envelope(month_params(clim.intensity()[clim.index_of('1997')]))
+    audio.start()
+"""
+import threading
+import time
+
+import numpy as np
+import pygame
+
+BLOCK_SECONDS = 0.08   # length of one synthesized block
+MAX_BLOCKS_PER_SOUND = 4  # queued sounds grow up to this many blocks after underruns
+MONTH_STEP = 0.8       # seconds of audio per month of the envelope
+DROP_VARIANTS = 12     # size of the drop bank
+MIN_KERNEL, MAX_KERNEL = 2, 12  # box low-pass width (samples), heavy .. light rain
+
+# per-month envelope columns
+DENSITY, BED, KERNEL, LEVEL = range(4)
+
+# pygame.mixer.get_init() size -> sample dtype (negative sizes are signed; 32 is float)
+SAMPLE_DTYPES = {8: np.uint8, -8: np.int8, 16: np.uint16, -16: np.int16, -32: np.int32, 32: np.float32}
+
+
+def month_params(intensity):
+    """(..., 12, 4) envelope (drops/s, bed gain, filter width, level) from 0..1 intensities."""
+    t = np.clip(np.nan_to_num(np.asarray(intensity, dtype=float)), 0.0, 1.0)
+    out = np.empty(t.shape + (4,))
+    out[..., DENSITY] = 15.0 + 900.0 * t ** 1.5
+    out[..., BED] = 0.04 + 0.2 * t
+    out[..., KERNEL] = MAX_KERNEL - (MAX_KERNEL - MIN_KERNEL) * t
+    # same curve the MP3 volume used: quiet but audible in the driest month
+    out[..., LEVEL] = 0.05 + 0.95 * t ** 0.9
+    return out
+
+
+def _drop_bank(rate, rng):
+    """(DROP_VARIANTS, max_len) float32 bubble chirps, peak 1, zero padded."""
+    lengths = (rate * rng.uniform(0.015, 0.05, DROP_VARIANTS)).astype(int)
+    bank = np.zeros((DROP_VARIANTS, int(lengths.max())), dtype=np.float32)
+    for i, n in enumerate(lengths):
+        t = np.arange(n) / rate
+        f0 = rng.uniform(1500.0, 4500.0)
+        # a bubble's resonance rises as it shrinks; the impact is a 1 ms click
+        phase = 2 * np.pi * f0 * (t + 0.3 * t * t / (2 * t[-1]))
+        tone = np.sin(phase) * np.exp(-t / (t[-1] / 5))
+        click = rng.standard_normal(n) * np.exp(-t / 0.001) * 0.5
+        drop = tone + click
+        bank[i, :n] = drop / np.abs(drop).max()
+    return bank
+
+
+class RainAudio:
+    def __init__(self, block_seconds=BLOCK_SECONDS, month_step=MONTH_STEP, seed=None):
+        rate, size, channels = pygame.mixer.get_init()
+        if size not in SAMPLE_DTYPES:
+            raise ValueError(f'unsupported mixer sample size {size}')
+        self.rate = rate
+        self.size = size
+        self.channels = channels
+        self.month_step = month_step
+        self.block = max(256, int(rate * block_seconds))
+        self._rng = np.random.default_rng(seed)
+        self._bank = _drop_bank(rate, self._rng)
+        tail = self._bank.shape[1]
+        # mix buffer: one block plus room for drops running past its end
+        self._mix = np.zeros((2, self.block + tail), dtype=np.float32)
+        self._noise_tail = np.zeros((2, MAX_KERNEL - 1), dtype=np.float32)
+        self._envelope = month_params(np.full(12, 0.3))
+        self._position = 0.0  # seconds of audio produced, drives the month
+        self._level = None
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+        self.blocks_per_sound = 1
+        self.blocks = 0
+        self.underruns = 0
+        self.synth_seconds = 0.0
+        self._paused = False
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # --- control (main thread) ---
+    def set_envelope(self, params):
+        """Switch to another year's (12, 4) `month_params` envelope."""
+        self._envelope = np.asarray(params, dtype=float)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='hkvis-rain-audio', daemon=True)
+            self._thread.start()
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+        self.channel.pause()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify()
+        self.channel.unpause()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.channel.stop()
+
+    @property
+    def month(self):
+        return int(self._position / self.month_step) % 12
+
+    def stats(self):
+        return {
+            'blocks': self.blocks,
+            'underruns': self.underruns,
+            'blocks_per_sound': self.blocks_per_sound,
+            'month': self.month,
+            'synth_ms_per_block': round(1000.0 * self.synth_seconds / max(1, self.blocks), 2),
+        }
+
+    # --- synthesis (audio thread) ---
+    def _params(self):
+        m = self._position / self.month_step
+        i = int(m) % 12
+        f = m - int(m)
+        f = f * f * (3 - 2 * f)  # smoothstep between neighbouring months
+        env = self._envelope
+        return (1 - f) * env[i] + f * env[(i + 1) % 12]
+
+    def next_block(self):
+        """One block of float32 samples, shape (2, block), in -1..1."""
+        n = self.block
+        rng = self._rng
+        density, bed, kernel, level = self._params()
+        mix = self._mix
+        tail = mix.shape[1] - n
+        # drops that ran past the previous block start this one
+        mix[:, :tail] = mix[:, n:]
+        mix[:, tail:] = 0.0
+
+        count = rng.poisson(density * n / self.rate)
+        if count:
+            starts = rng.integers(0, n, count)
+            variant = rng.integers(0, DROP_VARIANTS, count)
+            amp = (rng.uniform(0.2, 1.0, count) ** 2) * 0.5
+            pan = rng.uniform(0.0, 1.0, count)
+            idx = (starts[:, None] + np.arange(tail)[None, :]).ravel()
+            shaped = self._bank[variant] * amp[:, None]
+            for c, gain in enumerate((1.0 - pan, pan)):
+                mix[c] += np.bincount(idx, weights=(shaped * gain[:, None]).ravel(),
+                                      minlength=mix.shape[1]).astype(np.float32)
+
+        # noise bed: running mean over `k` samples via cumulative sums, continuing
+        # the previous block's noise so the filter has no seam at block edges
+        k = int(round(kernel))
+        white = rng.standard_normal((2, n)).astype(np.float32)
+        x = np.concatenate((self._noise_tail, white), axis=1)
+        cs = np.cumsum(x, axis=1, dtype=np.float64)
+        cs = np.concatenate((np.zeros((2, 1)), cs), axis=1)
+        smooth = ((cs[:, k:] - cs[:, :-k])[:, -n:] / np.sqrt(k)).astype(np.float32)
+        self._noise_tail[:] = white[:, -(MAX_KERNEL - 1):]
+
+        # ramp the level across the block instead of stepping it
+        start_level = level if self._level is None else self._level
+        ramp = np.linspace(start_level, level, n, dtype=np.float32)
+        self._level = level
+        out = (mix[:, :n] + np.float32(bed) * smooth) * ramp
+        self._position += n / self.rate
+        return np.clip(out, -1.0, 1.0, out=out)
+
+    def _to_mixer(self, block):
+        """(block, channels) array in the mixer's sample format."""
+        if self.channels == 1:
+            frames = block.mean(axis=0)[:, None]
+        else:
+            frames = np.zeros((block.shape[1], self.channels), dtype=np.float32)
+            frames[:, :2] = block.T
+        dtype = SAMPLE_DTYPES[self.size]
+        if self.size == 32:
+            return np.ascontiguousarray(frames, dtype=dtype)
+        # in float64, so a full-scale 32-bit sample does not round past the integer range
+        frames = frames.astype(np.float64)
+        peak = float(2 ** (abs(self.size) - 1) - 1)
+        if self.size < 0:
+            return (frames * peak).astype(dtype)
+        return (frames * peak + peak + 1).astype(dtype)
+
+    def _make_sound(self):
+        t0 = time.perf_counter()
+        blocks = [self.next_block() for _ in range(self.blocks_per_sound)]
+        block = blocks[0] if len(blocks) == 1 else np.concatenate(blocks, axis=1)
+        sound = pygame.sndarray.make_sound(self._to_mixer(block))
+        self.synth_seconds += time.perf_counter() - t0
+        self.blocks += len(blocks)
+        return sound
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._paused and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+            try:
+                if not self.channel.get_busy() and self.channel.get_queue() is None:
+                    # first block, or the queue ran dry (the thread was starved). An idle
+                    # channel that still has a sound queued is only between sounds: pygame's
+                    # end callback (which needs the GIL) has not started the queued one yet
+                    if self.blocks:
+                        self.underruns += 1
+                        self.blocks_per_sound = min(MAX_BLOCKS_PER_SOUND, self.blocks_per_sound + 1)
+                    self.channel.play(self._make_sound())
+                if self.channel.get_busy() and self.channel.get_queue() is None:
+                    self.channel.queue(self._make_sound())
+            except pygame.error:
+                return  # mixer shut down underneath us
+            time.sleep(self.block / self.rate / 4)
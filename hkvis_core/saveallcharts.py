@@ -1,16 +1,152 @@
-from hkvis_core.downloadchart import load_rainfall_data, plot_rainfall_for_year
+"""Batch export of the per-year rainfall charts.
+
+Each worker process builds one figure with `downloadchart.plot_rainfall_for_year`
+and then, for every year it is given, only updates the bar heights, bar colours,
+title and y-limits before saving. `tight_layout` only runs for y tick labels not
+seen before; its result is reused for later years with the same labels. Years
+are spread over a process pool and the run reports charts per second.
+
+`--backend svg` writes SVG files with `svgchart.chart_svg` and `--backend raster`
+draws PNGs with `svgchart.render_chart_raster`; neither imports matplotlib.
+
+    python -m hkvis_core.saveallcharts [--workers N] [--out-dir rainfall_charts] [--backend mpl|svg|raster]
+"""
 import os
-import matplotlib.pyplot as plt
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from hkvis_core import datacache, svgchart
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-xml_path = os.path.join(script_dir, '..', 'data', 'monthlyElement.xml')
-out_dir = 'rainfall_charts'
-years, _ = load_rainfall_data(xml_path)
-if not os.path.exists(out_dir):
-    os.makedirs(out_dir)
-for year in years:
-    fig, ax = plot_rainfall_for_year(xml_path, year)
-    out_path = os.path.join(out_dir, f'rainfall_{year}.png')
-    fig.savefig(out_path)
-    plt.close(fig)
-    print(f'Saved: {out_path}')
+DEFAULT_XML_PATH = os.path.join(script_dir, '..', 'data', 'monthlyElement.xml')
+DEFAULT_OUT_DIR = 'rainfall_charts'
+DEFAULT_WORKERS = os.cpu_count() or 1
+CHUNK_SIZE = 8
+BACKENDS = ('mpl', 'svg', 'raster')
+# pixel size of the svg/raster output; matches downloadchart's figsize=(10,5) at 100 dpi
+LIGHT_SIZE = (1000, 500)
+
+_template = None
+
+
+class ChartTemplate:
+    """A reusable figure from plot_rainfall_for_year, restyled per year."""
+
+    def __init__(self, xml_path, year):
+        import matplotlib
+        matplotlib.use('Agg')  # never open windows; must happen before pyplot is imported
+        from hkvis_core.downloadchart import plot_rainfall_for_year
+        self.fig, self.ax = plot_rainfall_for_year(xml_path, year)
+        self.bars = list(self.ax.patches[:12])
+        self.layout_key = self._tick_label_key()
+        # subplot params computed by tight_layout, per set of tick labels
+        self.layouts = {self.layout_key: self._subplot_params()}
+
+    def _subplot_params(self):
+        p = self.fig.subplotpars
+        return dict(left=p.left, right=p.right, bottom=p.bottom, top=p.top)
+
+    def _tick_label_key(self):
+        # y tick labels, formatted without drawing the figure
+        axis = self.ax.yaxis
+        return tuple(axis.get_major_formatter().format_ticks(axis.get_major_locator()()))
+
+    def update(self, year, vals):
+        for bar, v, c in zip(self.bars, vals, svgchart.bar_colors(vals)):
+            bar.set_height(v)
+            bar.set_facecolor(c)
+        self.ax.set_title(f"Monthly Rainfall in Hong Kong ({year})")
+        self.ax.relim()
+        self.ax.autoscale_view()
+        key = self._tick_label_key()
+        if key != self.layout_key:
+            params = self.layouts.get(key)
+            if params is None:
+                self.fig.tight_layout()
+                self.layouts[key] = self._subplot_params()
+            else:
+                self.fig.subplots_adjust(**params)
+            self.layout_key = key
+
+    def save(self, out_path):
+        self.fig.savefig(out_path)
+
+
+def _init_worker(xml_path, first_year, backend='mpl'):
+    global _template
+    if backend == 'mpl':
+        _template = ChartTemplate(xml_path, first_year)
+
+
+def _export_chunk(chunk, out_dir, backend='mpl'):
+    saved = []
+    for year, vals in chunk:
+        if backend == 'svg':
+            out_path = os.path.join(out_dir, f'rainfall_{year}.svg')
+            svgchart.chart_svg(year, vals, *LIGHT_SIZE).save_svg(out_path)
+        elif backend == 'raster':
+            import pygame
+            out_path = os.path.join(out_dir, f'rainfall_{year}.png')
+            pygame.image.save(svgchart.render_chart_raster(year, vals, LIGHT_SIZE), out_path)
+        else:
+            _template.update(year, vals)
+            out_path = os.path.join(out_dir, f'rainfall_{year}.png')
+            _template.save(out_path)
+        saved.append(out_path)
+    return saved
+
+
+def export_all(xml_path=DEFAULT_XML_PATH, out_dir=DEFAULT_OUT_DIR, years=None, workers=DEFAULT_WORKERS,
+               verbose=True, backend='mpl'):
+    """Export charts for `years` (default: all) and return the saved paths."""
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown chart backend: {backend}')
+    all_years, rainfall = datacache.load_element(xml_path)
+    by_year = dict(zip(all_years, rainfall))
+    years = [y for y in (years or all_years) if y in by_year]
+    if not years:
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(y, by_year[y]) for y in years]
+    chunks = [jobs[i:i + CHUNK_SIZE] for i in range(0, len(jobs), CHUNK_SIZE)]
+    start = time.perf_counter()
+    saved = []
+    if workers <= 1:
+        _init_worker(xml_path, years[0], backend)
+        for chunk in chunks:
+            paths = _export_chunk(chunk, out_dir, backend)
+            saved.extend(paths)
+            if verbose:
+                for p in paths:
+                    print(f'Saved: {p}')
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(xml_path, years[0], backend)) as pool:
+            for paths in pool.map(_export_chunk, chunks, [out_dir] * len(chunks), [backend] * len(chunks)):
+                saved.extend(paths)
+                if verbose:
+                    for p in paths:
+                        print(f'Saved: {p}')
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f'Exported {len(saved)} charts in {elapsed:.2f}s ({len(saved) / elapsed:.1f} charts/s)')
+    return saved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export every yearly rainfall chart as PNG.')
+    parser.add_argument('--xml', default=DEFAULT_XML_PATH)
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--years', help='comma-separated subset of years')
+    parser.add_argument('--backend', choices=BACKENDS, default='mpl')
+    args = parser.parse_args(argv)
+    years = [y.strip() for y in args.years.split(',')] if args.years else None
+    export_all(args.xml, args.out_dir, years, args.workers, backend=args.backend)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Frame scheduling for the main loop.
+
+`FrameScheduler.next_events(animating, pending)` replaces the
+`for event in pygame.event.get(): ... clock.tick(FPS)` pattern:
+
+- while animating, frames are paced against absolute deadlines one period
+  apart (a late frame does not push every later frame back; falling more
+  than a period behind resynchronises instead of bursting)
+- when nothing animates, the loop blocks in `pygame.event.wait` until an
+  event arrives, a timer is due or the idle timeout passes; `pending=True`
+  (background work the UI is waiting for) shortens the timeout
+- `add_timer` runs low-rate callbacks (audio volume, status logging) on
+  their own period, independent of the frame rate
+
+`stats()` reports wakeups per second and process CPU use, so idle cost can
+be compared before and after a change.
+"""
+import time
+
+import pygame
+
+IDLE_TIMEOUT = 1.0      # longest idle block, seconds
+PENDING_TIMEOUT = 0.05  # idle poll while background work is pending
+MAX_DT = 0.1            # cap on the reported frame dt (e.g. after an idle period)
+
+
+class _Timer:
+    __slots__ = ('name', 'interval', 'callback', 'idle', 'due', 'last')
+
+    def __init__(self, name, interval, callback, idle, now):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.idle = idle
+        self.due = now + interval
+        self.last = now
+
+
+class FrameScheduler:
+    def __init__(self, fps=60, idle_timeout=IDLE_TIMEOUT, pending_timeout=PENDING_TIMEOUT):
+        self.period = 1.0 / fps
+        self.idle_timeout = idle_timeout
+        self.pending_timeout = pending_timeout
+        self.dt = self.period
+        self._deadline = None
+        self._last_frame = time.perf_counter()
+        self._timers = []
+        # counters for stats(); reset by every stats() call
+        self._window_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._wakeups = 0
+        self._frames = 0
+        self._idle_frames = 0
+        self.late_frames = 0
+
+    def add_timer(self, name, interval, callback, idle=False):
+        """Call `callback(dt)` every `interval` seconds.
+
+        Timers with `idle=False` only run (and only wake the loop) while
+        animating; `idle=True` timers also wake an idle loop.
+        """
+        self._timers.append(_Timer(name, interval, callback, idle, time.perf_counter()))
+
+    def _run_timers(self, animating):
+        now = time.perf_counter()
+        for t in self._timers:
+            if not (animating or t.idle):
+                # keep the timer in phase without catching up on the paused time
+                t.due = now + t.interval
+                t.last = now
+                continue
+            if now >= t.due:
+                dt = now - t.last
+                t.last = now
+                # skip missed periods instead of running the callback several times
+                t.due += t.interval * max(1, int((now - t.due) / t.interval) + 1)
+                t.callback(dt)
+
+    def _next_timer_delay(self, animating, now):
+        dues = [t.due for t in self._timers if animating or t.idle]
+        return max(0.0, min(dues) - now) if dues else None
+
+    def next_events(self, animating, pending=False):
+        """Wait until the next frame should run and return its events."""
+        now = time.perf_counter()
+        if animating:
+            if self._deadline is None:
+                self._deadline = now
+            delay = self._deadline - now
+            if delay > 0:
+                time.sleep(delay)
+                self._wakeups += 1
+            now = time.perf_counter()
+            self._deadline += self.period
+            if now - self._deadline > self.period:
+                # fell behind by more than a frame: resync rather than run a burst of late frames
+                self.late_frames += 1
+                self._deadline = now + self.period
+            events = pygame.event.get()
+        else:
+            self._deadline = None
+            timeout = self.pending_timeout if pending else self.idle_timeout
+            timer_delay = self._next_timer_delay(False, now)
+            if timer_delay is not None:
+                timeout = min(timeout, timer_delay)
+            event = pygame.event.wait(max(1, int(timeout * 1000)))
+            self._wakeups += 1
+            self._idle_frames += 1
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+            now = time.perf_counter()
+        self._run_timers(animating)
+        self.dt = min(MAX_DT, now - self._last_frame)
+        self._last_frame = now
+        self._frames += 1
+        return events
+
+    def stats(self):
+        """Rates since the previous call: frames/s, wakeups/s and CPU %."""
+        now = time.perf_counter()
+        cpu = time.process_time()
+        wall = max(1e-9, now - self._window_start)
+        s = {
+            'fps': round(self._frames / wall, 1),
+            'idle_fps': round(self._idle_frames / wall, 1),
+            'wakeups_per_s': round(self._wakeups / wall, 1),
+            'cpu_percent': round(100.0 * (cpu - self._cpu_start) / wall, 1),
+            'late_frames': self.late_frames,
+        }
+        self._window_start = now
+        self._cpu_start = cpu
+        self._wakeups = self._frames = self._idle_frames = 0
+        return s
@@ -1,6 +1,10 @@
-import requests
 import os
 
+try:
+    from hkvis_core import fetcher
+except ImportError:
+    import fetcher
+
 
 # Always save the file in the same directory as this script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -8,19 +12,24 @@ output_file = os.path.join(script_dir, "monthlyElement.html")
 
 url = "https://www.hko.gov.hk/en/cis/monthlyElement.htm?stn=HKO&ele=RF"
 headers = {
-    "User-Agent": "python-requests/2.0 (+https://example.com/)",
+    "User-Agent": fetcher.USER_AGENT,
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
-try:
-    resp = requests.get(url, headers=headers, timeout=15)
-    resp.raise_for_status()  # raise on HTTP errors
 
-    encoding = resp.encoding if resp.encoding else "utf-8"
-    with open(output_file, "w", encoding=encoding) as f:
-        f.write(resp.text)
+def download_page(url=url, output_file=output_file, session=None):
+    # The page is saved byte-for-byte, so it keeps the server's own encoding.
+    try:
+        result = fetcher.fetch(url, output_file, session=session, headers=headers)
+        if result.modified:
+            print(f"Saved page to {output_file} ({result.bytes} bytes)")
+        else:
+            print(f"Page not modified since last run: {output_file}")
+        return result
+    except Exception as e:
+        print(f"Request failed: {e}")
+        return None
 
-    print(f"Saved page to {output_file} (encoding: {encoding})")
 
-except requests.exceptions.RequestException as e:
-    print(f"Request failed: {e}")
+if __name__ == "__main__":
+    download_page()
@@ -0,0 +1,163 @@
+"""Startup phase timing for Main.py.
+
+Enable with `HKVIS_PROFILE_STARTUP=1` (or `python Main.py --profile-startup`).
+Main.py calls `mark(name)` after each import block and initialisation step,
+`first_pixel()` when something other than the blank window is first on
+screen (the warm-start snapshot, see `warmstart`) and `first_frame()` after
+the first live frame is presented. The report lists the time spent in every
+phase, the time to first pixel and the time to first (live) frame, measured
+from the moment the interpreter started the process. Without a snapshot the
+first pixel is the first frame.
+
+As a budget check (e.g. on a kiosk image or in CI):
+
+    python -m hkvis_core.startupprofile [--budget 2.0] [--runs 3]
+
+starts Main.py headless, lets it exit after its first frame and fails when
+the median time to first frame exceeds the budget.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ENV_ENABLE = 'HKVIS_PROFILE_STARTUP'
+ENV_OUTPUT = 'HKVIS_PROFILE_OUT'          # write the report as JSON here
+ENV_EXIT = 'HKVIS_EXIT_AFTER_FIRST_FRAME'  # quit right after the first frame
+DEFAULT_BUDGET = 2.0  # seconds from process start to first frame
+
+
+def _process_start():
+    """perf_counter() value of the moment this process started, if known."""
+    try:
+        # /proc/self/stat field 22 is the start time in clock ticks since boot
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.perf_counter() - max(0.0, uptime - started)
+    except Exception:
+        return None
+
+
+class StartupProfile:
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = bool(os.environ.get(ENV_ENABLE)) or '--profile-startup' in sys.argv
+        self.enabled = enabled
+        self.exit_after_first_frame = bool(os.environ.get(ENV_EXIT))
+        # the first phase runs from process start (interpreter boot and whatever
+        # was imported before this profile was created)
+        self.origin = _process_start() or time.perf_counter()
+        self.phases = []
+        self.first_frame_at = None
+        self.first_pixel_at = None
+        self._last = self.origin
+
+    def mark(self, name):
+        """Close the phase that started at the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def first_pixel(self):
+        if self.first_pixel_at is not None:
+            return
+        self.mark('first pixel')
+        self.first_pixel_at = time.perf_counter()
+
+    def first_frame(self):
+        if self.first_frame_at is not None:
+            return
+        self.mark('first frame')
+        self.first_frame_at = time.perf_counter()
+        if self.first_pixel_at is None:
+            self.first_pixel_at = self.first_frame_at
+        if self.enabled:
+            self.report()
+
+    def as_dict(self):
+        return {
+            'phases': [{'name': n, 'seconds': s} for n, s in self.phases],
+            'first_pixel': (self.first_pixel_at - self.origin) if self.first_pixel_at is not None else None,
+            'first_frame': (self.first_frame_at - self.origin) if self.first_frame_at is not None else None,
+        }
+
+    def report(self, stream=None):
+        stream = stream or sys.stdout
+        data = self.as_dict()
+        print('startup profile:', file=stream)
+        for p in data['phases']:
+            print(f"  {p['name']:<28}{p['seconds'] * 1000:8.1f} ms", file=stream)
+        if data['first_pixel'] is not None:
+            print(f"  {'time to first pixel':<28}{data['first_pixel'] * 1000:8.1f} ms", file=stream)
+        if data['first_frame'] is not None:
+            print(f"  {'time to first live frame':<28}{data['first_frame'] * 1000:8.1f} ms", file=stream)
+        out = os.environ.get(ENV_OUTPUT)
+        if out:
+            with open(out, 'w') as f:
+                json.dump(data, f, indent=2)
+
+
+def measure(main_path, runs=3, timeout=60):
+    """Run `main_path` headless `runs` times; returns the list of reports."""
+    reports = []
+    for _ in range(runs):
+        fd, out = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        env = dict(os.environ)
+        env.update({ENV_ENABLE: '1', ENV_OUTPUT: out, ENV_EXIT: '1'})
+        env.setdefault('SDL_VIDEODRIVER', 'dummy')
+        env.setdefault('SDL_AUDIODRIVER', 'dummy')
+        try:
+            subprocess.run([sys.executable, main_path], env=env, timeout=timeout,
+                           stdout=subprocess.DEVNULL, cwd=os.path.dirname(main_path))
+            with open(out) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            pass
+        finally:
+            os.remove(out)
+    return reports
+
+
+def main(argv=None):
+    default_main = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Main.py')
+    parser = argparse.ArgumentParser(description='Check Main.py time to first frame against a budget.')
+    parser.add_argument('--main', default=default_main)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='seconds')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args(argv)
+    reports = [r for r in measure(os.path.abspath(args.main), args.runs) if r.get('first_frame') is not None]
+    if not reports:
+        print('Main.py did not reach its first frame')
+        return 2
+    times = [r['first_frame'] for r in reports]
+    median = statistics.median(times)
+    pixel_times = [r['first_pixel'] for r in reports if r.get('first_pixel') is not None]
+    # per-phase medians show which phase grew when the budget is blown
+    # (by name: a run with a warm-start snapshot has an extra 'first pixel' phase)
+    names = []
+    for r in reports:
+        names += [p['name'] for p in r['phases'] if p['name'] not in names]
+    for name in names:
+        secs = statistics.median(p['seconds'] for r in reports for p in r['phases'] if p['name'] == name)
+        print(f"  {name:<28}{secs * 1000:8.1f} ms")
+    if pixel_times:
+        print(f'time to first pixel: median {statistics.median(pixel_times) * 1000:.0f} ms')
+    print(f'time to first live frame: median {median * 1000:.0f} ms over {len(times)} runs '
+          f'(budget {args.budget * 1000:.0f} ms)')
+    if median > args.budget:
+        print('FAIL: startup budget exceeded')
+        return 1
+    print('OK')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Lightweight chart backend without matplotlib.
+
+Draws the same 12-bar monthly chart as `downloadchart.plot_rainfall_for_year`
+(grey bars, highest month orange, lowest month blue, legend, title and axis
+labels) from one shared layout:
+
+- `chart_svg` builds it as SVG with `drawsvg`
+- `render_chart_raster` draws it straight onto a pygame surface (use
+  `pygame.surfarray.pixels3d` on the result for a NumPy view)
+- `render_chart_thumbnail` draws only the coloured bars, for previews too
+  small for axes and text
+
+Both avoid importing matplotlib and run in a few milliseconds.
+"""
+import os
+import math
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+COLOR_ORANGE = '#ea801c'
+COLOR_BLUE = '#1a80bb'
+COLOR_GRAY = '#b8b8b8'
+COLOR_TEXT = '#000000'
+COLOR_GRID = '#e6e6e6'
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'GoogleSansCode-VariableFont_wght.ttf')
+
+
+def nice_ticks(vmax, max_ticks=7):
+    """0-based ticks with a 1/2/2.5/5 x 10^k step covering `vmax`."""
+    if not vmax or vmax <= 0:
+        return [0.0, 1.0]
+    raw = vmax / max(1, max_ticks - 1)
+    mag = 10 ** math.floor(math.log10(raw))
+    for m in (1, 2, 2.5, 5, 10):
+        step = m * mag
+        if step >= raw:
+            break
+    top = math.ceil(vmax / step) * step
+    return [i * step for i in range(int(round(top / step)) + 1)]
+
+
+def format_tick(v):
+    return f"{v:g}"
+
+
+def bar_colors(vals):
+    """Bar colour per month: highest orange, then lowest blue (so all-equal months are blue).
+
+    Every chart backend colours its bars with this, so the rule cannot drift.
+    """
+    colors = [COLOR_GRAY] * len(vals)
+    if vals:
+        colors[vals.index(max(vals))] = COLOR_ORANGE
+        colors[vals.index(min(vals))] = COLOR_BLUE
+    return colors
+
+
+def chart_layout(vals, width, height):
+    """Geometry shared by both backends; all coordinates in pixels, y down."""
+    vals = list(vals)[:12]
+    scale = min(width / 1000.0, height / 500.0)
+    fs = max(8, int(round(14 * scale)))
+    left = int(fs * 5)
+    right = int(fs * 1.2)
+    top = int(fs * 2.6)
+    bottom = int(fs * 3.6)
+    plot = (left, top, max(1, width - left - right), max(1, height - top - bottom))
+    # 5% headroom above the tallest bar, like matplotlib's default y margin
+    ticks = nice_ticks(max(vals) * 1.05 if vals else 0)
+    ymax = ticks[-1]
+    px, py, pw, ph = plot
+    slot = pw / 12.0
+    bar_w = slot * 0.8
+    bars = []
+    for i, (v, color) in enumerate(zip(vals, bar_colors(vals))):
+        bh = (v / ymax) * ph if ymax else 0
+        bars.append((px + slot * i + (slot - bar_w) / 2, py + ph - bh, bar_w, bh, color))
+    tick_pos = [(t, py + ph - (t / ymax) * ph) for t in ticks]
+    month_pos = [(MONTHS[i], px + slot * (i + 0.5)) for i in range(12)]
+    return {
+        'font_size': fs,
+        'plot': plot,
+        'bars': bars,
+        'ticks': tick_pos,
+        'months': month_pos,
+    }
+
+
+def chart_svg(year, vals, width=1000, height=500):
+    """Return a drawsvg.Drawing of the chart for `year`."""
+    import drawsvg as draw
+
+    lay = chart_layout(vals, width, height)
+    fs = lay['font_size']
+    px, py, pw, ph = lay['plot']
+    d = draw.Drawing(width, height)
+    d.append(draw.Rectangle(0, 0, width, height, fill='white'))
+    for t, y in lay['ticks']:
+        d.append(draw.Line(px, y, px + pw, y, stroke=COLOR_GRID, stroke_width=1))
+        d.append(draw.Text(format_tick(t), fs * 0.85, px - fs * 0.5, y, text_anchor='end',
+                           dominant_baseline='middle', fill=COLOR_TEXT))
+    for x, y, w, h, color in lay['bars']:
+        d.append(draw.Rectangle(x, y, w, h, fill=color))
+    d.append(draw.Line(px, py + ph, px + pw, py + ph, stroke=COLOR_TEXT, stroke_width=1))
+    d.append(draw.Line(px, py, px, py + ph, stroke=COLOR_TEXT, stroke_width=1))
+    for name, x in lay['months']:
+        d.append(draw.Text(name, fs * 0.85, x, py + ph + fs * 1.2, text_anchor='middle', fill=COLOR_TEXT))
+    d.append(draw.Text(f"Monthly Rainfall in Hong Kong ({year})", fs * 1.15, px + pw / 2, fs * 1.6,
+                       text_anchor='middle', fill=COLOR_TEXT))
+    d.append(draw.Text("Month", fs, px + pw / 2, height - fs * 0.8, text_anchor='middle', fill=COLOR_TEXT))
+    d.append(draw.Text("Rainfall (mm)", fs, fs * 1.2, py + ph / 2, text_anchor='middle', fill=COLOR_TEXT,
+                       transform=f'rotate(-90 {fs * 1.2} {py + ph / 2})'))
+    lx = px + pw - fs * 9
+    for i, (label, color) in enumerate((('Highest Month', COLOR_ORANGE), ('Lowest Month', COLOR_BLUE))):
+        ly = py + fs * (0.6 + i * 1.5)
+        d.append(draw.Rectangle(lx, ly, fs * 1.6, fs * 0.7, fill=color))
+        d.append(draw.Text(label, fs * 0.85, lx + fs * 2.2, ly + fs * 0.6, fill=COLOR_TEXT))
+    return d
+
+
+_fonts = {}
+
+
+def _font(size):
+    import pygame
+
+    if size not in _fonts:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        path = FONT_PATH if os.path.exists(FONT_PATH) else None
+        _fonts[size] = pygame.font.Font(path, size)
+    return _fonts[size]
+
+
+def render_chart_raster(year, vals, size):
+    """Draw the chart for `year` directly onto a new pygame surface of `size`."""
+    import pygame
+
+    width, height = size
+    lay = chart_layout(vals, width, height)
+    fs = lay['font_size']
+    px, py, pw, ph = lay['plot']
+    surf = pygame.Surface((width, height))
+    surf.fill((255, 255, 255))
+    text = pygame.Color(COLOR_TEXT)
+    small = _font(max(6, int(fs * 0.85)))
+    normal = _font(fs)
+    for t, y in lay['ticks']:
+        pygame.draw.line(surf, pygame.Color(COLOR_GRID), (px, int(y)), (px + pw, int(y)))
+        label = small.render(format_tick(t), True, text)
+        surf.blit(label, (px - fs * 0.5 - label.get_width(), int(y) - label.get_height() // 2))
+    for x, y, w, h, color in lay['bars']:
+        pygame.draw.rect(surf, pygame.Color(color), pygame.Rect(round(x), round(y), max(1, round(w)), round(h)))
+    pygame.draw.line(surf, text, (px, py + ph), (px + pw, py + ph))
+    pygame.draw.line(surf, text, (px, py), (px, py + ph))
+    for name, x in lay['months']:
+        label = small.render(name, True, text)
+        surf.blit(label, (int(x) - label.get_width() // 2, py + ph + int(fs * 0.4)))
+    title = _font(int(fs * 1.15)).render(f"Monthly Rainfall in Hong Kong ({year})", True, text)
+    surf.blit(title, (px + pw // 2 - title.get_width() // 2, int(fs * 0.6)))
+    xlabel = normal.render("Month", True, text)
+    surf.blit(xlabel, (px + pw // 2 - xlabel.get_width() // 2, height - int(fs * 1.6)))
+    ylabel = pygame.transform.rotate(normal.render("Rainfall (mm)", True, text), 90)
+    surf.blit(ylabel, (int(fs * 0.5), py + ph // 2 - ylabel.get_height() // 2))
+    lx = int(px + pw - fs * 9)
+    for i, (label, color) in enumerate((('Highest Month', COLOR_ORANGE), ('Lowest Month', COLOR_BLUE))):
+        ly = int(py + fs * (0.6 + i * 1.5))
+        pygame.draw.rect(surf, pygame.Color(color), pygame.Rect(lx, ly, int(fs * 1.6), int(fs * 0.7)))
+        lbl = small.render(label, True, text)
+        surf.blit(lbl, (lx + int(fs * 2.2), ly + int(fs * 0.35) - lbl.get_height() // 2))
+    return surf
+
+
+def render_chart_thumbnail(year, vals, size):
+    """Bars-only miniature of the chart for `year` (no text, no axes)."""
+    import pygame
+
+    width, height = size
+    vals = list(vals)[:12]
+    surf = pygame.Surface((width, height))
+    surf.fill((255, 255, 255))
+    if not vals:
+        return surf
+    pad = max(2, height // 12)
+    top = max(vals) or 1.0
+    slot = (width - 2 * pad) / 12.0
+    usable = height - 2 * pad
+    for i, (v, color) in enumerate(zip(vals, bar_colors(vals))):
+        bh = max(1, round(v / top * usable))
+        x = round(pad + slot * i + slot * 0.1)
+        pygame.draw.rect(surf, pygame.Color(color), pygame.Rect(x, height - pad - bh, max(1, round(slot * 0.8)), bh))
+    pygame.draw.line(surf, pygame.Color(COLOR_TEXT), (pad, height - pad), (width - pad, height - pad))
+    return surf
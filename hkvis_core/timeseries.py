@@ -0,0 +1,345 @@
+"""Zoomable long-range rainfall line chart on an LTTB pyramid.
+
+`LTTBPyramid` downsamples the series once with largest-triangle-three-buckets
+(Steinarsson 2013): every level keeps half the points of the level below,
+chosen so the line keeps its peaks and troughs. Level 0 is the data itself.
+To draw a window of the series into `width` pixels, `visible(x0, x1, width)`
+picks the coarsest level that still has at least `POINTS_PER_PIXEL` points
+per pixel and slices it with `searchsorted`, so a frame draws on the order of
+`width` points whether the record holds 1,700 months or 50,000 days.
+
+LTTB is sequential (each bucket's pick depends on the previous pick), so the
+loop runs per bucket, but the triangle areas of a bucket reduce to one dot
+product: for the previous pick a and the next bucket's mean c, the doubled
+area of candidate p is |ax*(py - cy) + ay*(cx - px) + (px*cy - cx*py)|, and
+the three coefficients of every candidate are computed for the whole level
+at once. A level costs O(n) and the pyramid about twice the first level.
+
+`TimeSeriesView` is the pygame widget: mouse wheel zooms around the pointer,
+dragging pans, a click picks the year under the pointer, and the window eases
+toward its target so zoom and pan are smooth.
+
+    view = TimeSeriesView.from_climatology(clim, font)
+    view.handle_event(event, rect)        # returns a picked year or None
+    view.update()                         # ease the window; True while moving
+    view.draw(surface, rect, selected_year)
+
+    python -m hkvis_core.timeseries [--days 51000] [--out timeseries.png]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pygame
+
+try:
+    from hkvis_core.climatology import Climatology
+except ImportError:
+    from climatology import Climatology
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_XML = os.path.join(script_dir, '..', 'data', 'monthlyElement.xml')
+
+MIN_LEVEL_POINTS = 64   # the pyramid stops below this many points
+POINTS_PER_PIXEL = 0.5  # finest detail a level must still provide
+EASE_RATE = 14.0        # 1/s; the window covers ~1 - exp(-rate*dt) of the way per frame
+MIN_SPAN = 0.5          # narrowest window in x units (years: half a year)
+GAP_FACTOR = 4.0        # the line breaks where points are this many typical steps apart
+
+
+def lttb(x, y, n_out):
+    """Indices of the `n_out` points LTTB keeps of (x, y); first and last are always kept."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # bucket edges over the points between the fixed first and last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = np.diff(np.append(edges, n)).clip(min=1)
+    # mean point of each bucket (the last "bucket" is the final point alone)
+    csx = np.concatenate(([0.0], np.cumsum(x)))
+    csy = np.concatenate(([0.0], np.cumsum(y)))
+    bucket_end = np.append(ends, n)
+    mean_x = (csx[bucket_end] - csx[edges]) / sizes
+    mean_y = (csy[bucket_end] - csy[edges]) / sizes
+    # area coefficients of every candidate against its next bucket's mean
+    bucket = np.repeat(np.arange(len(starts)), ends - starts)
+    cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+    px, py = x[starts[0]:ends[-1]], y[starts[0]:ends[-1]]
+    k1, k2, k3 = (py - cy).tolist(), (cx - px).tolist(), (px * cy - cx * py).tolist()
+    xs, ys = x.tolist(), y.tolist()
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    base = int(starts[0])
+    # buckets hold a handful of points, where plain floats beat per-bucket NumPy calls
+    for b, (lo, hi) in enumerate(zip(starts.tolist(), ends.tolist())):
+        ax, ay = xs[a], ys[a]
+        best, pick = -1.0, lo
+        for j in range(lo - base, hi - base):
+            area = abs(ax * k1[j] + ay * k2[j] + k3[j])
+            if area > best:
+                best, pick = area, j + base
+        a = pick
+        out[b + 1] = a
+    return out
+
+
+class LTTBPyramid:
+    def __init__(self, x, y, min_points=MIN_LEVEL_POINTS):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keep = ~(np.isnan(x) | np.isnan(y))
+        self.levels = [(x[keep], y[keep])]
+        while len(self.levels[-1][0]) // 2 >= min_points:
+            lx, ly = self.levels[-1]
+            idx = lttb(lx, ly, len(lx) // 2)
+            self.levels.append((lx[idx], ly[idx]))
+        # a step this much wider than a level's typical spacing is missing data
+        self.gap = [GAP_FACTOR * float(np.median(np.diff(lx))) if len(lx) > 1 else np.inf
+                    for lx, _ in self.levels]
+
+    @property
+    def x_range(self):
+        x = self.levels[0][0]
+        return (float(x[0]), float(x[-1])) if len(x) else (0.0, 1.0)
+
+    def y_max(self):
+        y = self.levels[0][1]
+        return float(y.max()) if len(y) else 1.0
+
+    def level_for(self, x0, x1, width):
+        """Coarsest level with at least POINTS_PER_PIXEL points per pixel in [x0, x1]."""
+        lx = self.levels[0][0]
+        visible = np.searchsorted(lx, x1, 'right') - np.searchsorted(lx, x0, 'left')
+        if visible <= 0 or width <= 0:
+            return 0
+        level = int(np.floor(np.log2(max(1.0, visible / (width * POINTS_PER_PIXEL)))))
+        return min(level, len(self.levels) - 1)
+
+    def visible(self, x0, x1, width):
+        """(x, y) of the level matching `width`, clipped to [x0, x1] plus one point each side."""
+        level = self.level_for(x0, x1, width)
+        lx, ly = self.levels[level]
+        i0 = max(0, np.searchsorted(lx, x0, 'left') - 1)
+        i1 = min(len(lx), np.searchsorted(lx, x1, 'right') + 1)
+        return lx[i0:i1], ly[i0:i1], level
+
+
+class TimeSeriesView:
+    BG_COLOR = (16, 20, 28)
+    LINE_COLOR = (110, 190, 255)
+    AXIS_COLOR = (90, 100, 115)
+    LABEL_COLOR = (220, 220, 220)
+    SELECTED_COLOR = (234, 128, 28)
+    MARGIN = (72, 24, 12, 26)  # left, top, right, bottom
+
+    def __init__(self, x, y, font=None, unit='mm'):
+        self.pyramid = LTTBPyramid(x, y)
+        self.font = font
+        self.unit = unit
+        self.window = self.target = self.pyramid.x_range
+        self.last_level = 0
+        self.last_points = 0
+        self._drag = None
+        self._dragged = False
+        self._last_update = None
+        self._labels = {}
+
+    @classmethod
+    def from_climatology(cls, clim, font=None):
+        """Monthly series; x is the decimal year at the middle of each month."""
+        years = np.array([float(y) if y.isdigit() else np.nan for y in clim.years])
+        x = (years[:, None] + (np.arange(12) + 0.5) / 12.0).ravel()
+        return cls(x, clim.matrix.ravel(), font)
+
+    # --- window ---
+    def _plot_rect(self, rect):
+        left, top, right, bottom = self.MARGIN
+        return pygame.Rect(rect.x + left, rect.y + top, max(1, rect.width - left - right),
+                           max(1, rect.height - top - bottom))
+
+    def _clamp(self, x0, x1):
+        lo, hi = self.pyramid.x_range
+        span = min(max(x1 - x0, MIN_SPAN), hi - lo)
+        x0 = min(max(x0, lo), hi - span)
+        return x0, x0 + span
+
+    def zoom(self, factor, anchor):
+        """Scale the target window by `factor` around x value `anchor`."""
+        x0, x1 = self.target
+        self.target = self._clamp(anchor - (anchor - x0) * factor, anchor + (x1 - anchor) * factor)
+
+    def pan(self, dx):
+        x0, x1 = self.target
+        self.target = self._clamp(x0 + dx, x1 + dx)
+
+    def reset(self):
+        self.target = self.pyramid.x_range
+
+    def update(self, now=None):
+        """Ease the window toward the target; True while it is still moving."""
+        now = time.perf_counter() if now is None else now
+        dt = 0.0 if self._last_update is None else min(0.1, now - self._last_update)
+        self._last_update = now
+        (x0, x1), (t0, t1) = self.window, self.target
+        span = t1 - t0
+        if abs(x0 - t0) < span * 1e-3 and abs(x1 - t1) < span * 1e-3:
+            self.window = self.target
+            return False
+        k = 1.0 - np.exp(-EASE_RATE * dt)
+        self.window = (x0 + (t0 - x0) * k, x1 + (t1 - x1) * k)
+        return True
+
+    def x_at(self, px, rect):
+        plot = self._plot_rect(rect)
+        x0, x1 = self.window
+        return x0 + (px - plot.x) / plot.width * (x1 - x0)
+
+    def year_at(self, pos, rect):
+        if not self._plot_rect(rect).collidepoint(pos):
+            return None
+        return str(int(np.floor(self.x_at(pos[0], rect))))
+
+    def handle_event(self, event, rect):
+        """Zoom/pan from mouse events; returns the clicked year (a click without a drag) or None."""
+        if event.type == pygame.MOUSEWHEEL:
+            anchor = self.x_at(pygame.mouse.get_pos()[0], rect)
+            self.zoom(0.8 ** event.y, anchor)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self._plot_rect(rect).collidepoint(event.pos):
+            self._drag = (event.pos[0], self.target)
+            self._dragged = False
+        elif event.type == pygame.MOUSEMOTION and self._drag is not None:
+            start_px, (x0, x1) = self._drag
+            if abs(event.pos[0] - start_px) > 3:
+                self._dragged = True
+            dx = -(event.pos[0] - start_px) / self._plot_rect(rect).width * (x1 - x0)
+            self.target = self._clamp(x0 + dx, x1 + dx)
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and self._drag is not None:
+            self._drag = None
+            if not self._dragged:
+                return self.year_at(event.pos, rect)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_0:
+            self.reset()
+        return None
+
+    # --- drawing ---
+    def _label(self, text):
+        label = self._labels.get(text)
+        if label is None:
+            if len(self._labels) > 256:
+                self._labels.clear()
+            label = self._labels[text] = self.font.render(text, True, self.LABEL_COLOR)
+        return label
+
+    def draw(self, surface, rect, selected=None):
+        plot = self._plot_rect(rect)
+        pygame.draw.rect(surface, self.BG_COLOR, rect)
+        x0, x1 = self.window
+        sx = plot.width / max(x1 - x0, MIN_SPAN)  # a one-point series has an empty window
+        y_top = self.pyramid.y_max() * 1.05 or 1.0
+        sy = plot.height / y_top
+        if selected is not None and str(selected).isdigit():
+            band = pygame.Rect(plot.x + int((int(selected) - x0) * sx), plot.y, max(2, int(sx)), plot.height).clip(plot)
+            if band.width:
+                surface.fill((60, 44, 30), band)
+        # year ticks at a step that leaves room for the labels
+        step = 1
+        while step * sx < 48:
+            step = {1: 2, 2: 5}.get(step, step * 2 if str(step)[0] == '5' else step * 5 // 2)
+        for year in range(int(np.ceil(x0 / step)) * step, int(x1) + 1, step):
+            px = plot.x + int((year - x0) * sx)
+            pygame.draw.line(surface, self.AXIS_COLOR, (px, plot.bottom), (px, plot.bottom + 4))
+            if self.font is not None:
+                label = self._label(str(year))
+                surface.blit(label, (px - label.get_width() // 2, plot.bottom + 6))
+        pygame.draw.line(surface, self.AXIS_COLOR, plot.bottomleft, plot.bottomright)
+        pygame.draw.line(surface, self.AXIS_COLOR, plot.topleft, plot.bottomleft)
+        # the line: the level that matches the plot width, mapped to pixels in one pass
+        xs, ys, level = self.pyramid.visible(x0, x1, plot.width)
+        self.last_level, self.last_points = level, len(xs)
+        if len(xs) >= 2:
+            pts = np.empty((len(xs), 2))
+            pts[:, 0] = plot.x + (xs - x0) * sx
+            pts[:, 1] = plot.bottom - ys * sy
+            clip = surface.get_clip()
+            surface.set_clip(plot)
+            # one polyline per run without missing data
+            breaks = np.flatnonzero(np.diff(xs) > self.pyramid.gap[level]) + 1
+            for run in np.split(pts, breaks):
+                if len(run) >= 2:
+                    pygame.draw.aalines(surface, self.LINE_COLOR, False, run.tolist())
+            surface.set_clip(clip)
+        if self.font is not None:
+            top = self._label(f"{y_top:,.0f} {self.unit}")
+            surface.blit(top, (plot.x - top.get_width() - 4, plot.y - top.get_height() // 2))
+            surface.blit(self._label('0'), (plot.x - self._label('0').get_width() - 4, plot.bottom - 8))
+            hint = self.font.render(f"{x0:.1f} - {x1:.1f}   wheel zoom, drag pan, 0 reset, click select, T close   "
+                                    f"(level {level}, {len(xs)} points)", True, self.LABEL_COLOR)
+            surface.blit(hint, (plot.x, rect.y + 4))
+
+    def state_key(self, selected):
+        return (id(self.pyramid), self.window, str(selected))
+
+
+def _bench_series(days, seed=1):
+    # a long synthetic daily record: seasonal cycle, dry spells and storm spikes
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    season = 6 + 5 * np.sin((t / 365.25 - 0.3) * 2 * np.pi)
+    rain = rng.gamma(0.4, season.clip(0.5)) * (rng.random(days) < 0.45)
+    return 1884 + t / 365.25, rain
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Long-range rainfall line chart on an LTTB pyramid.')
+    parser.add_argument('--xml', default=DEFAULT_XML)
+    parser.add_argument('--days', type=int, default=0, help='benchmark a synthetic daily series of this length instead')
+    parser.add_argument('--size', default='1200x420', help='WxH')
+    parser.add_argument('--out', default='timeseries.png')
+    args = parser.parse_args(argv)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    font = pygame.font.Font(None, 18)
+    t0 = time.perf_counter()
+    if args.days:
+        view = TimeSeriesView(*_bench_series(args.days), font)
+    else:
+        clim = Climatology.from_xml(args.xml)
+        if not clim.years:
+            print(f"No rainfall data in {args.xml}")
+            return 1
+        view = TimeSeriesView.from_climatology(clim, font)
+    build_ms = (time.perf_counter() - t0) * 1000
+    sizes = [len(lx) for lx, _ in view.pyramid.levels]
+    print(f"{sizes[0]:,} points, {len(sizes)} levels {sizes}, built in {build_ms:.1f} ms")
+    surface = pygame.Surface(tuple(int(v) for v in args.size.lower().split('x')))
+    rect = surface.get_rect()
+    lo, hi = view.pyramid.x_range
+    for span in (hi - lo, 20.0, 2.0):
+        view.window = view.target = view._clamp(hi - span, hi)
+        runs = 30
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            view.draw(surface, rect)
+        ms = (time.perf_counter() - t0) / runs * 1000
+        print(f"window {span:6.1f} years: level {view.last_level}, {view.last_points:,} points, {ms:.2f} ms/draw")
+    # the same full-range frame drawing every point, for comparison
+    lx, ly = view.pyramid.levels[0]
+    pts = np.column_stack((np.interp(lx, (lo, hi), (0, rect.width)), rect.height - ly)).tolist()
+    t0 = time.perf_counter()
+    for _ in range(5):
+        pygame.draw.aalines(surface, (255, 255, 255), False, pts)
+    print(f"all {len(lx):,} points: {(time.perf_counter() - t0) / 5 * 1000:.2f} ms/draw")
+    view.window = view.target = view.pyramid.x_range
+    view.draw(surface, rect, selected=str(int(hi) - 1))
+    pygame.image.save(surface, args.out)
+    print(f"saved {args.out}")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Retained rendering for the UI widgets.
+
+Widgets keep what they draw (scaled button images, rendered text, the year
+label card) in a `SurfaceCache` keyed by everything that decides the pixels:
+state, size, text. Source images and fonts are part of the key as objects,
+not `id()`s, so the cache keeps them alive and a recycled id can never return
+another object's render. A widget whose state did not change only blits surfaces it
+already has; `smoothscale`, `font.render` and SRCALPHA allocations happen once
+per state. `invalidate_all()` drops every cache (Main.py calls it on
+VIDEORESIZE, when all the sizes change at once).
+"""
+import weakref
+from collections import OrderedDict
+
+import pygame
+
+_caches = weakref.WeakSet()
+
+
+class SurfaceCache:
+    """Small LRU of built surfaces; `get(key, build)` calls `build()` on a miss."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        surf = self._entries.get(key)
+        if surf is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = build()
+        self._entries[key] = surf
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self._entries.clear()
+
+
+def invalidate_all():
+    for cache in list(_caches):
+        cache.clear()
+
+
+def stats():
+    caches = list(_caches)
+    return {
+        'caches': len(caches),
+        'entries': sum(len(c) for c in caches),
+        'hits': sum(c.hits for c in caches),
+        'misses': sum(c.misses for c in caches),
+    }
+
+
+def scaled(cache, image, size):
+    """`image` smoothscaled to `size`, built once per (image, size)."""
+    size = (max(1, int(size[0])), max(1, int(size[1])))
+    return cache.get(('scaled', image, size), lambda: pygame.transform.smoothscale(image, size))
+
+
+def text(cache, font, string, color, background=None):
+    """`font.render(string, True, color, background)`, built once per argument set."""
+    return cache.get(('text', font, string, tuple(color), background),
+                     lambda: font.render(string, True, color, background))
+
+
+def filled(cache, size, rgba, border_radius=0):
+    """An SRCALPHA surface of `size` filled with `rgba` (rounded when border_radius > 0)."""
+    def build():
+        surf = pygame.Surface(size, pygame.SRCALPHA)
+        if border_radius:
+            pygame.draw.rect(surf, rgba, (0, 0, size[0], size[1]), border_radius=border_radius)
+        else:
+            surf.fill(rgba)
+        return surf
+    return cache.get(('filled', tuple(size), tuple(rgba), border_radius), build)
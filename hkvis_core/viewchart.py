@@ -1,55 +1,31 @@
 import os
-import datetime
-import json
-import requests
-import dotenv
-from lxml import html
-import matplotlib.pyplot as plt
-import drawsvg as draw
+import math
 
 # Import our custom utilities
+try:
+    from hkvis_core import datacache
+except ImportError:
+    import datacache
 
+# matplotlib, NumPy (climatology) and dotenv are imported where they are used,
+# so importing load_rainfall_data (as Main.py does) stays cheap
 
-print("All libraries imported successfully!")
-
-# Display the loaded environment variables
-dotenv.load_dotenv()
-
-# Let's look at our scraping utilities
-import inspect
 
+def _climatology(years, rainfall, xml_path=None):
+    try:
+        from hkvis_core.climatology import Climatology
+    except ImportError:
+        from climatology import Climatology
+    # from the file when possible: load_rainfall_data turns missing months into 0.0
+    if xml_path is not None:
+        return Climatology.from_xml(xml_path)
+    return Climatology(years, rainfall)
 
 
 # --- Rainfall Monthly Rate Table from monthlyElement.xml ---
 def load_rainfall_data(xml_path):
-    with open(xml_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    data = json.loads(content)
-    rf = None
-    for section in data['stn']['data']:
-        if section.get('code') == 'RF':
-            rf = section
-            break
-    if not rf:
-        raise ValueError('Rainfall data (RF) not found in file.')
-    monthdata = rf['monthData']
-    years = []
-    rainfall = []
-    for row in monthdata:
-        year = row[0]
-        vals = []
-        for v in row[1:]:
-            v = v.strip()
-            if v in ("Trace", "", "***"):
-                vals.append(0.0)
-            else:
-                try:
-                    vals.append(float(v))
-                except Exception:
-                    vals.append(0.0)
-        years.append(year)
-        rainfall.append(vals)
-    return years, rainfall
+    # parsed once per file version and shared through the parsed-data cache
+    return datacache.load_element(xml_path, 'RF')
 
 def print_rainfall_table(years, rainfall, year):
     months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
@@ -61,12 +37,14 @@ def print_rainfall_table(years, rainfall, year):
     print("Month\t" + "\t".join(months))
     print("Rain(mm)\t" + "\t".join(f"{v:.1f}" for v in rainfall[idx]))
 
-def plot_rainfall_for_year(years, rainfall, year):
+def plot_rainfall_for_year(years, rainfall, year, clim=None):
     months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
     if year not in years:
         print(f"Year {year} not found in rainfall data.")
         return
     idx = years.index(year)
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
     plt.figure(figsize=(6, 4))
     manager = plt.get_current_fig_manager()
     try:
@@ -81,7 +59,6 @@ def plot_rainfall_for_year(years, rainfall, year):
     colors[min_idx] = '#1a80bb'  # blue for lowest
     bars = plt.bar(months, vals, color=colors)
     # Add legend for colors
-    import matplotlib.patches as mpatches
     orange_patch = mpatches.Patch(color='#ea801c', label='Highest Month')
     blue_patch = mpatches.Patch(color='#1a80bb', label='Lowest Month')
     plt.legend(handles=[orange_patch, blue_patch], loc='upper right')
@@ -93,16 +70,30 @@ def plot_rainfall_for_year(years, rainfall, year):
     plt.gca().spines['top'].set_visible(False)
     plt.gca().spines['right'].set_visible(False)
     plt.show()
+    # statistics come from the shared climatology (pass `clim` to avoid rebuilding it)
+    if clim is None:
+        clim = _climatology(years, rainfall)
+    stats = clim.year_stats(year)
     print(f"\nRainfall Statistics:")
-    vals = rainfall[idx]
-    print(f"Highest: {max(vals):.1f} mm")
-    print(f"Lowest: {min(vals):.1f} mm")
-    print(f"Average: {sum(vals)/len(vals):.1f} mm")
-    print(f"Range: {max(vals)-min(vals):.1f} mm")
+    print(f"Highest: {stats['highest']:.1f} mm")
+    print(f"Lowest: {stats['lowest']:.1f} mm")
+    print(f"Average: {stats['average']:.1f} mm")
+    print(f"Range: {stats['range']:.1f} mm")
+    print(f"Total: {stats['total']:.1f} mm ({stats['anomaly']:+.1f} mm vs. climatology)")
+    if math.isnan(stats['rank']):
+        print("Rank: n/a (no months recorded)")
+    else:
+        print(f"Rank: {int(stats['rank'])} of {stats['ranked_years']} (1 = wettest)")
 
 if __name__ == "__main__":
+    try:
+        import dotenv
+        dotenv.load_dotenv()
+    except ImportError:
+        pass
     xml_path = os.path.join(os.path.dirname(__file__), 'data', 'monthlyElement.xml')
     years, rainfall = load_rainfall_data(xml_path)
+    clim = _climatology(years, rainfall, xml_path)
     min_year = min(years)
     max_year = max(years)
     while True:
@@ -116,4 +107,4 @@ if __name__ == "__main__":
             continue
         year = choice
         print_rainfall_table(years, rainfall, year)
-        plot_rainfall_for_year(years, rainfall, year)
+        plot_rainfall_for_year(years, rainfall, year, clim=clim)
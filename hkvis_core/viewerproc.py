@@ -0,0 +1,208 @@
+"""External chart viewer processes, managed off the UI thread.
+
+`ViewerService` runs an asyncio event loop on a daemon thread and starts the
+viewer commands there (`asyncio.create_subprocess_exec`), so a UI callback
+only schedules work and returns immediately. Every operation has a timeout
+and reports back as one pygame event of type `service.event_type` with
+
+    action   'open' | 'close' | 'query' (or the name given to run_command)
+    path     the file the request was about
+    ok       False when the command failed, timed out or could not start
+    result   query: list of open document names; otherwise the exit code
+    error    short reason when not ok
+    elapsed  seconds the operation took
+
+Commands per platform:
+
+- open: `open` (macOS), `os.startfile` (Windows), `xdg-open` (elsewhere), or
+  the command in `HKVIS_VIEWER` (e.g. `HKVIS_VIEWER="feh --scale-down"`)
+  with the path appended. A viewer still running after `OPEN_GRACE` seconds
+  counts as opened and is kept, so `close` can terminate it.
+- close: asks Preview to close the document on macOS; a viewer this service
+  started itself is terminated. Other apps are never force-closed.
+- query: the names of the documents open in Preview (macOS only).
+"""
+import os
+import sys
+import time
+import shlex
+import asyncio
+import threading
+
+import pygame
+
+ENV_VIEWER = 'HKVIS_VIEWER'
+TIMEOUT = 2.0      # longest any command may take
+OPEN_GRACE = 0.5   # an open command that fails does so within this time
+
+PREVIEW_DOCUMENTS_SCRIPT = (
+    'tell application "System Events"\n'
+    ' set isRunning to (name of processes) contains "Preview"\n'
+    'end tell\n'
+    'if isRunning then\n'
+    ' tell application "Preview" to return (name of every document as string)\n'
+    'else\n'
+    ' return ""\n'
+    'end if'
+)
+
+
+def viewer_command(path, viewer=None):
+    """argv that opens `path`, or None when the platform opens files without a command."""
+    viewer = viewer if viewer is not None else os.environ.get(ENV_VIEWER)
+    if viewer:
+        return shlex.split(viewer) + [path]
+    if sys.platform == 'darwin':
+        return ['open', path]
+    if sys.platform.startswith('win'):
+        return None
+    return ['xdg-open', path]
+
+
+class ViewerService:
+    def __init__(self, event_type=None, timeout=TIMEOUT, viewer=None, open_grace=OPEN_GRACE):
+        self.event_type = event_type if event_type is not None else pygame.event.custom_type()
+        self.timeout = timeout
+        self.viewer = viewer
+        self.open_grace = open_grace
+        self._owned = {}  # path -> viewer process this service started and may terminate
+        self._drains = set()  # tasks reading the stderr of kept viewers
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='hkvis-viewer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _post(self, action, path, ok, result=None, error=None, started=None):
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        try:
+            pygame.event.post(pygame.event.Event(self.event_type, action=action, path=path, ok=ok,
+                                                 result=result, error=error, elapsed=elapsed))
+        except pygame.error:
+            pass  # display already shut down
+
+    # --- requests (any thread, non-blocking) ---
+    def open(self, path):
+        return self._submit(self._open(path))
+
+    def close(self, path):
+        return self._submit(self._close(path))
+
+    def query(self, fname=None):
+        return self._submit(self._query(fname))
+
+    def run_command(self, action, argv, timeout=None, path=None):
+        """Run `argv` to completion (killed after `timeout`) and post its outcome."""
+        return self._submit(self._command(action, argv, timeout, path))
+
+    def stop(self):
+        """Stop the loop thread; viewers that are still open stay open."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=self.timeout)
+
+    # --- coroutines (loop thread) ---
+    async def _exec(self, argv, stdout=False, stderr=False):
+        def pipe(capture):
+            return asyncio.subprocess.PIPE if capture else asyncio.subprocess.DEVNULL
+        return await asyncio.create_subprocess_exec(*argv, stdin=asyncio.subprocess.DEVNULL,
+                                                    stdout=pipe(stdout), stderr=pipe(stderr))
+
+    async def _drain(self, stream):
+        # a kept viewer may log a lot (GTK warnings); nobody reads it, but a full pipe would block it
+        while await stream.read(64 * 1024):
+            pass
+
+    async def _command(self, action, argv, timeout=None, path=None, capture=True):
+        started = time.perf_counter()
+        try:
+            proc = await self._exec(argv, stdout=capture, stderr=capture)
+        except OSError as e:
+            self._post(action, path, False, error=str(e), started=started)
+            return None
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            self._post(action, path, False, error='timeout', started=started)
+            return None
+        ok = proc.returncode == 0
+        self._post(action, path, ok, result=proc.returncode,
+                   error=None if ok else (err or b'').decode(errors='ignore').strip() or f'exit {proc.returncode}',
+                   started=started)
+        return out
+
+    async def _open(self, path):
+        started = time.perf_counter()
+        argv = viewer_command(path, self.viewer)
+        if argv is None:
+            try:
+                await self._loop.run_in_executor(None, os.startfile, path)
+                self._post('open', path, True, started=started)
+            except OSError as e:
+                self._post('open', path, False, error=str(e), started=started)
+            return
+        await self._terminate(path)
+        try:
+            # stderr only, for the error message of a viewer that fails within the grace period
+            proc = await self._exec(argv, stderr=True)
+        except OSError as e:
+            self._post('open', path, False, error=str(e), started=started)
+            return
+        try:
+            # launchers (xdg-open, open) exit quickly; a real viewer keeps running
+            _, err = await asyncio.wait_for(proc.communicate(), self.open_grace)
+        except asyncio.TimeoutError:
+            self._owned[path] = proc
+            task = self._loop.create_task(self._drain(proc.stderr))
+            self._drains.add(task)
+            task.add_done_callback(self._drains.discard)
+            self._post('open', path, True, started=started)
+            return
+        ok = proc.returncode == 0
+        self._post('open', path, ok, result=proc.returncode,
+                   error=None if ok else (err or b'').decode(errors='ignore').strip() or f'exit {proc.returncode}',
+                   started=started)
+
+    async def _terminate(self, path):
+        proc = self._owned.pop(path, None)
+        if proc is None or proc.returncode is not None:
+            return False
+        proc.terminate()
+        try:
+            await asyncio.wait_for(proc.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+        return True
+
+    async def _close(self, path):
+        started = time.perf_counter()
+        if await self._terminate(path):
+            self._post('close', path, True, started=started)
+        elif sys.platform == 'darwin':
+            fname = os.path.basename(path)
+            script = f'tell application "Preview" to close (every document whose name is "{fname}")'
+            await self._command('close', ['osascript', '-e', script], path=path)
+        else:
+            # not ours to close: the user closes the external viewer
+            self._post('close', path, True, started=started)
+
+    async def _query(self, fname=None):
+        started = time.perf_counter()
+        if sys.platform != 'darwin':
+            self._post('query', fname, True, result=[], started=started)
+            return
+        out = await self._command('query-osascript', ['osascript', '-e', PREVIEW_DOCUMENTS_SCRIPT],
+                                  path=fname)
+        if out is None:
+            self._post('query', fname, False, result=[], error='osascript failed', started=started)
+            return
+        names = [n.strip() for n in out.decode(errors='ignore').split(',') if n.strip()]
+        self._post('query', fname, True, result=names, started=started)
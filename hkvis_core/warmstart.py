@@ -0,0 +1,200 @@
+"""Warm-start snapshot: show the last session's frame before anything is loaded.
+
+On exit Main.py saves a small snapshot of its state; on the next launch it
+puts that frame on screen right after the window opens, before the UI
+images, fonts, audio and data, and cross-fades to the live animation once
+the pipeline has rendered its first frame.
+
+The snapshot file (`SNAPSHOT_PATH`, in the same cache directory as the UI
+bundle and font lookups) is
+
+    b'HKWS' | u32 header length | JSON header | zlib(RGB pixels)
+
+with the header holding the selected year, the animation time the frame
+was rendered at, the pattern parameters (`pattern_params`), the frame size
+and the save time. The frame is the animation surface at its native size,
+so the file stays small (mostly black pixels compress well) and loading it
+is one inflate plus one `image.frombuffer`.
+
+A frame rendered with different pattern parameters (grid, font size,
+speeds, render path) is not shown; the selected year is still restored.
+The live animation resumes at the saved time, so the cross-fade is between
+two renderings of the same moment.
+
+    snapshot = load_snapshot(params=pattern_params(animationtest, 'rgb'))
+    if snapshot is not None and snapshot.frame is not None: ...
+    save_snapshot(anim_surface, year=1997, anim_time=12.5, params=...)
+
+    python -m hkvis_core.warmstart [--show]    # describe the saved snapshot
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import argparse
+
+import pygame
+
+try:
+    from hkvis_core.assetbundle import CACHE_DIR
+except ImportError:
+    from assetbundle import CACHE_DIR
+
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, 'warmstart.hkw')
+MAGIC = b'HKWS'
+FORMAT_VERSION = 1
+CROSSFADE_SECONDS = 0.4
+
+
+def pattern_params(anim_module, render='rgb'):
+    """Everything the look of an animation frame depends on besides the data and the time."""
+    return {
+        'cols': anim_module.COLS,
+        'rows': anim_module.ROWS,
+        'font_size': anim_module.FONT_SIZE,
+        'speed_factor': anim_module.SPEED_FACTOR,
+        'base_time_scale': anim_module.BASE_TIME_SCALE,
+        'speed_multiplier': anim_module.SPEED_MULTIPLIER,
+        'render': render,
+    }
+
+
+class Snapshot:
+    def __init__(self, header, frame):
+        self.header = header
+        self.frame = frame  # pygame Surface, or None when it does not match the current parameters
+        self.year = header.get('year')
+        self.anim_time = float(header.get('anim_time', 0.0))
+
+    def scaled(self, size):
+        if self.frame.get_size() == tuple(size):
+            return self.frame
+        return pygame.transform.smoothscale(self.frame, size)
+
+
+def save_snapshot(frame, year, anim_time, params, path=SNAPSHOT_PATH):
+    """Write the snapshot atomically; False when it could not be written."""
+    header = {
+        'version': FORMAT_VERSION,
+        'year': year,
+        'anim_time': anim_time,
+        'params': params,
+        'size': list(frame.get_size()) if frame is not None else None,
+        'saved': time.time(),
+    }
+    pixels = zlib.compress(pygame.image.tobytes(frame, 'RGB'), 6) if frame is not None else b''
+    meta = json.dumps(header).encode()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(meta)) + meta + pixels)
+        os.replace(path + '.tmp', path)
+        return True
+    except OSError:
+        return False
+
+
+def read_header(path=SNAPSHOT_PATH):
+    """(header dict, offset of the pixel data) or None."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(8)
+            if len(head) < 8 or head[:4] != MAGIC:
+                return None
+            (n,) = struct.unpack('<I', head[4:])
+            header = json.loads(f.read(n))
+    except (OSError, ValueError):
+        return None
+    if header.get('version') != FORMAT_VERSION:
+        return None
+    return header, 8 + n
+
+
+def load_snapshot(path=SNAPSHOT_PATH, params=None):
+    """The saved Snapshot, its frame dropped when `params` differ; None without a usable file."""
+    found = read_header(path)
+    if found is None:
+        return None
+    header, offset = found
+    frame = None
+    if header.get('size') and (params is None or header.get('params') == params):
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                pixels = zlib.decompress(f.read())
+            frame = pygame.image.frombuffer(pixels, tuple(header['size']), 'RGB')
+            if pygame.display.get_surface() is not None:
+                frame = frame.convert()
+        except (OSError, ValueError, zlib.error, pygame.error):
+            frame = None
+    return Snapshot(header, frame)
+
+
+class CrossFade:
+    """Blends the snapshot over the live backdrop, fading it out over `seconds`."""
+
+    def __init__(self, surface, seconds=CROSSFADE_SECONDS):
+        self.surface = surface
+        self.seconds = seconds
+        self.started = None
+        self._scaled = None
+
+    @property
+    def done(self):
+        return self.started is not None and time.perf_counter() - self.started >= self.seconds
+
+    def apply(self, backdrop):
+        """A copy of `backdrop` with the snapshot on top, or `backdrop` itself once the fade is over."""
+        if self.started is None:
+            self.started = time.perf_counter()
+        t = (time.perf_counter() - self.started) / self.seconds
+        if t >= 1.0:
+            return backdrop
+        size = backdrop.get_size()
+        if self._scaled is None or self._scaled.get_size() != size:
+            self._scaled = pygame.transform.smoothscale(self.surface, size) if self.surface.get_size() != size else self.surface
+        blended = backdrop.copy()
+        self._scaled.set_alpha(int(255 * (1.0 - t)))
+        blended.blit(self._scaled, (0, 0))
+        return blended
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Describe the warm-start snapshot.')
+    parser.add_argument('--path', default=SNAPSHOT_PATH)
+    parser.add_argument('--show', action='store_true', help='save the frame as warmstart.png')
+    parser.add_argument('--clear', action='store_true', help='delete the snapshot')
+    args = parser.parse_args(argv)
+    if args.clear:
+        try:
+            os.remove(args.path)
+            print(f"removed {args.path}")
+        except OSError:
+            print(f"no snapshot at {args.path}")
+        return 0
+    found = read_header(args.path)
+    if found is None:
+        print(f"no snapshot at {args.path}")
+        return 1
+    header, _ = found
+    age = time.time() - header.get('saved', time.time())
+    print(f"{args.path}: {os.path.getsize(args.path):,} bytes, saved {age / 60:.0f} min ago")
+    print(f"  year {header.get('year')}, animation time {header.get('anim_time', 0.0):.2f} s, "
+          f"frame {header.get('size')}")
+    print(f"  params {header.get('params')}")
+    if args.show:
+        t0 = time.perf_counter()
+        snapshot = load_snapshot(args.path)
+        if snapshot is None or snapshot.frame is None:
+            print('  no frame stored')
+            return 1
+        print(f"  loaded in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        pygame.image.save(snapshot.frame, 'warmstart.png')
+        print('  saved warmstart.png')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""Static web bundle for the GitHub Pages demo, generated from the Python engine.
+
+Instead of a JavaScript re-implementation of the animation, the page plays
+frames computed here with `animationtest`'s own pattern code, so it cannot
+drift from the desktop app and only has to decode and blit:
+
+    docs/bundle/manifest.json          grid, fps, glyph size, file names, per-year sizes
+    docs/bundle/glyphs.<hash>.bin      alpha mask of every ASCII_CHARS glyph (engine font)
+    docs/bundle/palette.<hash>.bin     (rows, SHADES, 3) RGB density tint per row
+    docs/bundle/sparkle.<hash>.bin     shared per-cell white sparkle frames
+    docs/bundle/frames/<year>.<hash>.bin   per-year frame pack
+    docs/bundle/charts/<year>.<hash>.png   per-year chart image
+
+A frame pack is b'HKF1', u16 cols, rows, frames, fps, then the zlib-deflated
+cells, one byte per cell and frame: glyph index * SHADES + shade (the
+density quantised to SHADES levels). The bytes are stored cell-major, i.e.
+each cell's whole clip is contiguous (offset `(row * cols + col) * frames +
+frame`): a cell changes slowly over time, so this deflates to about a
+quarter, clearly better than frame-major or XOR/subtract deltas. The
+sparkle pack has the same layout with the quantised white factor per cell;
+it does not depend on the rainfall, so every year shares it. The page draws
+cell colour = palette[row][shade] lifted toward white by the sparkle amount,
+which is `final_cell_color` without its +-4% column shimmer.
+
+File names carry a hash of their content, so the bundle can be cached
+forever. Builds are incremental: a year whose rainfall and engine settings
+are unchanged keeps its pack, a chart whose source PNG is unchanged keeps its
+copy, and files no longer referenced are removed (only the hashed files this
+module writes, so the output directory may hold other files). `--years`
+rebuilds the given years and keeps the rest of the existing bundle.
+
+    python -m hkvis_core.webbundle [--xml data/monthlyElement.xml] [--out docs/bundle]
+                                   [--seconds 4] [--fps 15] [--years 1990-2000] [--force]
+"""
+import io
+import os
+import re
+import sys
+import contextlib
+import json
+import time
+import zlib
+import struct
+import hashlib
+import argparse
+
+import numpy as np
+import pygame
+
+try:
+    from hkvis_core import animationtest, datacache, svgchart
+    from hkvis_core.viewchart import load_rainfall_data
+except ImportError:
+    import animationtest
+    import datacache
+    import svgchart
+    from viewchart import load_rainfall_data
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(script_dir, '..')
+DEFAULT_XML = os.path.join(ROOT_DIR, 'data', 'monthlyElement.xml')
+DEFAULT_OUT = os.path.join(ROOT_DIR, 'docs', 'bundle')
+DEFAULT_CHART_DIR = os.path.join(ROOT_DIR, 'rainfall_charts')
+MANIFEST_NAME = 'manifest.json'
+PACK_MAGIC = b'HKF1'
+SHADES = 16           # density levels per glyph cell (glyph * SHADES + shade fits a byte)
+SPARKLE_LEVELS = 16   # white factor levels
+SPARKLE_MAX = 0.9 * 0.8  # largest white factor the render loop produces
+SECONDS = 4.0         # length of the looped clip per year
+FPS = 15
+CHART_SIZE = (800, 400)  # for years without a chart PNG
+FORMAT_VERSION = 2
+
+
+def _short_hash(data):
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def _write_hashed(out_dir, subdir, stem, suffix, data, overwrite=False):
+    """Write `data` as <subdir>/<stem>.<hash><suffix> (skipped if present unless `overwrite`);
+    returns the relative name."""
+    name = f'{stem}.{_short_hash(data)}{suffix}'
+    rel = f'{subdir}/{name}' if subdir else name
+    path = os.path.join(out_dir, rel)
+    if overwrite or not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+    return rel
+
+
+def encode_pack(frames, fps):
+    """Frame pack bytes for a (frames, rows, cols) uint8 array."""
+    n, rows, cols = frames.shape
+    cells = np.ascontiguousarray(frames.transpose(1, 2, 0))
+    return PACK_MAGIC + struct.pack('<4H', cols, rows, n, fps) + zlib.compress(cells.tobytes(), 9)
+
+
+def decode_pack(data):
+    """Inverse of `encode_pack`: ((frames, rows, cols) uint8 array, fps)."""
+    if data[:4] != PACK_MAGIC:
+        raise ValueError('not a frame pack')
+    cols, rows, n, fps = struct.unpack('<4H', data[4:12])
+    cells = np.frombuffer(zlib.decompress(data[12:]), dtype=np.uint8).reshape(rows, cols, n)
+    return cells.transpose(2, 0, 1), fps
+
+
+def frame_times(seconds=SECONDS, fps=FPS):
+    return np.arange(int(round(seconds * fps))) / float(fps)
+
+
+def year_frames(vals, seconds=SECONDS, fps=FPS, cols=animationtest.COLS, rows=animationtest.ROWS):
+    """(frames, rows, cols) cell bytes (glyph * SHADES + shade) for one year's rainfall."""
+    times = frame_times(seconds, fps)
+    out = np.empty((len(times), rows, cols), dtype=np.uint8)
+    for i, t in enumerate(times):
+        norm = animationtest.fluid_norm_array(vals, t, cols=cols, rows=rows)
+        shade = np.minimum((norm * SHADES).astype(int), SHADES - 1)
+        out[i] = animationtest.glyph_indices(norm) * SHADES + shade
+    return out
+
+
+def sparkle_frames(seconds=SECONDS, fps=FPS, cols=animationtest.COLS, rows=animationtest.ROWS):
+    times = frame_times(seconds, fps)
+    out = np.empty((len(times), rows, cols), dtype=np.uint8)
+    for i, t in enumerate(times):
+        wf = animationtest.white_factor_array(t, cols=cols, rows=rows)
+        out[i] = np.rint(wf / SPARKLE_MAX * (SPARKLE_LEVELS - 1)).astype(np.uint8)
+    return out
+
+
+def palette(rows=animationtest.ROWS):
+    """(rows, SHADES, 3) uint8 cell colours without sparkle, one per density level."""
+    out = np.empty((rows, SHADES, 3), dtype=np.uint8)
+    for r in range(rows):
+        base = animationtest.row_base_color(r, rows)
+        for s in range(SHADES):
+            out[r, s] = animationtest.final_cell_color(base, (s + 0.5) / SHADES, r, rows, time_mod=0.5)
+    return out
+
+
+def engine_font():
+    """The monospace font Main.py animates with (same lookup order)."""
+    monos = pygame.font.match_font('consolas, courier, monospace')
+    if monos:
+        return pygame.font.Font(monos, animationtest.FONT_SIZE)
+    return pygame.font.SysFont('couriernew', animationtest.FONT_SIZE)
+
+
+def glyph_masks(font):
+    """(len(ASCII_CHARS), h, w) uint8 alpha masks and the cell size (w, h)."""
+    w, h = font.size('M')
+    masks = np.zeros((len(animationtest.ASCII_CHARS), h, w), dtype=np.uint8)
+    for i, ch in enumerate(animationtest.ASCII_CHARS):
+        alpha = pygame.surfarray.array_alpha(font.render(ch, True, (255, 255, 255))).T
+        gh, gw = min(h, alpha.shape[0]), min(w, alpha.shape[1])
+        masks[i, :gh, :gw] = alpha[:gh, :gw]
+    return masks, (w, h)
+
+
+def _input_key(vals, seconds, fps):
+    # everything a frame pack depends on: the data and the engine/bundle settings
+    settings = [FORMAT_VERSION, seconds, fps, SHADES, animationtest.COLS, animationtest.ROWS,
+                animationtest.SPEED_FACTOR, animationtest.BASE_TIME_SCALE, animationtest.SPEED_MULTIPLIER,
+                animationtest.GLOBAL_MEAN_CAP, animationtest.ASCII_CHARS]
+    return datacache.content_key(settings, [float(v) for v in vals])
+
+
+def _chart_source(chart_dir, year):
+    path = os.path.join(chart_dir, f'rainfall_{year}.png')
+    if os.path.exists(path):
+        st = os.stat(path)
+        return path, [st.st_size, st.st_mtime_ns]
+    return None, None
+
+
+def _chart_png(year, vals, source, render_lock=None):
+    if source is not None:
+        with open(source, 'rb') as f:
+            return f.read()
+    buf = io.BytesIO()
+    with render_lock or contextlib.nullcontext():
+        surf = svgchart.render_chart_raster(year, vals, CHART_SIZE)
+    pygame.image.save(surf, buf, 'png')
+    return buf.getvalue()
+
+
+def load_manifest(out_dir=DEFAULT_OUT):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_bundle(xml_path=DEFAULT_XML, out_dir=DEFAULT_OUT, chart_dir=DEFAULT_CHART_DIR, seconds=SECONDS,
+                 fps=FPS, years=None, verbose=True, force=False, render_lock=None):
+    """Write or update the bundle; returns the manifest dict.
+
+    `force` rebuilds every selected year instead of reusing its pack and
+    chart; `render_lock` is held around fallback chart renders (svgchart's
+    font cache is shared with whatever else renders charts on other threads).
+    """
+    start = time.perf_counter()
+    pygame.init()
+    year_list, rainfall = load_rainfall_data(xml_path)
+    data = {str(y): list(v) for y, v in zip(year_list, rainfall) if v}
+    old = load_manifest(out_dir) or {}
+    old_years = old.get('years', {}) if old.get('version') == FORMAT_VERSION else {}
+    # a subset build keeps the other years of the existing bundle as they are
+    carried = {}
+    if years is not None:
+        carried = {y: e for y, e in old_years.items() if y in data and y not in years}
+        data = {y: v for y, v in data.items() if y in years}
+    os.makedirs(out_dir, exist_ok=True)
+
+    masks, (cell_w, cell_h) = glyph_masks(engine_font())
+    manifest = {
+        'version': FORMAT_VERSION,
+        'cols': animationtest.COLS,
+        'rows': animationtest.ROWS,
+        'padding': animationtest.PADDING,
+        'cell': [cell_w, cell_h],
+        'fps': fps,
+        'frames': len(frame_times(seconds, fps)),
+        'shades': SHADES,
+        'sparkle_levels': SPARKLE_LEVELS,
+        'sparkle_max': SPARKLE_MAX,
+        'background': list(animationtest.BG_COLOR),
+        'glyphs': _write_hashed(out_dir, '', 'glyphs', '.bin', masks.tobytes(), force),
+        'palette': _write_hashed(out_dir, '', 'palette', '.bin', palette().tobytes(), force),
+        'sparkle': _write_hashed(out_dir, '', 'sparkle', '.bin', encode_pack(sparkle_frames(seconds, fps), fps),
+                                 force),
+        'years': {},
+    }
+    if carried and any(old.get(k) != manifest[k] for k in ('cols', 'rows', 'cell', 'fps', 'frames')):
+        raise ValueError('the existing bundle was built with other clip settings; '
+                         'rebuild all years instead of a subset')
+
+    built = reused = 0
+    for year in sorted(data, key=int):
+        vals = data[year]
+        prev = {} if force else old_years.get(year, {})
+        entry = {'total_mm': round(float(sum(vals)), 1)}
+        key = _input_key(vals, seconds, fps)
+        if prev.get('input') == key and os.path.exists(os.path.join(out_dir, prev.get('pack', ''))):
+            entry.update(input=key, pack=prev['pack'], pack_bytes=prev['pack_bytes'])
+            reused += 1
+        else:
+            pack = encode_pack(year_frames(vals, seconds, fps), fps)
+            entry.update(input=key, pack=_write_hashed(out_dir, 'frames', year, '.bin', pack, force), pack_bytes=len(pack))
+            built += 1
+        source, stamp = _chart_source(chart_dir, year)
+        chart_sig = stamp if stamp is not None else ['data', key]
+        if prev.get('chart_source') == chart_sig and os.path.exists(os.path.join(out_dir, prev.get('chart', ''))):
+            entry.update(chart=prev['chart'], chart_bytes=prev['chart_bytes'], chart_source=chart_sig)
+        else:
+            png = _chart_png(year, vals, source, render_lock)
+            entry.update(chart=_write_hashed(out_dir, 'charts', year, '.png', png, force), chart_bytes=len(png),
+                         chart_source=chart_sig)
+        manifest['years'][year] = entry
+    manifest['years'].update(carried)
+    manifest['years'] = dict(sorted(manifest['years'].items(), key=lambda kv: int(kv[0])))
+
+    with open(os.path.join(out_dir, MANIFEST_NAME) + '.tmp', 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(os.path.join(out_dir, MANIFEST_NAME) + '.tmp', os.path.join(out_dir, MANIFEST_NAME))
+    removed = _remove_unreferenced(out_dir, manifest)
+    if verbose:
+        print(f'Built {built} year pack(s), reused {reused}, removed {removed} stale file(s) '
+              f'in {time.perf_counter() - start:.1f}s')
+    return manifest
+
+
+# only files this module writes are ever removed, so --out may hold other files
+_SHARED_RE = re.compile(r'^(glyphs|palette|sparkle)\.[0-9a-f]{12}\.bin$')
+
+
+def _remove_unreferenced(out_dir, manifest):
+    keep = {manifest['glyphs'], manifest['palette'], manifest['sparkle']}
+    for entry in manifest['years'].values():
+        keep.update((entry['pack'], entry['chart']))
+    candidates = [name for name in os.listdir(out_dir) if _SHARED_RE.match(name)]
+    for subdir in ('frames', 'charts'):
+        if os.path.isdir(os.path.join(out_dir, subdir)):
+            candidates += [f'{subdir}/{name}' for name in os.listdir(os.path.join(out_dir, subdir))]
+    removed = 0
+    for rel in candidates:
+        if rel not in keep:
+            os.remove(os.path.join(out_dir, rel))
+            removed += 1
+    return removed
+
+
+def size_report(manifest, out_dir=DEFAULT_OUT):
+    """Per-year and total output sizes as printable lines."""
+    shared = sum(os.path.getsize(os.path.join(out_dir, manifest[k])) for k in ('glyphs', 'palette', 'sparkle'))
+    cells = manifest['cols'] * manifest['rows'] * manifest['frames']
+    lines = [f"{'year':>6} {'frames':>10} {'ratio':>6} {'chart':>10} {'total':>10}"]
+    pack_total = chart_total = 0
+    for year, e in sorted(manifest['years'].items(), key=lambda kv: int(kv[0])):
+        pack_total += e['pack_bytes']
+        chart_total += e['chart_bytes']
+        lines.append(f"{year:>6} {e['pack_bytes']:>10,} {cells / e['pack_bytes']:>5.1f}x "
+                     f"{e['chart_bytes']:>10,} {e['pack_bytes'] + e['chart_bytes']:>10,}")
+    n = max(1, len(manifest['years']))
+    lines.append(f"shared (glyphs, palette, sparkle): {shared:,} bytes")
+    lines.append(f"{len(manifest['years'])} years: frames {pack_total:,} + charts {chart_total:,} = "
+                 f"{pack_total + chart_total + shared:,} bytes "
+                 f"(one year on the page: ~{(pack_total + chart_total) // n + shared:,} bytes)")
+    return lines
+
+
+def _parse_years(spec):
+    years = set()
+    for part in spec.split(','):
+        if '-' in part:
+            lo, hi = part.split('-')
+            years.update(str(y) for y in range(int(lo), int(hi) + 1))
+        elif part:
+            years.add(part.strip())
+    return years
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the static web bundle (frame packs, charts, manifest).')
+    parser.add_argument('--xml', default=DEFAULT_XML)
+    parser.add_argument('--out', default=DEFAULT_OUT)
+    parser.add_argument('--charts', default=DEFAULT_CHART_DIR)
+    parser.add_argument('--seconds', type=float, default=SECONDS, help='length of each looped clip')
+    parser.add_argument('--fps', type=int, default=FPS)
+    parser.add_argument('--years', help='subset such as 1990-2000,2024')
+    parser.add_argument('--force', action='store_true', help='rebuild the selected years instead of reusing them')
+    parser.add_argument('--quiet', action='store_true', help='skip the per-year size report')
+    args = parser.parse_args(argv)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    years = _parse_years(args.years) if args.years else None
+    manifest = build_bundle(args.xml, args.out, args.charts, args.seconds, args.fps, years, force=args.force)
+    if not args.quiet:
+        for line in size_report(manifest, args.out):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
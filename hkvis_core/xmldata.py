@@ -1,18 +1,29 @@
-import requests
 import os
 
-def download_xml():
-    url = "https://www.hko.gov.hk/cis/individual_month/monthlyElement.xml"
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_file = os.path.join(script_dir, "data", "monthlyElement.xml")
+try:
+    from hkvis_core import fetcher
+except ImportError:
+    import fetcher
+
+XML_URL = "https://www.hko.gov.hk/cis/individual_month/monthlyElement.xml"
+# Main.py and saveallcharts read the XML from <repo>/data
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def download_xml(url=XML_URL, output_file=None, session=None, force=False):
+    if output_file is None:
+        output_file = os.path.join(DATA_DIR, "monthlyElement.xml")
+    output_file = os.path.abspath(output_file)
     try:
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        with open(output_file, "wb") as f:
-            f.write(response.content)
-        print(f"已下載 XML 檔案到: {output_file}")
+        result = fetcher.fetch(url, output_file, session=session, force=force)
+        if result.modified:
+            print(f"已下載 XML 檔案到: {output_file} ({result.bytes} bytes, {result.elapsed:.2f}s)")
+        else:
+            print(f"XML 檔案未更新 (304): {output_file}")
+        return result
     except Exception as e:
         print("下載失敗:", e)
+        return None
 
 if __name__ == "__main__":
     download_xml()
@@ -0,0 +1,114 @@
+"""Shared fixtures: local stand-in HTTP servers for the download modules."""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves `server.files` ({path: (body, headers)}) like the HKO server would.
+
+    Honours If-None-Match / If-Modified-Since and Range + If-Range; paths in
+    `server.fail` answer 503 that many times, paths in `server.cut` send only
+    the first half of the body that many times, then drop the connection.
+    Every request is recorded in `server.seen` as (path, headers).
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.seen.append((self.path, dict(self.headers)))
+        body, headers = self.server.files[self.path]
+        if self.server.fail.get(self.path, 0) > 0:
+            self.server.fail[self.path] -= 1
+            self.send_error(503)
+            return
+        etag, modified = headers.get('ETag'), headers.get('Last-Modified')
+        if (etag and self.headers.get('If-None-Match') == etag) or \
+                (not etag and modified and self.headers.get('If-Modified-Since') == modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        rng = self.headers.get('Range')
+        if rng and self.headers.get('If-Range') in (etag, modified):
+            start = int(rng.split('=')[1].rstrip('-'))
+        self.send_response(206 if start else 200)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+        if self.server.cut.get(self.path, 0) > 0:
+            self.server.cut[self.path] -= 1
+            self.wfile.write(body[start:start + (len(body) - start) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    """Static files with Last-Modified / If-Modified-Since, `delay` seconds per
+    response; files with SLOW in their name trickle out 1 KiB every 50 ms."""
+
+    delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def copyfile(self, source, outputfile):
+        if 'SLOW' in self.path:
+            for chunk in iter(lambda: source.read(1024), b''):
+                outputfile.write(chunk)
+                outputfile.flush()
+                self.server.sleep(0.05)
+            return
+        self.server.sleep(self.delay)
+        super().copyfile(source, outputfile)
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stand_in_server():
+    """A StandInHandler server; fill in `files`, `fail` and `cut` before requesting."""
+    server = _serve(StandInHandler)
+    server.files, server.fail, server.cut, server.seen = {}, {}, {}, []
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def static_server():
+    """Factory: serve_dir(directory, delay=0.0) -> a StaticHandler server for `directory`."""
+    servers = []
+    stop = threading.Event()
+
+    def serve_dir(directory, delay=0.0):
+        class Handler(StaticHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=str(directory), **kwargs)
+        Handler.delay = delay
+        server = _serve(Handler)
+        # lets teardown cut a trickling response short instead of waiting it out
+        server.sleep = stop.wait
+        servers.append(server)
+        return server
+
+    yield serve_dir
+    stop.set()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
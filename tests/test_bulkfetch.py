@@ -0,0 +1,75 @@
+import json
+import os
+import time
+
+import pytest
+
+from hkvis_core import bulkfetch, datacache
+
+ELEMENTS = bulkfetch.DEFAULT_ELEMENTS + ['MEANTEMP']
+SERVER_DELAY = 0.05
+
+
+def _mock_file(path, codes):
+    rows = [[str(y)] + [f"{(y * 7 + m * 13) % 500 + 0.5:.1f}" for m in range(12)] for y in range(1884, 2025)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'stn': {'data': [{'code': c, 'monthData': rows} for c in codes]}}, f)
+
+
+@pytest.fixture
+def mirror(tmp_path, static_server):
+    """(url template, mirror dir, stations) for a server with 20 stations plus NOEL and SLOW."""
+    served = tmp_path / 'served'
+    served.mkdir()
+    stations = [f'S{i:02d}' for i in range(20)]
+    for station in stations:
+        for element in ELEMENTS:
+            _mock_file(served / f'{station}_{element}.xml', ['RF', 'MEANTEMP'])
+    _mock_file(served / 'NOEL_RF.xml', ['MEANTEMP'])
+    _mock_file(served / 'SLOW_RF.xml', ['RF'])
+    server = static_server(served, delay=SERVER_DELAY)
+    return server.base_url + '/{station}_{element}.xml', str(tmp_path / 'mirror'), stations
+
+
+def test_fetches_in_parallel_and_warms_the_cache(mirror):
+    template, out_dir, stations = mirror
+    items = bulkfetch.plan(stations, ELEMENTS, template, out_dir)
+    start = time.perf_counter()
+    rows = bulkfetch.bulk_fetch(items, workers=8, host_rate=0)
+    assert all(r.status == 200 and not r.cache_error for r in rows)
+    assert time.perf_counter() - start < len(items) * SERVER_DELAY
+    assert all(datacache.load_element(item.path, item.element)[0] for item in items)
+
+
+def test_second_run_is_all_304(mirror):
+    template, out_dir, stations = mirror
+    items = bulkfetch.plan(stations, ELEMENTS, template, out_dir)
+    bulkfetch.bulk_fetch(items, workers=8, host_rate=0)
+    rows = bulkfetch.bulk_fetch(items, workers=8, host_rate=0)
+    assert [r.status for r in rows] == [304] * len(items)
+
+
+def test_per_host_rate_limit(mirror):
+    template, out_dir, stations = mirror
+    items = bulkfetch.plan(stations, ELEMENTS, template, out_dir)[:6]
+    start = time.perf_counter()
+    bulkfetch.bulk_fetch(items, workers=6, host_rate=10)
+    # six starts at 10/s are spread over at least 0.5 s
+    assert time.perf_counter() - start >= 0.45
+
+
+def test_missing_element_is_a_parse_error_not_a_failed_download(mirror):
+    template, out_dir, _ = mirror
+    (row,) = bulkfetch.bulk_fetch(bulkfetch.plan(['NOEL'], ['RF'], template, out_dir), workers=1, host_rate=0)
+    assert row.status == 200 and row.bytes > 0 and row.error is None
+    assert row.cache_error
+    assert '1 could not be parsed' in bulkfetch.format_summary([row], 0.1)
+
+
+def test_global_timeout_stops_the_download(mirror):
+    template, out_dir, _ = mirror
+    items = bulkfetch.plan(['SLOW'], ['RF'], template, out_dir)
+    (row,) = bulkfetch.bulk_fetch(items, workers=1, host_rate=0, global_timeout=0.3)
+    assert row.status == 'timeout'
+    time.sleep(2.0)  # long enough for the trickled file to have finished without the deadline
+    assert not os.path.exists(items[0].path)
@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+import requests
+
+from hkvis_core import fetcher
+
+# several CHUNK_SIZE reads long, so a download cut halfway has whole chunks in its .part file
+BODY = b'{"stn":{"data":[]}}' * (fetcher.CHUNK_SIZE // 2)
+STAMP = 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+
+def _content(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as s:
+        yield s
+
+
+def test_etag_revalidation_is_304(stand_in_server, session, tmp_path):
+    stand_in_server.files['/etag.xml'] = (BODY, {'ETag': '"v1"'})
+    dest = str(tmp_path / 'etag.xml')
+    first = fetcher.fetch(stand_in_server.base_url + '/etag.xml', dest, session=session)
+    assert first.status == 200 and _content(dest) == BODY
+    again = fetcher.fetch(stand_in_server.base_url + '/etag.xml', dest, session=session)
+    assert again.status == 304 and not again.modified
+    assert stand_in_server.seen[-1][1].get('If-None-Match') == '"v1"'
+
+
+def test_if_modified_since_revalidation_is_304(stand_in_server, session, tmp_path):
+    stand_in_server.files['/ims.xml'] = (BODY, {'Last-Modified': STAMP})
+    dest = str(tmp_path / 'ims.xml')
+    fetcher.fetch(stand_in_server.base_url + '/ims.xml', dest, session=session)
+    again = fetcher.fetch(stand_in_server.base_url + '/ims.xml', dest, session=session)
+    assert again.status == 304
+    assert stand_in_server.seen[-1][1].get('If-Modified-Since') == STAMP
+
+
+def test_retries_503_with_backoff(stand_in_server, session, tmp_path):
+    stand_in_server.files['/flaky.xml'] = (BODY, {'ETag': '"v1"'})
+    stand_in_server.fail['/flaky.xml'] = 2
+    t0 = time.perf_counter()
+    result = fetcher.fetch(stand_in_server.base_url + '/flaky.xml', str(tmp_path / 'flaky.xml'),
+                           session=session, backoff=0.05)
+    assert result.status == 200 and result.attempts == 3
+    assert time.perf_counter() - t0 >= 0.05 + 0.1
+
+
+def test_resumes_part_file_with_range(stand_in_server, session, tmp_path):
+    stand_in_server.files['/resume.xml'] = (BODY, {'ETag': '"v1"'})
+    stand_in_server.cut['/resume.xml'] = 1
+    dest = str(tmp_path / 'resume.xml')
+    result = fetcher.fetch(stand_in_server.base_url + '/resume.xml', dest, session=session, backoff=0.01)
+    last = stand_in_server.seen[-1][1]
+    assert result.status == 206 and _content(dest) == BODY
+    assert 0 < int(last['Range'][6:-1]) <= len(BODY) // 2
+    assert last.get('If-Range') == '"v1"'
+
+
+def test_failed_download_keeps_old_file(stand_in_server, session, tmp_path):
+    stand_in_server.files['/broken.xml'] = (BODY, {'ETag': '"v2"'})
+    stand_in_server.cut['/broken.xml'] = 99
+    dest = str(tmp_path / 'broken.xml')
+    with open(dest, 'wb') as f:
+        f.write(b'previous copy')
+    with pytest.raises(requests.exceptions.RequestException):
+        fetcher.fetch(stand_in_server.base_url + '/broken.xml', dest, session=session, retries=2,
+                      backoff=0.01, force=True)
+    assert _content(dest) == b'previous copy'
+    assert not os.path.exists(dest + '.part')
+
+
+def test_past_deadline_writes_nothing(stand_in_server, session, tmp_path):
+    stand_in_server.files['/late.xml'] = (BODY, {'ETag': '"v1"'})
+    dest = str(tmp_path / 'late.xml')
+    with pytest.raises(TimeoutError):
+        fetcher.fetch(stand_in_server.base_url + '/late.xml', dest, session=session,
+                      deadline=time.monotonic() - 1)
+    assert not os.path.exists(dest)
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+
+import pygame
+import pytest
+
+from hkvis_core import viewerproc
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith('win'), reason='the fake viewer is a shell script')
+
+
+def _fake_viewer(directory):
+    """A viewer executable that logs its argument and behaves according to the file name."""
+    path = os.path.join(directory, 'fake-viewer')
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\n'
+                f'echo "$1" >> "{directory}/opened.log"\n'
+                'case "$1" in\n'
+                '  *fail*) echo "cannot open $1" >&2; exit 3 ;;\n'
+                '  *launcher*) exit 0 ;;\n'
+                '  *chatty*) sleep 0.5; head -c 1000000 /dev/zero >&2\n'
+                f'    touch "{directory}/chatty.done"; exec sleep 30 ;;\n'
+                '  *) exec sleep 30 ;;\n'
+                'esac\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def _wait_event(event_type, action, timeout=3.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        for event in pygame.event.get(event_type):
+            if event.action == action:
+                return event
+        time.sleep(0.01)
+    return None
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    service = viewerproc.ViewerService(viewer=_fake_viewer(str(tmp_path)), timeout=1.0, open_grace=0.3)
+    yield service
+    service.stop()
+    pygame.display.quit()
+
+
+def _request(service, action, request):
+    """Outcome event of `request()`, which must return to the caller at once."""
+    t0 = time.perf_counter()
+    request()
+    assert (time.perf_counter() - t0) * 1000 < 20
+    event = _wait_event(service.event_type, action)
+    assert event is not None
+    return event
+
+
+def test_open_keeps_a_running_viewer_and_close_terminates_it(service, tmp_path):
+    chart = str(tmp_path / 'rainfall_1997.png')
+    assert _request(service, 'open', lambda: service.open(chart)).ok
+    assert _request(service, 'close', lambda: service.close(chart)).ok
+    assert chart in (tmp_path / 'opened.log').read_text().split()
+
+
+def test_launcher_that_exits_0(service, tmp_path):
+    assert _request(service, 'open', lambda: service.open(str(tmp_path / 'launcher.png'))).ok
+
+
+def test_viewer_that_fails(service, tmp_path):
+    event = _request(service, 'open', lambda: service.open(str(tmp_path / 'fail.png')))
+    assert not event.ok and 'cannot open' in event.error
+
+
+def test_command_timeout(service):
+    event = _request(service, 'probe', lambda: service.run_command('probe', ['sleep', '5']))
+    assert not event.ok and event.error == 'timeout'
+
+
+def test_missing_executable(service, tmp_path):
+    event = _request(service, 'probe', lambda: service.run_command('probe', [str(tmp_path / 'missing')]))
+    assert not event.ok
+
+
+def test_kept_viewer_that_logs_a_lot_does_not_block(service, tmp_path):
+    # far more than a pipe buffer on stderr after the grace period
+    assert _request(service, 'open', lambda: service.open(str(tmp_path / 'chatty.png'))).ok
+    deadline = time.perf_counter() + 3.0
+    while not (tmp_path / 'chatty.done').exists() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert (tmp_path / 'chatty.done').exists()